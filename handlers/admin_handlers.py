@@ -1,8 +1,10 @@
 import json
 import logging
+import asyncio
 from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
+from modules.log_tail import log_tail
 
 logger = logging.getLogger(__name__)
 
@@ -360,10 +362,9 @@ async def show_logs(update: Update, context: ContextTypes.DEFAULT_TYPE, role_man
         # Читаем последние строки из лог файла
         log_file = "logs/sella_bot.log"
         try:
-            with open(log_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                last_lines = lines[-20:] if len(lines) > 20 else lines  # Последние 20 строк
-                log_content = ''.join(last_lines)
+            # Последние 20 строк с конца файла, без чтения всего лога
+            last_lines = await asyncio.to_thread(log_tail.tail, log_file, 20)
+            log_content = ''.join(last_lines)
         except FileNotFoundError:
             log_content = "Лог файл не найден."
         except Exception as e:
@@ -4,21 +4,34 @@ from typing import Dict, Any
 import logging
 import asyncio
 import os
+from handlers.monitor_hub import MonitorHub
+from modules.log_tail import log_tail
+from handlers.log_follower import LogFollower
+from handlers.server_handlers import start_backup, start_backup_delivery, backup_keyboard
+from modules.backup_engine import BackupManager
 
 logger = logging.getLogger(__name__)
 
 class CallbackHandlers:
     """Обработчики callback-запросов для интерактивных кнопок"""
     
-    def __init__(self, role_manager, system_monitor, process_manager, cloud_storage, notification_manager, analytics=None):
+    # Файлов на странице списков хранилища
+    STORAGE_PAGE_SIZE = 8
+    
+    def __init__(self, role_manager, system_monitor, process_manager, cloud_storage, notification_manager, analytics=None,
+                 backup_manager=None):
         self.role_manager = role_manager
         self.system_monitor = system_monitor
         self.process_manager = process_manager
         self.cloud_storage = cloud_storage
         self.notification_manager = notification_manager
         self.analytics = analytics
-        # Словарь для отслеживания активных мониторингов
-        self.active_monitors = {}
+        # Бэкапы: упаковка в дочернем процессе, прогресс в сообщении
+        self.backup_manager = backup_manager or BackupManager({})
+        # Живые дашборды: один рендер на представление для всех подписчиков
+        self.monitor_hub = MonitorHub(interval=2)
+        # Слежение за логами (inotify или опрос, пакетные правки)
+        self.log_follower = LogFollower()
     
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Основной обработчик callback-запросов"""
@@ -30,6 +43,10 @@ class CallbackHandlers:
         callback_data = query.data
         
         try:
+            # Любое другое действие завершает слежение за логом
+            if self.log_follower.is_following(user_id) and not callback_data.startswith(("admin_logs_follow", "bot_logs_follow_")):
+                await self.log_follower.stop(user_id)
+            
             # Обработка различных типов callback
             if callback_data == "main_menu":
                 await self.show_main_menu(update, context, user_id)
@@ -73,9 +90,14 @@ class CallbackHandlers:
                 await self.show_processes(update, context, user_id)
             elif callback_data == "server_backup":
                 await self.create_backup(update, context, user_id)
+            elif callback_data == "server_backup_full":
+                await self.create_backup(update, context, user_id, full=True)
             elif callback_data.startswith("backup_download_"):
                 backup_name = callback_data.replace("backup_download_", "")
                 await self.download_backup(update, context, user_id, backup_name)
+            elif callback_data.startswith("backup_verify_"):
+                backup_name = callback_data.replace("backup_verify_", "")
+                await self.verify_backup(update, context, user_id, backup_name)
             elif callback_data.startswith("backup_delete_"):
                 backup_name = callback_data.replace("backup_delete_", "")
                 await self.delete_backup(update, context, user_id, backup_name)
@@ -88,6 +110,15 @@ class CallbackHandlers:
                 await self.show_storage_download(update, context, user_id)
             elif callback_data == "storage_delete":
                 await self.show_storage_delete(update, context, user_id)
+            elif callback_data.startswith("storage_list_page_"):
+                page = int(callback_data.replace("storage_list_page_", ""))
+                await self.show_storage_list(update, context, user_id, page)
+            elif callback_data.startswith("storage_download_page_"):
+                page = int(callback_data.replace("storage_download_page_", ""))
+                await self.show_storage_download(update, context, user_id, page)
+            elif callback_data.startswith("storage_delete_page_"):
+                page = int(callback_data.replace("storage_delete_page_", ""))
+                await self.show_storage_delete(update, context, user_id, page)
             elif callback_data == "storage_search":
                 await self.show_storage_search(update, context, user_id)
             elif callback_data == "storage_refresh":
@@ -111,6 +142,21 @@ class CallbackHandlers:
                 await self.show_admin_permissions(update, context, user_id)
             elif callback_data == "admin_logs":
                 await self.show_logs(update, context, user_id)
+            elif callback_data == "admin_logs_follow":
+                await self.follow_logs(update, context, user_id)
+            elif callback_data == "admin_logs_follow_stop":
+                await self.log_follower.stop(user_id)
+                await self.show_logs(update, context, user_id)
+            elif callback_data.startswith("bot_logs_follow_"):
+                bot_name = callback_data.replace("bot_logs_follow_", "")
+                await self.follow_bot_logs(update, context, user_id, bot_name)
+            elif callback_data.startswith("bot_logs_stop_"):
+                bot_name = callback_data.replace("bot_logs_stop_", "")
+                await self.log_follower.stop(user_id)
+                await self.show_bot_logs(update, context, user_id, bot_name)
+            elif callback_data.startswith("bot_logs_"):
+                bot_name = callback_data.replace("bot_logs_", "")
+                await self.show_bot_logs(update, context, user_id, bot_name)
             elif callback_data == "admin_full_log":
                 await self.show_full_log(update, context, user_id)
             elif callback_data == "admin_config":
@@ -158,7 +204,7 @@ class CallbackHandlers:
             return
         
         # Останавливаем предыдущий мониторинг если есть
-        await self.stop_system_monitor(update, context, user_id)
+        self.monitor_hub.unsubscribe(user_id)
         
         # Создаем кнопки управления мониторингом
         from telegram import InlineKeyboardButton, InlineKeyboardMarkup
@@ -167,24 +213,35 @@ class CallbackHandlers:
             [InlineKeyboardButton("⬅️ Назад", callback_data="section_system")]
         ])
         
+        # Права проверяются при подписке, дальше пользователи с одинаковыми
+        # правами получают один и тот же рендер
+        include_alerts = await self.role_manager.check_permission(user_id, "system", "monitor")
+        view = "system_status_alerts" if include_alerts else "system_status"
+        
+        async def render_status() -> str:
+            system_status = await self.system_monitor.render_system_status(include_alerts)
+            return f"{system_status}\n\n🔄 **Автообновление каждые 2 секунды**"
+        
         # Показываем начальный статус
-        system_status = await self.system_monitor.get_system_status(user_id)
+        text = await render_status()
         await query.edit_message_text(
-            text=f"{system_status}\n\n🔄 **Автообновление каждые 2 секунды**",
+            text=text,
             reply_markup=keyboard,
             parse_mode='Markdown'
         )
         
-        # Запускаем фоновую задачу мониторинга
-        self.active_monitors[user_id] = True
-        asyncio.create_task(self.monitor_system_loop(update, context, user_id))
+        # Подписываем сообщение на общий цикл обновления
+        self.monitor_hub.subscribe(
+            user_id, context.bot, query.message.chat_id, query.message.message_id,
+            view, render_status, reply_markup=keyboard, initial_text=text
+        )
         
         await query.answer("🔄 Мониторинг запущен")
     
     async def stop_system_monitor(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         """Остановить динамический мониторинг системы"""
         # Останавливаем мониторинг
-        self.active_monitors[user_id] = False
+        self.monitor_hub.unsubscribe(user_id)
         
         # Показываем финальный статус
         query = update.callback_query
@@ -205,43 +262,12 @@ class CallbackHandlers:
         
         await query.answer("⏹️ Мониторинг остановлен")
     
-    async def monitor_system_loop(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
-        """Цикл автообновления мониторинга системы"""
-        query = update.callback_query
-        
-        while self.active_monitors.get(user_id, False):
-            try:
-                # Получаем новый статус
-                system_status = await self.system_monitor.get_system_status(user_id)
-                
-                # Создаем кнопки управления мониторингом
-                from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-                keyboard = InlineKeyboardMarkup([
-                    [InlineKeyboardButton("⏹️ Остановить мониторинг", callback_data="system_monitor_stop")],
-                    [InlineKeyboardButton("⬅️ Назад", callback_data="section_system")]
-                ])
-                
-                # Обновляем сообщение
-                await query.edit_message_text(
-                    text=f"{system_status}\n\n🔄 **Автообновление каждые 2 секунды**",
-                    reply_markup=keyboard,
-                    parse_mode='Markdown'
-                )
-                
-                # Ждем 2 секунды
-                await asyncio.sleep(2)
-                
-            except Exception as e:
-                logger.error(f"Ошибка в цикле мониторинга для пользователя {user_id}: {e}")
-                break
-    
     async def show_main_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         """Показать главное меню"""
         query = update.callback_query
         
         # Останавливаем мониторинг при выходе из раздела
-        if user_id in self.active_monitors:
-            self.active_monitors[user_id] = False
+        self.monitor_hub.unsubscribe(user_id)
         
         # Получение прав пользователя
         user_menu = await self.role_manager.get_user_menu(user_id)
@@ -293,8 +319,7 @@ class CallbackHandlers:
         query = update.callback_query
         
         # Останавливаем мониторинг при переходе в другой раздел
-        if user_id in self.active_monitors:
-            self.active_monitors[user_id] = False
+        self.monitor_hub.unsubscribe(user_id)
         
         if not await self.role_manager.check_permission(user_id, "server", "view"):
             await query.answer("❌ Нет доступа к серверу")
@@ -319,8 +344,7 @@ class CallbackHandlers:
         query = update.callback_query
         
         # Останавливаем мониторинг при переходе в другой раздел
-        if user_id in self.active_monitors:
-            self.active_monitors[user_id] = False
+        self.monitor_hub.unsubscribe(user_id)
         
         if not await self.role_manager.check_permission(user_id, "storage", "view"):
             await query.answer("❌ Нет доступа к хранилищу")
@@ -345,8 +369,7 @@ class CallbackHandlers:
         query = update.callback_query
         
         # Останавливаем мониторинг при переходе в другой раздел
-        if user_id in self.active_monitors:
-            self.active_monitors[user_id] = False
+        self.monitor_hub.unsubscribe(user_id)
         
         if not await self.role_manager.is_admin(user_id):
             await query.answer("❌ Только для администраторов")
@@ -366,17 +389,51 @@ class CallbackHandlers:
             parse_mode='Markdown'
         )
     
-    async def show_storage_list(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
-        """Показать список файлов в хранилище"""
+    async def _get_storage_page(self, context: ContextTypes.DEFAULT_TYPE, user_id: int, view: str, page: int):
+        """Страница файлов для списка view ("list", "download", "delete")
+        
+        Курсоры keyset-пагинации хранятся в context.user_data: курсор
+        страницы N - последний файл страницы N-1. Переход на соседнюю
+        страницу стоит одного запроса на размер страницы. Возвращает
+        (файлы, номер страницы, всего страниц).
+        """
+        all_cursors = context.user_data.setdefault("storage_cursors", {})
+        cursors = all_cursors.get(view)
+        if page <= 1 or not cursors or page > len(cursors):
+            # Первая страница или курсор неизвестен (устаревшая кнопка)
+            if page > 1 and cursors:
+                page = len(cursors)
+            else:
+                page = 1
+                cursors = all_cursors[view] = [None]
+        
+        is_admin = await self.role_manager.is_admin(user_id)
+        result = await self.cloud_storage.list_files_page(
+            user_id, cursor=cursors[page - 1], limit=self.STORAGE_PAGE_SIZE, is_admin=is_admin
+        )
+        
+        # Курсоры дальше текущей страницы могли устареть
+        del cursors[page:]
+        if result["next_cursor"]:
+            cursors.append(result["next_cursor"])
+        
+        # Число страниц - по счетчику файлов, но не меньше известных курсоров
+        if result["next_cursor"]:
+            total_pages = max(-(-result["total"] // self.STORAGE_PAGE_SIZE), page + 1)
+        else:
+            total_pages = page
+        return result["files"], page, total_pages
+    
+    async def show_storage_list(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int, page: int = 1):
+        """Показать список файлов в хранилище (постранично)"""
         query = update.callback_query
         
         if not await self.role_manager.check_permission(user_id, "storage", "view"):
             await query.answer("❌ Нет доступа к хранилищу")
             return
         
-        # Получаем список файлов
-        is_admin = await self.role_manager.is_admin(user_id)
-        files = await self.cloud_storage.list_files(user_id, is_admin)
+        # Получаем страницу файлов
+        files, page, total_pages = await self._get_storage_page(context, user_id, "list", page)
         storage_usage = await self.cloud_storage.get_storage_usage(user_id)
         
         if not files:
@@ -390,17 +447,17 @@ class CallbackHandlers:
                 message_text += f"   Использовано: {storage_usage['usage_percent']:.1f}%\n\n"
             
             message_text += "📁 **Ваши файлы:**\n"
-            for file_info in files[:10]:  # Показываем первые 10
+            for file_info in files:
                 original_name = file_info.get('original_name', 'Неизвестный файл')
                 size_formatted = file_info.get('size_formatted', 'Неизвестно')
                 message_text += f"📄 {original_name} ({size_formatted})\n"
             
-            if len(files) > 10:
-                message_text += f"\n... и еще {len(files) - 10} файлов"
+            if total_pages > 1:
+                message_text += f"\n📄 Страница {page} из {total_pages}"
         
         # Создание меню файлов
         from handlers.menu_buttons import MenuButtons
-        keyboard = await MenuButtons.create_storage_files_menu(files)
+        keyboard = await MenuButtons.create_storage_files_menu(files, page, total_pages)
         
         await query.edit_message_text(
             text=message_text,
@@ -452,17 +509,16 @@ class CallbackHandlers:
             parse_mode='Markdown'
         )
     
-    async def show_storage_download(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
-        """Показать список файлов для скачивания"""
+    async def show_storage_download(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int, page: int = 1):
+        """Показать список файлов для скачивания (постранично)"""
         query = update.callback_query
         
         if not await self.role_manager.check_permission(user_id, "storage", "download"):
             await query.answer("❌ Нет прав для скачивания файлов")
             return
         
-        # Получаем список файлов
-        is_admin = await self.role_manager.is_admin(user_id)
-        files = await self.cloud_storage.list_files(user_id, is_admin)
+        # Получаем страницу файлов
+        files, page, total_pages = await self._get_storage_page(context, user_id, "download", page)
         
         if not files:
             message_text = "📥 **Скачивание файлов**\n\n📁 У вас нет файлов для скачивания."
@@ -470,16 +526,17 @@ class CallbackHandlers:
             message_text = "📥 **Скачивание файлов**\n\n"
             message_text += "Выберите файл для скачивания:\n\n"
             
-            for i, file_info in enumerate(files[:10], 1):
+            first = (page - 1) * self.STORAGE_PAGE_SIZE + 1
+            for i, file_info in enumerate(files, first):
                 message_text += f"{i}. 📄 **{file_info['original_name']}**\n"
                 message_text += f"   📏 {file_info['size_formatted']} | 📅 {file_info['upload_time'][:19]}\n\n"
             
-            if len(files) > 10:
-                message_text += f"... и еще {len(files) - 10} файлов"
+            if total_pages > 1:
+                message_text += f"📄 Страница {page} из {total_pages}"
         
         # Создание меню для скачивания
         from handlers.menu_buttons import MenuButtons
-        keyboard = await MenuButtons.create_storage_download_menu(files)
+        keyboard = await MenuButtons.create_storage_download_menu(files, page, total_pages)
         
         await query.edit_message_text(
             text=message_text,
@@ -487,17 +544,16 @@ class CallbackHandlers:
             parse_mode='Markdown'
         )
     
-    async def show_storage_delete(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
-        """Показать список файлов для удаления"""
+    async def show_storage_delete(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int, page: int = 1):
+        """Показать список файлов для удаления (постранично)"""
         query = update.callback_query
         
         if not await self.role_manager.check_permission(user_id, "storage", "delete"):
             await query.answer("❌ Нет прав для удаления файлов")
             return
         
-        # Получаем список файлов
-        is_admin = await self.role_manager.is_admin(user_id)
-        files = await self.cloud_storage.list_files(user_id, is_admin)
+        # Получаем страницу файлов
+        files, page, total_pages = await self._get_storage_page(context, user_id, "delete", page)
         
         if not files:
             message_text = "🗑️ **Удаление файлов**\n\n📁 У вас нет файлов для удаления."
@@ -506,16 +562,17 @@ class CallbackHandlers:
             message_text += "⚠️ **Внимание!** Удаление необратимо.\n\n"
             message_text += "Выберите файл для удаления:\n\n"
             
-            for i, file_info in enumerate(files[:10], 1):
+            first = (page - 1) * self.STORAGE_PAGE_SIZE + 1
+            for i, file_info in enumerate(files, first):
                 message_text += f"{i}. 📄 **{file_info['original_name']}**\n"
                 message_text += f"   📏 {file_info['size_formatted']} | 📅 {file_info['upload_time'][:19]}\n\n"
             
-            if len(files) > 10:
-                message_text += f"... и еще {len(files) - 10} файлов"
+            if total_pages > 1:
+                message_text += f"📄 Страница {page} из {total_pages}"
         
         # Создание меню для удаления
         from handlers.menu_buttons import MenuButtons
-        keyboard = await MenuButtons.create_storage_delete_menu(files)
+        keyboard = await MenuButtons.create_storage_delete_menu(files, page, total_pages)
         
         await query.edit_message_text(
             text=message_text,
@@ -669,8 +726,8 @@ class CallbackHandlers:
         query = update.callback_query
         
         # Останавливаем все активные мониторинги
-        for user_id in list(self.active_monitors.keys()):
-            self.active_monitors[user_id] = False
+        self.monitor_hub.unsubscribe_all()
+        await self.log_follower.stop_all()
         
         await query.edit_message_text("👋 Меню закрыто")
     
@@ -1084,10 +1141,14 @@ class CallbackHandlers:
             
             # Создаем кнопки
             from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-            keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton("🔄 Обновить", callback_data="server_processes")],
-                [InlineKeyboardButton("⬅️ Назад", callback_data="server_status")]
-            ])
+            # Логи управляемых ботов
+            buttons = [
+                [InlineKeyboardButton(f"📝 Логи {bot_name}", callback_data=f"bot_logs_{bot_name}")]
+                for bot_name in self.process_manager.config
+            ]
+            buttons.append([InlineKeyboardButton("🔄 Обновить", callback_data="server_processes")])
+            buttons.append([InlineKeyboardButton("⬅️ Назад", callback_data="server_status")])
+            keyboard = InlineKeyboardMarkup(buttons)
             
             await query.edit_message_text(
                 processes_text,
@@ -1098,7 +1159,7 @@ class CallbackHandlers:
         except Exception as e:
             await query.answer(f"❌ Ошибка: {str(e)}")
 
-    async def create_backup(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
+    async def create_backup(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int, full: bool = False):
         """Создать резервную копию данных"""
         query = update.callback_query
         
@@ -1107,56 +1168,8 @@ class CallbackHandlers:
             return
         
         try:
-            await query.answer("💾 Создание бэкапа...")
-            
-            import os
-            from datetime import datetime
-            import tarfile
-            
-            # Создаем папку для бэкапов если её нет
-            backup_dir = "storage/backups"
-            os.makedirs(backup_dir, exist_ok=True)
-            
-            # Имя файла бэкапа
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_name = f"backup_{timestamp}.tar.gz"
-            backup_path = os.path.join(backup_dir, backup_name)
-            
-            # Создаем архив
-            with tarfile.open(backup_path, "w:gz") as tar:
-                # Добавляем папки для бэкапа
-                folders_to_backup = ["storage", "logs", "config.json"]
-                for folder in folders_to_backup:
-                    if os.path.exists(folder):
-                        tar.add(folder, arcname=os.path.basename(folder))
-            
-            # Получаем размер файла
-            file_size = os.path.getsize(backup_path) / 1024 / 1024  # МБ
-            
-            backup_text = f"""
-💾 **Бэкап создан!**
-
-**Файл:** {backup_name}
-**Размер:** {file_size:.2f} МБ
-**Путь:** {backup_path}
-**Время:** {datetime.now().strftime("%d.%m.%Y %H:%M:%S")}
-
-✅ Резервная копия успешно создана!
-            """
-            
-            # Создаем кнопки
-            from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-            keyboard = InlineKeyboardMarkup([
-                [InlineKeyboardButton("📁 Скачать бэкап", callback_data=f"backup_download_{backup_name}")],
-                [InlineKeyboardButton("🗑️ Удалить бэкап", callback_data=f"backup_delete_{backup_name}")],
-                [InlineKeyboardButton("⬅️ Назад", callback_data="server_status")]
-            ])
-            
-            await query.edit_message_text(
-                backup_text.strip(),
-                reply_markup=keyboard,
-                parse_mode='Markdown'
-            )
+            # Упаковка идет в отдельном процессе, бот продолжает отвечать
+            await start_backup(query, context, self.backup_manager, full=full)
             
         except Exception as e:
             await query.answer(f"❌ Ошибка создания бэкапа: {str(e)}")
@@ -1166,23 +1179,30 @@ class CallbackHandlers:
         query = update.callback_query
         
         try:
-            await query.answer("📁 Отправка бэкапа...")
+            # Тома отправляются фоновой задачей с продолжением после сбоя
+            await start_backup_delivery(query, context, self.backup_manager, backup_name, user_id)
+                
+        except Exception as e:
+            await query.answer(f"❌ Ошибка: {str(e)}")
+
+    async def verify_backup(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int, backup_name: str):
+        """Проверить тома бэкапа по контрольным суммам"""
+        query = update.callback_query
+        
+        try:
+            if not self.backup_manager.get_backup_path(backup_name):
+                await query.answer("❌ Файл бэкапа не найден")
+                return
             
-            import os
-            backup_path = os.path.join("storage/backups", backup_name)
+            await query.answer("🔍 Проверка томов...")
+            result = await asyncio.to_thread(self.backup_manager.verify_backup, backup_name)
             
-            if os.path.exists(backup_path):
-                with open(backup_path, 'rb') as f:
-                    await context.bot.send_document(
-                        chat_id=user_id,
-                        document=f,
-                        filename=backup_name,
-                        caption=f"💾 Резервная копия: {backup_name}"
-                    )
-                await query.answer("✅ Бэкап отправлен в чат")
+            if result["ok"]:
+                text = f"✅ Бэкап {backup_name} цел, томов: {result['volumes']}"
             else:
-                await query.answer("❌ Файл бэкапа не найден")
-                
+                text = f"❌ Бэкап {backup_name} поврежден:\n" + "\n".join(result["problems"][:10])
+            await query.edit_message_text(text, reply_markup=backup_keyboard(backup_name))
+            
         except Exception as e:
             await query.answer(f"❌ Ошибка: {str(e)}")
 
@@ -1191,11 +1211,7 @@ class CallbackHandlers:
         query = update.callback_query
         
         try:
-            import os
-            backup_path = os.path.join("storage/backups", backup_name)
-            
-            if os.path.exists(backup_path):
-                os.remove(backup_path)
+            if self.backup_manager.delete_backup(backup_name):
                 await query.answer("✅ Бэкап удален")
                 
                 # Возвращаемся к статусу сервера
@@ -1465,10 +1481,9 @@ class CallbackHandlers:
             # Читаем последние строки из лог файла
             log_file = "logs/sella_bot.log"
             try:
-                with open(log_file, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                    last_lines = lines[-20:] if len(lines) > 20 else lines  # Последние 20 строк
-                    log_content = ''.join(last_lines)
+                # Последние 20 строк с конца файла, без чтения всего лога
+                last_lines = await asyncio.to_thread(log_tail.tail, log_file, 20)
+                log_content = ''.join(last_lines)
             except FileNotFoundError:
                 log_content = "Лог файл не найден."
             except Exception as e:
@@ -1478,6 +1493,7 @@ class CallbackHandlers:
             from telegram import InlineKeyboardButton, InlineKeyboardMarkup
             keyboard = InlineKeyboardMarkup([
                 [InlineKeyboardButton("🔄 Обновить логи", callback_data="admin_logs")],
+                [InlineKeyboardButton("📡 Следить за логом", callback_data="admin_logs_follow")],
                 [InlineKeyboardButton("📁 Полный лог", callback_data="admin_full_log")],
                 [InlineKeyboardButton("⬅️ Назад", callback_data="admin_users")]
             ])
@@ -1493,6 +1509,83 @@ class CallbackHandlers:
         except Exception as e:
             await query.answer(f"❌ Ошибка: {str(e)}")
 
+    async def follow_logs(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
+        """Слежение за логом бота в реальном времени"""
+        query = update.callback_query
+        
+        if not await self.role_manager.check_permission(user_id, "admin", "view"):
+            await query.answer("❌ У вас нет прав для просмотра логов.")
+            return
+        
+        await self._start_log_follow(update, context, user_id, "logs/sella_bot.log", "Логи бота", "admin_logs_follow_stop")
+    
+    async def show_bot_logs(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int, bot_name: str):
+        """Показать логи управляемого бота"""
+        query = update.callback_query
+        
+        log_file = await self.process_manager.get_bot_log_file(bot_name, user_id)
+        if not log_file:
+            await query.answer("❌ Нет доступа к логам бота")
+            return
+        
+        try:
+            await query.answer("📋 Получение логов...")
+            
+            last_lines = []
+            try:
+                last_lines = await asyncio.to_thread(log_tail.tail, log_file, 20)
+                log_content = ''.join(last_lines) or "Лог пуст."
+            except FileNotFoundError:
+                log_content = "Лог файл не найден."
+            except Exception as e:
+                log_content = f"Ошибка чтения лога: {str(e)}"
+            
+            from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+            keyboard = InlineKeyboardMarkup([
+                [InlineKeyboardButton("🔄 Обновить логи", callback_data=f"bot_logs_{bot_name}")],
+                [InlineKeyboardButton("📡 Следить за логом", callback_data=f"bot_logs_follow_{bot_name}")],
+                [InlineKeyboardButton("⬅️ Назад", callback_data="server_processes")]
+            ])
+            
+            await query.edit_message_text(
+                f"📝 **Логи бота {bot_name}**\n\n"
+                f"```\n{log_content[-3000:]}\n```\n\n"
+                f"Показано последних {len(last_lines)} строк",
+                reply_markup=keyboard,
+                parse_mode='Markdown'
+            )
+            
+        except Exception as e:
+            await query.answer(f"❌ Ошибка: {str(e)}")
+    
+    async def follow_bot_logs(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int, bot_name: str):
+        """Слежение за логом управляемого бота"""
+        query = update.callback_query
+        
+        log_file = await self.process_manager.get_bot_log_file(bot_name, user_id)
+        if not log_file:
+            await query.answer("❌ Нет доступа к логам бота")
+            return
+        
+        await self._start_log_follow(update, context, user_id, log_file, f"Логи бота {bot_name}", f"bot_logs_stop_{bot_name}")
+    
+    async def _start_log_follow(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int,
+                                log_file: str, title: str, stop_callback: str):
+        """Запуск слежения за лог-файлом в текущем сообщении"""
+        query = update.callback_query
+        
+        from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+        keyboard = InlineKeyboardMarkup([
+            [InlineKeyboardButton("⏹️ Остановить слежение", callback_data=stop_callback)]
+        ])
+        
+        text = await self.log_follower.follow(
+            user_id, context.bot, query.message.chat_id, query.message.message_id,
+            log_file, title, reply_markup=keyboard
+        )
+        await query.edit_message_text(text=text, reply_markup=keyboard, parse_mode='Markdown')
+        await query.answer("📡 Слежение запущено")
+    
     async def show_full_log(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         """Показать полный лог"""
         query = update.callback_query
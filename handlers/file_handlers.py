@@ -1,9 +1,11 @@
 import os
-import tempfile
 import logging
+import asyncio
 from telegram import Update
 from telegram.ext import ContextTypes
-from typing import Optional
+from typing import Dict, Any, Optional
+from modules.blob_store import HashingWriter
+from handlers.upload_queue import UploadQueue
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +15,47 @@ class FileHandlers:
     def __init__(self, cloud_storage, role_manager):
         self.cloud_storage = cloud_storage
         self.role_manager = role_manager
+        storage_config = getattr(cloud_storage, "config", {})
+        # Загрузки выполняются воркерами очереди, а не внутри апдейта
+        self.upload_queue = UploadQueue(
+            self._ingest_file,
+            workers=storage_config.get("upload_workers", 3),
+            per_user_limit=storage_config.get("uploads_per_user", 2)
+        )
+    
+    async def _ingest_file(self, context: ContextTypes.DEFAULT_TYPE, telegram_file_id: str,
+                           user_id: int, file_name: str) -> Dict[str, Any]:
+        """Скачивание файла Telegram сразу в хранилище
+        
+        PTB отдает содержимое файла целиком в памяти, поэтому запись на диск
+        идет в пуле потоков, а не в event loop. Файл пишется во временную
+        папку хранилища (та же файловая система), SHA-256 считается во время
+        этой же записи, затем файл перемещается на место без повторного
+        копирования и без повторного чтения.
+        """
+        file = await context.bot.get_file(telegram_file_id)
+        temp_path = self.cloud_storage.blob_store.new_temp_path()
+        
+        try:
+            data = await file.download_as_bytearray()
+            content_hash = await asyncio.to_thread(self._write_temp, temp_path, data)
+            
+            return await self.cloud_storage.upload_file(
+                str(temp_path), user_id, file_name,
+                content_hash=content_hash, consume=True
+            )
+        finally:
+            # Файл остается только если загрузка отклонена до перемещения
+            if temp_path.exists():
+                temp_path.unlink()
+    
+    @staticmethod
+    def _write_temp(temp_path, data) -> str:
+        """Запись скачанного файла с подсчетом SHA-256 (блокирующая)"""
+        with open(temp_path, 'wb') as out:
+            writer = HashingWriter(out)
+            writer.write(data)
+        return writer.hexdigest()
     
     async def handle_document(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработка загруженного документа"""
@@ -42,33 +85,8 @@ class FileHandlers:
                 await update.message.reply_text(f"❌ Расширение .{file_ext} не разрешено")
                 return
             
-            # Скачивание файла
-            await update.message.reply_text("📥 Загружаю файл...")
-            
-            file = await context.bot.get_file(document.file_id)
-            
-            # Создание временного файла
-            with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_ext}") as temp_file:
-                temp_path = temp_file.name
-            
-            # Скачивание во временный файл
-            await file.download_to_drive(temp_path)
-            
-            # Загрузка в облачное хранилище
-            result = await self.cloud_storage.upload_file(temp_path, user_id, file_name)
-            
-            # Удаление временного файла
-            os.unlink(temp_path)
-            
-            if result["success"]:
-                await update.message.reply_text(
-                    f"✅ Файл **{file_name}** успешно загружен!\n"
-                    f"📏 Размер: {result['size']} байт\n"
-                    f"🆔 ID: `{result['file_id']}`",
-                    parse_mode='Markdown'
-                )
-            else:
-                await update.message.reply_text(f"❌ Ошибка загрузки: {result['message']}")
+            # Файл скачивается воркером очереди, ход загрузки - в одном сообщении
+            await self.upload_queue.submit(update, context, document.file_id, file_name)
                 
         except Exception as e:
             logger.error(f"Ошибка обработки файла: {e}")
@@ -98,33 +116,8 @@ class FileHandlers:
                 )
                 return
             
-            # Скачивание фото
-            await update.message.reply_text("📥 Загружаю фото...")
-            
-            file = await context.bot.get_file(photo.file_id)
-            
-            # Создание временного файла
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_file:
-                temp_path = temp_file.name
-            
-            # Скачивание во временный файл
-            await file.download_to_drive(temp_path)
-            
-            # Загрузка в облачное хранилище
-            result = await self.cloud_storage.upload_file(temp_path, user_id, file_name)
-            
-            # Удаление временного файла
-            os.unlink(temp_path)
-            
-            if result["success"]:
-                await update.message.reply_text(
-                    f"✅ Фото успешно загружено!\n"
-                    f"📏 Размер: {result['size']} байт\n"
-                    f"🆔 ID: `{result['file_id']}`",
-                    parse_mode='Markdown'
-                )
-            else:
-                await update.message.reply_text(f"❌ Ошибка загрузки: {result['message']}")
+            # Файл скачивается воркером очереди, ход загрузки - в одном сообщении
+            await self.upload_queue.submit(update, context, photo.file_id, file_name)
                 
         except Exception as e:
             logger.error(f"Ошибка обработки фото: {e}")
@@ -150,33 +143,8 @@ class FileHandlers:
                 )
                 return
             
-            # Скачивание видео
-            await update.message.reply_text("📥 Загружаю видео...")
-            
-            file = await context.bot.get_file(video.file_id)
-            
-            # Создание временного файла
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as temp_file:
-                temp_path = temp_file.name
-            
-            # Скачивание во временный файл
-            await file.download_to_drive(temp_path)
-            
-            # Загрузка в облачное хранилище
-            result = await self.cloud_storage.upload_file(temp_path, user_id, file_name)
-            
-            # Удаление временного файла
-            os.unlink(temp_path)
-            
-            if result["success"]:
-                await update.message.reply_text(
-                    f"✅ Видео **{file_name}** успешно загружено!\n"
-                    f"📏 Размер: {result['size']} байт\n"
-                    f"🆔 ID: `{result['file_id']}`",
-                    parse_mode='Markdown'
-                )
-            else:
-                await update.message.reply_text(f"❌ Ошибка загрузки: {result['message']}")
+            # Файл скачивается воркером очереди, ход загрузки - в одном сообщении
+            await self.upload_queue.submit(update, context, video.file_id, file_name)
                 
         except Exception as e:
             logger.error(f"Ошибка обработки видео: {e}")
@@ -202,33 +170,8 @@ class FileHandlers:
                 )
                 return
             
-            # Скачивание аудио
-            await update.message.reply_text("📥 Загружаю аудио...")
-            
-            file = await context.bot.get_file(audio.file_id)
-            
-            # Создание временного файла
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as temp_file:
-                temp_path = temp_file.name
-            
-            # Скачивание во временный файл
-            await file.download_to_drive(temp_path)
-            
-            # Загрузка в облачное хранилище
-            result = await self.cloud_storage.upload_file(temp_path, user_id, file_name)
-            
-            # Удаление временного файла
-            os.unlink(temp_path)
-            
-            if result["success"]:
-                await update.message.reply_text(
-                    f"✅ Аудио **{file_name}** успешно загружено!\n"
-                    f"📏 Размер: {result['size']} байт\n"
-                    f"🆔 ID: `{result['file_id']}`",
-                    parse_mode='Markdown'
-                )
-            else:
-                await update.message.reply_text(f"❌ Ошибка загрузки: {result['message']}")
+            # Файл скачивается воркером очереди, ход загрузки - в одном сообщении
+            await self.upload_queue.submit(update, context, audio.file_id, file_name)
                 
         except Exception as e:
             logger.error(f"Ошибка обработки аудио: {e}")
@@ -0,0 +1,165 @@
+from telegram.error import BadRequest, Forbidden, RetryAfter
+from typing import Dict, Any, Optional
+import logging
+import asyncio
+import os
+import time
+
+from modules.file_watcher import FileWatcher
+from modules.log_tail import log_tail
+
+logger = logging.getLogger(__name__)
+
+class LogFollower:
+    """Слежение за логом в реальном времени внутри одного сообщения
+
+    Изменения файла приходят от FileWatcher (inotify или опрос) и только
+    помечают слежение "грязным". Раз в min_edit_interval дописанные строки
+    дочитываются через общий log_tail (с кэшем смещения) и сообщение
+    правится, если текст изменился. Так серия записей в лог превращается
+    в одну правку, а частота правок не превышает лимиты Telegram.
+    """
+
+    def __init__(self, lines: int = 20, min_edit_interval: float = 2.0, max_duration: float = 600):
+        self.lines = lines
+        self.min_edit_interval = min_edit_interval
+        self.max_duration = max_duration
+        self.watcher = FileWatcher()
+        # user_id -> слежение (одно на пользователя)
+        self.follows: Dict[int, Dict[str, Any]] = {}
+
+    def is_following(self, user_id: int) -> bool:
+        """Следит ли пользователь за логом"""
+        return user_id in self.follows
+
+    async def follow(self, user_id: int, bot, chat_id: int, message_id: int, path: str,
+                     title: str, reply_markup=None) -> str:
+        """Начать слежение; возвращает начальный текст сообщения"""
+        await self.stop(user_id)
+
+        follow = {
+            "bot": bot,
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "path": os.path.abspath(path),
+            "title": title,
+            "reply_markup": reply_markup,
+            "dirty": asyncio.Event(),
+            "last_text": None,
+            "started": time.monotonic()
+        }
+        follow["callback"] = lambda changed_path, event: follow["dirty"].set()
+        follow["last_text"] = await self._render(follow)
+
+        self.watcher.watch(follow["path"], follow["callback"])
+        follow["task"] = asyncio.create_task(self._follow_loop(user_id, follow))
+        self.follows[user_id] = follow
+        return follow["last_text"]
+
+    async def stop(self, user_id: int) -> bool:
+        """Остановить слежение пользователя"""
+        follow = self.follows.pop(user_id, None)
+        if not follow:
+            return False
+        self.watcher.unwatch(follow["path"], follow["callback"])
+        task = follow.get("task")
+        if task and task is not asyncio.current_task():
+            task.cancel()
+        return True
+
+    async def stop_all(self):
+        """Остановить все слежения"""
+        for user_id in list(self.follows):
+            await self.stop(user_id)
+
+    async def _render(self, follow: Dict[str, Any]) -> str:
+        try:
+            lines = await asyncio.to_thread(log_tail.tail, follow["path"], self.lines)
+            log_content = ''.join(lines)
+        except FileNotFoundError:
+            log_content = "Лог файл не найден."
+        except Exception as e:
+            log_content = f"Ошибка чтения лога: {str(e)}"
+
+        return (
+            f"📡 **{follow['title']}** (слежение)\n\n"
+            f"```\n{log_content[-3000:]}\n```\n\n"
+            f"🕒 Обновлено: {time.strftime('%H:%M:%S')}"
+        )
+
+    async def _follow_loop(self, user_id: int, follow: Dict[str, Any]):
+        """Пакетная отправка дописанных строк с ограничением частоты правок"""
+        next_edit = time.monotonic() + self.min_edit_interval
+        try:
+            while self.follows.get(user_id) is follow:
+                remaining = follow["started"] + self.max_duration - time.monotonic()
+                if remaining <= 0:
+                    await self._finish(user_id, follow)
+                    return
+
+                try:
+                    await asyncio.wait_for(follow["dirty"].wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    continue
+
+                # Копим изменения до следующего разрешенного момента правки
+                delay = next_edit - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                follow["dirty"].clear()
+
+                text = await self._render(follow)
+                if text.split("\n🕒")[0] == follow["last_text"].split("\n🕒")[0]:
+                    continue
+
+                next_edit = time.monotonic() + self.min_edit_interval
+                retry_after = await self._edit(user_id, follow, text)
+                if retry_after:
+                    next_edit = time.monotonic() + retry_after
+                    follow["dirty"].set()
+        except asyncio.CancelledError:
+            pass
+
+    async def _edit(self, user_id: int, follow: Dict[str, Any], text: str) -> Optional[float]:
+        """Правка сообщения; возвращает паузу при флуд-контроле"""
+        try:
+            await follow["bot"].edit_message_text(
+                chat_id=follow["chat_id"],
+                message_id=follow["message_id"],
+                text=text,
+                reply_markup=follow["reply_markup"],
+                parse_mode='Markdown'
+            )
+            follow["last_text"] = text
+        except RetryAfter as e:
+            retry_after = e.retry_after
+            if hasattr(retry_after, "total_seconds"):
+                retry_after = retry_after.total_seconds()
+            return float(retry_after)
+        except BadRequest as e:
+            if "message is not modified" in str(e).lower():
+                follow["last_text"] = text
+                return None
+            logger.warning(f"Слежение за логом остановлено для пользователя {user_id}: {e}")
+            await self.stop(user_id)
+        except Forbidden:
+            await self.stop(user_id)
+        except Exception as e:
+            logger.error(f"Ошибка обновления лога для пользователя {user_id}: {e}")
+        return None
+
+    async def _finish(self, user_id: int, follow: Dict[str, Any]):
+        """Завершение слежения по таймауту"""
+        await self.stop(user_id)
+        text = await self._render(follow)
+        text = text.replace("(слежение)", "(слежение остановлено по таймауту)")
+        try:
+            await follow["bot"].edit_message_text(
+                chat_id=follow["chat_id"],
+                message_id=follow["message_id"],
+                text=text,
+                reply_markup=None,
+                parse_mode='Markdown'
+            )
+        except Exception as e:
+            logger.debug(f"Не удалось обновить сообщение слежения: {e}")
@@ -160,12 +160,12 @@ class MenuButtons:
         return InlineKeyboardMarkup(keyboard)
     
     @staticmethod
-    async def create_storage_files_menu(files: List[Dict[str, Any]]) -> InlineKeyboardMarkup:
-        """Создание меню файлов хранилища"""
+    async def create_storage_files_menu(files: List[Dict[str, Any]], page: int = 1, total_pages: int = 1) -> InlineKeyboardMarkup:
+        """Создание меню файлов хранилища (files - одна страница)"""
         buttons = []
         
-        # Кнопки для каждого файла (первые 5)
-        for i, file_info in enumerate(files[:5]):
+        # Кнопки для каждого файла страницы
+        for i, file_info in enumerate(files):
             file_name = file_info['original_name']
             if len(file_name) > 20:
                 file_name = file_name[:17] + "..."
@@ -197,18 +197,21 @@ class MenuButtons:
             else:
                 buttons.append([action_buttons[i]])
         
+        if total_pages > 1:
+            buttons.append(MenuButtons.create_pagination_row(page, total_pages, "storage_list"))
+        
         # Кнопка возврата
         buttons.append([InlineKeyboardButton("⬅️ Назад", callback_data="section_storage")])
         
         return InlineKeyboardMarkup(buttons)
     
     @staticmethod
-    async def create_storage_download_menu(files: List[Dict[str, Any]]) -> InlineKeyboardMarkup:
-        """Создание меню для скачивания файлов"""
+    async def create_storage_download_menu(files: List[Dict[str, Any]], page: int = 1, total_pages: int = 1) -> InlineKeyboardMarkup:
+        """Создание меню для скачивания файлов (files - одна страница)"""
         buttons = []
         
-        # Кнопки для каждого файла (первые 8)
-        for i, file_info in enumerate(files[:8]):
+        # Кнопки для каждого файла страницы
+        for i, file_info in enumerate(files):
             file_name = file_info['original_name']
             if len(file_name) > 25:
                 file_name = file_name[:22] + "..."
@@ -220,6 +223,9 @@ class MenuButtons:
                 )
             ])
         
+        if total_pages > 1:
+            buttons.append(MenuButtons.create_pagination_row(page, total_pages, "storage_download"))
+        
         # Кнопки навигации
         buttons.append([
             InlineKeyboardButton("📁 Список файлов", callback_data="storage_list"),
@@ -229,12 +235,12 @@ class MenuButtons:
         return InlineKeyboardMarkup(buttons)
     
     @staticmethod
-    async def create_storage_delete_menu(files: List[Dict[str, Any]]) -> InlineKeyboardMarkup:
-        """Создание меню для удаления файлов"""
+    async def create_storage_delete_menu(files: List[Dict[str, Any]], page: int = 1, total_pages: int = 1) -> InlineKeyboardMarkup:
+        """Создание меню для удаления файлов (files - одна страница)"""
         buttons = []
         
-        # Кнопки для каждого файла (первые 8)
-        for i, file_info in enumerate(files[:8]):
+        # Кнопки для каждого файла страницы
+        for i, file_info in enumerate(files):
             file_name = file_info['original_name']
             if len(file_name) > 25:
                 file_name = file_name[:22] + "..."
@@ -246,6 +252,9 @@ class MenuButtons:
                 )
             ])
         
+        if total_pages > 1:
+            buttons.append(MenuButtons.create_pagination_row(page, total_pages, "storage_delete"))
+        
         # Кнопки навигации
         buttons.append([
             InlineKeyboardButton("📁 Список файлов", callback_data="storage_list"),
@@ -272,11 +281,8 @@ class MenuButtons:
         return InlineKeyboardMarkup(keyboard)
     
     @staticmethod
-    async def create_pagination_menu(current_page: int, total_pages: int, base_callback: str) -> InlineKeyboardMarkup:
-        """Создание меню пагинации"""
-        keyboard = []
-        
-        # Кнопки навигации
+    def create_pagination_row(current_page: int, total_pages: int, base_callback: str) -> List[InlineKeyboardButton]:
+        """Ряд кнопок пагинации: callback_data вида <base_callback>_page_<номер>"""
         nav_buttons = []
         if current_page > 1:
             nav_buttons.append(InlineKeyboardButton("⬅️", callback_data=f"{base_callback}_page_{current_page-1}"))
@@ -286,7 +292,15 @@ class MenuButtons:
         if current_page < total_pages:
             nav_buttons.append(InlineKeyboardButton("➡️", callback_data=f"{base_callback}_page_{current_page+1}"))
         
-        keyboard.append(nav_buttons)
+        return nav_buttons
+    
+    @staticmethod
+    async def create_pagination_menu(current_page: int, total_pages: int, base_callback: str) -> InlineKeyboardMarkup:
+        """Создание меню пагинации"""
+        keyboard = []
+        
+        # Кнопки навигации
+        keyboard.append(MenuButtons.create_pagination_row(current_page, total_pages, base_callback))
         
         # Кнопка возврата
         keyboard.append([InlineKeyboardButton("⬅️ Назад", callback_data="main_menu")])
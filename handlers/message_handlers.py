@@ -3,7 +3,7 @@ from telegram.ext import ContextTypes
 from typing import Dict, Any
 import logging
 import os
-import tempfile
+from modules.blob_store import HashingWriter
 
 logger = logging.getLogger(__name__)
 
@@ -73,13 +73,19 @@ class MessageHandlers:
             # Скачиваем файл во временную папку
             await update.message.reply_text("📥 Загружаю файл...")
             
+            # Скачиваем во временную папку хранилища с подсчетом SHA-256 на лету
             temp_file = await context.bot.get_file(file_info.file_id)
-            temp_path = os.path.join(tempfile.gettempdir(), f"temp_{file_info.file_id}")
+            temp_path = str(self.cloud_storage.blob_store.new_temp_path())
             
-            await temp_file.download_to_drive(temp_path)
+            with open(temp_path, 'wb') as out:
+                writer = HashingWriter(out)
+                await temp_file.download_to_memory(writer)
             
-            # Сохраняем в хранилище
-            result = await self.cloud_storage.save_file(user_id, temp_path, original_filename)
+            # Перемещаем в хранилище без повторного копирования
+            result = await self.cloud_storage.save_file(
+                user_id, temp_path, original_filename,
+                content_hash=writer.hexdigest(), consume=True
+            )
             
             # Удаляем временный файл
             if os.path.exists(temp_path):
@@ -0,0 +1,157 @@
+from telegram.error import BadRequest, Forbidden, RetryAfter
+from typing import Dict, Any, Optional, Callable, Awaitable
+import logging
+import asyncio
+import time
+
+logger = logging.getLogger(__name__)
+
+class MonitorHub:
+    """Хаб живых дашбордов: один рендер на представление, рассылка всем подписчикам
+
+    Для каждого представления (например, статус системы с алертами и без)
+    работает одна фоновая задача. Раз в тик она рендерит текст и правит
+    сообщения подписчиков, пропуская неизмененный текст и соблюдая
+    ограничения Telegram на частоту правок в одном чате.
+    """
+
+    def __init__(self, interval: float = 2.0, min_edit_interval: float = 1.0, max_edits_per_tick: int = 25):
+        self.interval = interval
+        self.min_edit_interval = min_edit_interval
+        self.max_edits_per_tick = max_edits_per_tick
+        # user_id -> подписка (одно живое сообщение на пользователя)
+        self.subscribers: Dict[int, Dict[str, Any]] = {}
+        self.renderers: Dict[str, Callable[[], Awaitable[str]]] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+        # chat_id -> время последней правки (общий лимит для всех сообщений чата)
+        self.chat_last_edit: Dict[int, float] = {}
+
+    def subscribe(self, user_id: int, bot, chat_id: int, message_id: int, view: str,
+                  render: Callable[[], Awaitable[str]], reply_markup=None,
+                  initial_text: Optional[str] = None) -> None:
+        """Подписать сообщение пользователя на обновления представления"""
+        now = time.monotonic()
+        previous = self.subscribers.get(user_id)
+        self.subscribers[user_id] = {
+            "bot": bot,
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "view": view,
+            "reply_markup": reply_markup,
+            "last_text": initial_text,
+            "retry_at": 0.0
+        }
+        if previous and previous["chat_id"] != chat_id:
+            self._forget_chat(previous["chat_id"])
+        if initial_text is not None:
+            self.chat_last_edit[chat_id] = now
+
+        self.renderers.setdefault(view, render)
+        task = self.tasks.get(view)
+        if not task or task.done():
+            self.tasks[view] = asyncio.create_task(self._producer_loop(view))
+            logger.info(f"Запущен дашборд '{view}'")
+
+    def unsubscribe(self, user_id: int) -> bool:
+        """Отписать пользователя; задача представления завершится сама без подписчиков"""
+        sub = self.subscribers.pop(user_id, None)
+        if sub is None:
+            return False
+        self._forget_chat(sub["chat_id"])
+        return True
+
+    def unsubscribe_all(self) -> None:
+        """Отписать всех пользователей"""
+        self.subscribers.clear()
+        self.chat_last_edit.clear()
+
+    def _forget_chat(self, chat_id: int) -> None:
+        """Удалить лимит правок чата, если в нем не осталось подписок"""
+        if not any(sub["chat_id"] == chat_id for sub in self.subscribers.values()):
+            self.chat_last_edit.pop(chat_id, None)
+
+    def is_subscribed(self, user_id: int) -> bool:
+        """Проверить, подписан ли пользователь"""
+        return user_id in self.subscribers
+
+    def _view_subscribers(self, view: str) -> Dict[int, Dict[str, Any]]:
+        return {uid: sub for uid, sub in self.subscribers.items() if sub["view"] == view}
+
+    async def _producer_loop(self, view: str):
+        """Цикл представления: рендер раз в тик и рассылка подписчикам"""
+        try:
+            while self._view_subscribers(view):
+                try:
+                    text = await self.renderers[view]()
+                    await self._fan_out(view, text)
+                except Exception as e:
+                    logger.error(f"Ошибка обновления дашборда '{view}': {e}")
+                await asyncio.sleep(self.interval)
+        finally:
+            self.tasks.pop(view, None)
+            self.renderers.pop(view, None)
+            logger.info(f"Дашборд '{view}' остановлен (нет подписчиков)")
+
+    async def _fan_out(self, view: str, text: str):
+        """Разослать текст тем подписчикам, у которых он изменился"""
+        now = time.monotonic()
+        due = []
+        for user_id, sub in self._view_subscribers(view).items():
+            if sub["last_text"] == text or now < sub["retry_at"]:
+                continue
+            if now - self.chat_last_edit.get(sub["chat_id"], 0.0) < self.min_edit_interval:
+                continue
+            due.append((user_id, sub))
+
+        # Глобальный лимит правок за тик: первыми обновляются дольше ждавшие чаты
+        due.sort(key=lambda item: self.chat_last_edit.get(item[1]["chat_id"], 0.0))
+        due = due[:self.max_edits_per_tick]
+
+        # В одном чате за тик правим только одно сообщение
+        seen_chats = set()
+        batch = []
+        for user_id, sub in due:
+            if sub["chat_id"] in seen_chats:
+                continue
+            seen_chats.add(sub["chat_id"])
+            self.chat_last_edit[sub["chat_id"]] = now
+            batch.append(self._edit(user_id, sub, text))
+
+        if batch:
+            await asyncio.gather(*batch)
+
+    async def _edit(self, user_id: int, sub: Dict[str, Any], text: str):
+        """Правка одного сообщения с обработкой ошибок Telegram"""
+        try:
+            await sub["bot"].edit_message_text(
+                chat_id=sub["chat_id"],
+                message_id=sub["message_id"],
+                text=text,
+                reply_markup=sub["reply_markup"],
+                parse_mode='Markdown'
+            )
+            sub["last_text"] = text
+        except RetryAfter as e:
+            retry_after = e.retry_after
+            if hasattr(retry_after, "total_seconds"):
+                retry_after = retry_after.total_seconds()
+            sub["retry_at"] = time.monotonic() + float(retry_after)
+            logger.warning(f"Дашборд: флуд-контроль для чата {sub['chat_id']}, пауза {retry_after}с")
+        except BadRequest as e:
+            if "message is not modified" in str(e).lower():
+                sub["last_text"] = text
+                return
+            # Сообщение удалено или недоступно для правки
+            logger.warning(f"Дашборд: отписка пользователя {user_id}: {e}")
+            self._drop(user_id, sub)
+        except Forbidden as e:
+            logger.warning(f"Дашборд: бот заблокирован пользователем {user_id}: {e}")
+            self._drop(user_id, sub)
+        except Exception as e:
+            # Сетевые ошибки не отписывают: повторим на следующем тике
+            logger.error(f"Ошибка обновления дашборда для пользователя {user_id}: {e}")
+
+    def _drop(self, user_id: int, sub: Dict[str, Any]):
+        if self.subscribers.get(user_id) is sub:
+            del self.subscribers[user_id]
+            self._forget_chat(sub["chat_id"])
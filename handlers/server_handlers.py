@@ -1,5 +1,6 @@
 import os
 import sys
+import logging
 import psutil
 import asyncio
 import subprocess
@@ -7,6 +8,8 @@ from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
+logger = logging.getLogger(__name__)
+
 async def server_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показать статус бота и системы"""
     try:
@@ -163,57 +166,189 @@ async def show_processes(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except Exception as e:
         await query.answer(f"❌ Ошибка: {str(e)}")
 
-async def create_backup(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Создать резервную копию данных"""
-    query = update.callback_query
+def _format_backup_progress(event: dict) -> str:
+    """Текст сообщения о ходе бэкапа"""
+    text = "💾 **Создание бэкапа...**\n\n"
+    if event.get("phase") != "pack":
+        return text + "Этап: поиск изменений"
+    bytes_total = event.get("bytes_total") or 0
+    percent = event["bytes_done"] / bytes_total * 100 if bytes_total else 100
+    text += "Этап: упаковка\n"
+    text += f"**Файлы:** {event['files_done']}/{event['files_total']}\n"
+    text += f"**Данные:** {event['bytes_done'] / 1024 / 1024:.1f}/{bytes_total / 1024 / 1024:.1f} МБ ({percent:.0f}%)"
+    return text
+
+async def start_backup(query, context: ContextTypes.DEFAULT_TYPE, backup_manager, full: bool = False):
+    """Запуск бэкапа фоновой задачей: обработчик апдейта не ждет упаковку"""
+    if backup_manager.running:
+        await query.answer("⏳ Бэкап уже выполняется")
+        return
+    
+    await query.answer("💾 Создание бэкапа...")
+    await query.edit_message_text("💾 **Создание бэкапа...**", parse_mode='Markdown')
+    context.application.create_task(run_backup(query, backup_manager, full=full))
+
+async def run_backup(query, backup_manager, full: bool = False, min_edit_interval: float = 2.0):
+    """Создание бэкапа в отдельном процессе с прогрессом в сообщении"""
+    last_edit = [asyncio.get_running_loop().time()]
+    
+    async def on_progress(event: dict):
+        now = asyncio.get_running_loop().time()
+        if now - last_edit[0] < min_edit_interval:
+            return
+        last_edit[0] = now
+        await query.edit_message_text(_format_backup_progress(event), parse_mode='Markdown')
     
     try:
-        await query.answer("💾 Создание бэкапа...")
-        
-        # Создаем папку для бэкапов если её нет
-        backup_dir = "storage/backups"
-        os.makedirs(backup_dir, exist_ok=True)
-        
-        # Имя файла бэкапа
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_name = f"backup_{timestamp}.tar.gz"
-        backup_path = os.path.join(backup_dir, backup_name)
-        
-        # Создаем архив
-        import tarfile
-        with tarfile.open(backup_path, "w:gz") as tar:
-            # Добавляем папки для бэкапа
-            folders_to_backup = ["storage", "logs", "config.json"]
-            for folder in folders_to_backup:
-                if os.path.exists(folder):
-                    tar.add(folder, arcname=os.path.basename(folder))
-        
-        # Получаем размер файла
-        file_size = os.path.getsize(backup_path) / 1024 / 1024  # МБ
-        
-        backup_text = f"""
+        result = await backup_manager.create_backup(full=full, on_progress=on_progress)
+        await _show_backup_result(query, result)
+    except Exception as e:
+        logger.error(f"Ошибка создания бэкапа: {e}")
+        try:
+            await query.edit_message_text(f"❌ Ошибка создания бэкапа: {str(e)}")
+        except Exception:
+            pass
+
+async def _show_backup_result(query, result: dict):
+    """Итоговое сообщение о бэкапе"""
+    if not result["success"]:
+        keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Назад", callback_data="server_status")]])
+        await query.edit_message_text(result["message"], reply_markup=keyboard)
+        return
+    
+    if result["unchanged"]:
+        keyboard = InlineKeyboardMarkup([
+            [InlineKeyboardButton("💾 Полный бэкап", callback_data="server_backup_full")],
+            [InlineKeyboardButton("⬅️ Назад", callback_data="server_status")]
+        ])
+        await query.edit_message_text(
+            "💾 **Бэкап не нужен**\n\nС прошлого бэкапа файлы не изменились.",
+            reply_markup=keyboard,
+            parse_mode='Markdown'
+        )
+        return
+    
+    backup_name = result["name"]
+    backup_type = "полный" if result["type"] == "full" else "инкрементальный"
+    backup_text = f"""
 💾 **Бэкап создан!**
 
 **Файл:** {backup_name}
-**Размер:** {file_size:.2f} МБ
-**Путь:** {backup_path}
+**Тип:** {backup_type}
+**Файлов:** {result['files']} (удалено с прошлого бэкапа: {result['deleted']})
+**Сжатие:** {result['codec']}, уже сжатых файлов без пересжатия: {result['stored_raw']}
+**Размер:** {result['size'] / 1024 / 1024:.2f} МБ, томов: {result['volumes']}
+**Путь:** {result['path']}
 **Время:** {datetime.now().strftime("%d.%m.%Y %H:%M:%S")}
 
 ✅ Резервная копия успешно создана!
-        """
+    """
+    
+    await query.edit_message_text(
+        backup_text.strip(),
+        reply_markup=backup_keyboard(backup_name),
+        parse_mode='Markdown'
+    )
+
+def backup_keyboard(backup_name: str, download_text: str = "📁 Скачать бэкап") -> InlineKeyboardMarkup:
+    """Кнопки действий с готовым бэкапом"""
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(download_text, callback_data=f"backup_download_{backup_name}")],
+        [InlineKeyboardButton("🔍 Проверить тома", callback_data=f"backup_verify_{backup_name}")],
+        [InlineKeyboardButton("🗑️ Удалить бэкап", callback_data=f"backup_delete_{backup_name}")],
+        [InlineKeyboardButton("⬅️ Назад", callback_data="server_status")]
+    ])
+
+async def start_backup_delivery(query, context: ContextTypes.DEFAULT_TYPE, backup_manager, backup_name: str, chat_id: int):
+    """Запуск отправки томов бэкапа фоновой задачей"""
+    if (backup_name, chat_id) in backup_manager.deliveries:
+        await query.answer("⏳ Бэкап уже отправляется")
+        return
+    if not backup_manager.get_backup_path(backup_name):
+        await query.answer("❌ Файл бэкапа не найден")
+        return
+    
+    await query.answer("📁 Отправка бэкапа...")
+    backup_manager.deliveries.add((backup_name, chat_id))
+    context.application.create_task(deliver_backup(query, context.bot, backup_manager, backup_name, chat_id))
+
+async def deliver_backup(query, bot, backup_manager, backup_name: str, chat_id: int):
+    """Последовательная отправка томов бэкапа
+    
+    Каждый отправленный том отмечается у менеджера бэкапов, поэтому после
+    сбоя повторное нажатие "Скачать" продолжает с первого неотправленного
+    тома. После последнего тома отправляется индекс для сборки и проверки.
+    """
+    number = 0
+    total = 0
+    try:
+        volumes = await asyncio.to_thread(backup_manager.get_backup_volumes, backup_name)
+        delivered = set(backup_manager.get_delivered_volumes(backup_name, chat_id))
+        total = len(volumes)
         
-        # Создаем кнопки
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("📁 Скачать бэкап", callback_data=f"backup_download_{backup_name}")],
-            [InlineKeyboardButton("🗑️ Удалить бэкап", callback_data=f"backup_delete_{backup_name}")],
-            [InlineKeyboardButton("⬅️ Назад", callback_data="server_status")]
-        ])
+        for number, volume in enumerate(volumes, 1):
+            if number in delivered:
+                continue
+            await query.edit_message_text(
+                f"📤 Отправка бэкапа {backup_name}\n\n"
+                f"Том {number}/{total} ({volume['size'] / 1024 / 1024:.1f} МБ), "
+                f"отправлено: {len(delivered)}/{total}"
+            )
+            data = await asyncio.to_thread(_read_file, volume["path"])
+            await bot.send_document(
+                chat_id=chat_id,
+                document=data,
+                filename=volume["file"],
+                caption=f"💾 {backup_name}: том {number}/{total}",
+                read_timeout=120,
+                write_timeout=600
+            )
+            delivered.add(number)
+            await asyncio.to_thread(backup_manager.mark_volume_delivered, backup_name, chat_id, number)
+        
+        index_path = backup_manager.get_volume_index_path(backup_name)
+        if total > 1 and index_path:
+            data = await asyncio.to_thread(_read_file, index_path)
+            await bot.send_document(
+                chat_id=chat_id,
+                document=data,
+                filename=os.path.basename(index_path),
+                caption=(
+                    "🧩 Индекс томов. Сборка с проверкой:\n"
+                    f"python -m modules.backup_engine join {os.path.basename(index_path)}"
+                )
+            )
         
+        # Отправка завершена: следующее нажатие "Скачать" начнет заново
+        await asyncio.to_thread(backup_manager.mark_volume_delivered, backup_name, chat_id, None)
         await query.edit_message_text(
-            backup_text.strip(),
-            reply_markup=keyboard,
-            parse_mode='Markdown'
+            f"✅ Бэкап {backup_name} отправлен, томов: {total}",
+            reply_markup=backup_keyboard(backup_name)
         )
+    except Exception as e:
+        logger.error(f"Ошибка отправки бэкапа {backup_name} (том {number}/{total}): {e}")
+        try:
+            await query.edit_message_text(
+                f"❌ Отправка бэкапа прервана на томе {number}/{total}: {str(e)}\n\n"
+                "Уже отправленные тома повторно не отправляются.",
+                reply_markup=backup_keyboard(backup_name, download_text="▶️ Продолжить отправку")
+            )
+        except Exception:
+            pass
+    finally:
+        backup_manager.deliveries.discard((backup_name, chat_id))
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+async def create_backup(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Создать резервную копию данных"""
+    query = update.callback_query
+    
+    try:
+        # Упаковка идет в отдельном процессе, бот продолжает отвечать
+        await start_backup(query, context, context.bot_data["backup_manager"])
         
     except Exception as e:
         await query.answer(f"❌ Ошибка создания бэкапа: {str(e)}") 
\ No newline at end of file
@@ -0,0 +1,227 @@
+from telegram.error import BadRequest, Forbidden, RetryAfter
+from collections import deque
+from typing import Dict, Any, Optional, Callable, Awaitable, List
+import logging
+import asyncio
+import time
+
+logger = logging.getLogger(__name__)
+
+class UploadQueue:
+    """Очередь загрузок в хранилище с ограниченным пулом воркеров
+
+    Обработчик сообщения только ставит файл в очередь и сразу возвращается,
+    поэтому пачка пересланных файлов не обрабатывается строго по одному
+    внутри апдейтов. Файлы скачивают workers воркеров; у одного
+    пользователя одновременно обрабатывается не больше per_user_limit
+    файлов, а пользователи обслуживаются по кругу, чтобы большая пачка
+    одного не задерживала остальных.
+
+    На пачку пользователя заводится одно сообщение о ходе загрузки; оно
+    правится по мере завершения файлов не чаще min_edit_interval.
+    """
+
+    MAX_RESULT_LINES = 15
+
+    def __init__(self, process: Callable[..., Awaitable[Dict[str, Any]]], workers: int = 3,
+                 per_user_limit: int = 2, min_edit_interval: float = 2.0):
+        # process(context, telegram_file_id, user_id, file_name) -> {"success", ...}
+        self.process = process
+        self.workers = max(1, workers)
+        self.per_user_limit = max(1, per_user_limit)
+        self.min_edit_interval = min_edit_interval
+        # user_id -> задания, ожидающие воркера
+        self.pending: Dict[int, deque] = {}
+        # user_id -> число выполняемых заданий
+        self.active: Dict[int, int] = {}
+        # user_id -> текущая пачка и ее сообщение о ходе загрузки
+        self.batches: Dict[int, Dict[str, Any]] = {}
+        # Очередь пользователей для обслуживания по кругу
+        self.order: deque = deque()
+        self._cond: Optional[asyncio.Condition] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def _ensure_started(self):
+        if self._tasks:
+            return
+        self._cond = asyncio.Condition()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def submit(self, update, context, telegram_file_id: str, file_name: str) -> None:
+        """Постановка файла в очередь загрузки"""
+        self._ensure_started()
+        user_id = update.effective_user.id
+        job = {"context": context, "file_id": telegram_file_id, "file_name": file_name}
+
+        batch = self.batches.get(user_id)
+        if batch is None:
+            batch = {
+                "total": 0,
+                "done": 0,
+                "failed": 0,
+                "lines": deque(maxlen=self.MAX_RESULT_LINES),
+                "message": None,
+                "last_edit": 0.0,
+                "edit_task": None
+            }
+            self.batches[user_id] = batch
+        batch["total"] += 1
+
+        async with self._cond:
+            if user_id not in self.pending:
+                self.pending[user_id] = deque()
+                self.order.append(user_id)
+            self.pending[user_id].append(job)
+            self._cond.notify()
+
+        if batch["total"] == 1:
+            try:
+                batch["message"] = await update.message.reply_text(self._render(batch))
+                batch["last_edit"] = time.monotonic()
+                batch["last_text"] = batch["message"].text
+            except Exception as e:
+                logger.error(f"Не удалось отправить сообщение о загрузке: {e}")
+                return
+            if self.batches.get(user_id) is not batch or batch["done"]:
+                # Файлы успели обработаться, пока отправлялось сообщение
+                self._schedule_edit(user_id, batch)
+        else:
+            self._schedule_edit(user_id, batch)
+
+    def queue_size(self, user_id: Optional[int] = None) -> int:
+        """Число файлов в очереди (всего или у пользователя)"""
+        if user_id is not None:
+            return len(self.pending.get(user_id, ()))
+        return sum(len(jobs) for jobs in self.pending.values())
+
+    async def _next_job(self):
+        """Следующее задание: пользователи по кругу с учетом лимита на пользователя"""
+        async with self._cond:
+            while True:
+                for _ in range(len(self.order)):
+                    user_id = self.order[0]
+                    self.order.rotate(-1)
+                    if self.pending[user_id] and self.active.get(user_id, 0) < self.per_user_limit:
+                        self.active[user_id] = self.active.get(user_id, 0) + 1
+                        return user_id, self.pending[user_id].popleft()
+                await self._cond.wait()
+
+    async def _job_done(self, user_id: int):
+        async with self._cond:
+            self.active[user_id] -= 1
+            if self.active[user_id] <= 0:
+                del self.active[user_id]
+                if not self.pending.get(user_id):
+                    self.pending.pop(user_id, None)
+                    self.order.remove(user_id)
+            self._cond.notify_all()
+
+    async def _worker(self, index: int):
+        while True:
+            user_id, job = await self._next_job()
+            try:
+                try:
+                    result = await self.process(job["context"], job["file_id"], user_id, job["file_name"])
+                except Exception as e:
+                    logger.error(f"Ошибка загрузки файла {job['file_name']}: {e}")
+                    result = {"success": False, "message": "❌ Произошла ошибка при обработке файла"}
+                self._record(user_id, job, result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ошибка воркера загрузки {index}: {e}")
+            finally:
+                await self._job_done(user_id)
+
+    def _record(self, user_id: int, job: Dict[str, Any], result: Dict[str, Any]):
+        batch = self.batches.get(user_id)
+        if batch is None:
+            return
+        batch["done"] += 1
+        if result.get("success"):
+            batch["lines"].append(
+                f"✅ {job['file_name']} — {result['size']} байт, ID: {result['file_id']}"
+            )
+        else:
+            batch["failed"] += 1
+            message = result.get("message", "").removeprefix("❌ ")
+            batch["lines"].append(f"❌ {job['file_name']}: {message}")
+
+        if batch["done"] >= batch["total"]:
+            # Пачка завершена: следующие файлы начнут новое сообщение
+            del self.batches[user_id]
+            if batch["edit_task"]:
+                batch["edit_task"].cancel()
+            asyncio.create_task(self._edit(batch))
+        else:
+            self._schedule_edit(user_id, batch)
+
+    def _schedule_edit(self, user_id: int, batch: Dict[str, Any]):
+        """Отложенная правка: серия завершений превращается в одну правку"""
+        if batch["message"] is None or (batch["edit_task"] and not batch["edit_task"].done()):
+            return
+        delay = max(0.0, batch["last_edit"] + self.min_edit_interval - time.monotonic())
+        batch["edit_task"] = asyncio.create_task(self._delayed_edit(batch, delay))
+
+    async def _delayed_edit(self, batch: Dict[str, Any], delay: float):
+        try:
+            await asyncio.sleep(delay)
+            await self._edit(batch)
+        except asyncio.CancelledError:
+            pass
+
+    async def _edit(self, batch: Dict[str, Any]):
+        message = batch["message"]
+        if message is None:
+            return
+        text = self._render(batch)
+        if text == batch.get("last_text"):
+            return
+        batch["last_edit"] = time.monotonic()
+        try:
+            await message.edit_text(text)
+            batch["last_text"] = text
+        except RetryAfter as e:
+            retry_after = e.retry_after
+            if hasattr(retry_after, "total_seconds"):
+                retry_after = retry_after.total_seconds()
+            await asyncio.sleep(float(retry_after))
+            await self._edit(batch)
+        except BadRequest as e:
+            if "message is not modified" not in str(e).lower():
+                logger.warning(f"Не удалось обновить сообщение о загрузке: {e}")
+        except Forbidden:
+            batch["message"] = None
+        except Exception as e:
+            logger.error(f"Ошибка обновления сообщения о загрузке: {e}")
+
+    def _render(self, batch: Dict[str, Any]) -> str:
+        total = batch["total"]
+        done = batch["done"]
+        if done >= total:
+            header = f"📦 Загрузка завершена: {done - batch['failed']}/{total} успешно"
+        else:
+            header = f"📥 Загрузка файлов: {done}/{total}"
+        lines = list(batch["lines"])
+        hidden = done - len(lines)
+        if hidden > 0:
+            lines.insert(0, f"… и еще {hidden}")
+        return "\n".join([header] + lines) if lines else header
+
+    async def shutdown(self):
+        """Остановка воркеров; незавершенные задания отбрасываются"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        for batch in self.batches.values():
+            if batch["edit_task"]:
+                batch["edit_task"].cancel()
+        self.batches.clear()
+        self.pending.clear()
+        self.active.clear()
+        self.order.clear()
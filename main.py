@@ -13,6 +13,7 @@ from modules.cloud_storage import CloudStorage
 from modules.notification import NotificationManager
 from modules.ai_assistant import AIAssistant
 from modules.security_monitor import SecurityMonitor
+from modules.backup_engine import BackupManager
 from simple_analytics import SimpleAnalytics
 
 # Импорт обработчиков команд
@@ -47,6 +48,7 @@ role_manager = RoleManager(config)
 system_monitor = SystemMonitor(config, role_manager)
 process_manager = ProcessManager(config, role_manager)
 cloud_storage = CloudStorage(config, role_manager)
+backup_manager = BackupManager(config)
 
 # Инициализация новых модулей
 ai_assistant = AIAssistant(config, role_manager, system_monitor, process_manager, None)  # notification_manager будет инициализирован позже
@@ -55,7 +57,27 @@ analytics = SimpleAnalytics()
 
 # Основная функция запуска
 def main():
-    application = Application.builder().token(config['bot_token']).build()
+    # Фоновые задачи, которым нужен работающий event loop
+    async def on_startup(app: Application):
+        # Общий сборщик метрик: обработчики читают готовый замер
+        system_monitor.start_sampler()
+        # Буфер аналитики сбрасывается по таймеру, а не только при новом событии
+        analytics.start_flusher()
+
+    async def on_shutdown(app: Application):
+        await system_monitor.stop_sampler()
+        await analytics.stop_flusher()
+        # Боты под надзором останавливаются штатно (SIGTERM)
+        await process_manager.shutdown()
+        await file_handlers.upload_queue.shutdown()
+
+    application = (
+        Application.builder()
+        .token(config['bot_token'])
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        .build()
+    )
 
     # Инициализация менеджера уведомлений (передаем application.bot)
     notification_manager = NotificationManager(config, role_manager, application.bot)
@@ -65,7 +87,9 @@ def main():
     security_monitor.notification_manager = notification_manager
 
     # Инициализация обработчиков
-    callback_handlers = CallbackHandlers(role_manager, system_monitor, process_manager, cloud_storage, notification_manager, analytics)
+    callback_handlers = CallbackHandlers(role_manager, system_monitor, process_manager, cloud_storage, notification_manager, analytics,
+                                         backup_manager=backup_manager)
+    application.bot_data["backup_manager"] = backup_manager
     file_handlers = FileHandlers(cloud_storage, role_manager)
 
     # Обработчик команды /start с интерактивным меню
@@ -3,8 +3,8 @@ import json
 import asyncio
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
-import re
 from pathlib import Path
+from modules.threat_signatures import get_signature_matcher
 
 class AIAssistant:
     """Модуль ИИ-ассистента для автоматизации и умных рекомендаций"""
@@ -28,6 +28,9 @@ class AIAssistant:
         self.recommendations = []
         self.system_patterns = {}
         
+        # Сигнатуры угроз (общие с мониторингом безопасности)
+        self.signatures = get_signature_matcher(config)
+        
     async def analyze_system_health(self, user_id: int) -> Dict[str, Any]:
         """Анализ здоровья системы и генерация рекомендаций"""
         if not await self.role_manager.check_permission(user_id, "system", "view"):
@@ -209,20 +212,15 @@ class AIAssistant:
                     })
                 
                 # Подозрительные имена процессов
-                suspicious_patterns = [
-                    r"crypto", r"miner", r"botnet", r"malware", r"virus",
-                    r"\.exe$", r"\.bat$", r"\.scr$", r"\.com$"
-                ]
-                
-                for pattern in suspicious_patterns:
-                    if re.search(pattern, proc["name"], re.IGNORECASE):
-                        analysis["suspicious_processes"].append({
-                            "pid": proc["pid"],
-                            "name": proc["name"],
-                            "pattern": pattern,
-                            "risk_level": "high"
-                        })
-                        break
+                signature = self.signatures.match(proc["name"], field="name")
+                if signature:
+                    analysis["suspicious_processes"].append({
+                        "pid": proc["pid"],
+                        "name": proc["name"],
+                        "pattern": signature["pattern"],
+                        "category": signature["category"],
+                        "risk_level": signature["severity"]
+                    })
             
             # Генерация рекомендаций
             if analysis["resource_hogs"]:
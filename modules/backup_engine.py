@@ -0,0 +1,470 @@
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import sys
+import tarfile
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable, Awaitable, List
+from modules.backup_writer import (
+    ARCHIVE_SUFFIXES, COMPRESSED_EXTENSIONS, VolumeWriter, is_precompressed, join_volumes,
+    open_compressor, read_volume_index, resolve_codec, verify_volumes
+)
+
+MANIFEST_NAME = "manifest.json"
+ARCHIVE_MANIFEST = "backup_manifest.json"
+VOLUMES_SUFFIX = ".volumes.json"
+DELIVERY_SUFFIX = ".delivery.json"
+# Лимит Bot API на отправку файла - 50 МБ; том берется с запасом
+DEFAULT_VOLUME_SIZE = 45 * 1024 * 1024
+
+def backup_exists(backup_dir: str, backup_name: str) -> bool:
+    """Бэкап на месте: есть индекс томов (или одиночный архив старого формата)"""
+    path = os.path.join(backup_dir, backup_name)
+    return os.path.exists(path + VOLUMES_SUFFIX) or os.path.isfile(path)
+
+def _write_json(path: str, data: Dict[str, Any]):
+    """Атомарная запись JSON"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class _HashingReader:
+    """Чтение файла с подсчетом SHA-256 и прогресса (для tarfile.addfile)"""
+
+    def __init__(self, fileobj, on_read: Callable[[int], None]):
+        self.fileobj = fileobj
+        self.digest = hashlib.sha256()
+        self.on_read = on_read
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.fileobj.read(size)
+        self.digest.update(data)
+        self.on_read(len(data))
+        return data
+
+class BackupEngine:
+    """Инкрементальное резервное копирование (выполняется в отдельном процессе)
+
+    Манифест backup_dir/manifest.json хранит для каждого файла размер,
+    mtime_ns, SHA-256 и имя бэкапа, в котором лежит его актуальная версия.
+    Инкрементальный бэкап упаковывает только файлы с другим размером или
+    mtime и записывает список удаленных; полный - все файлы. Каталог
+    бэкапов и временные каталоги в архив не попадают.
+
+    Архив пишется потоковым tar через сжимающую обертку (параллельный
+    gzip или zstd); уже сжатые файлы сохраняются без повторного сжатия.
+    Сжатый поток режется на тома по volume_size байт, рядом кладется
+    индекс <имя>.volumes.json с SHA-256 томов; индекс пишется последним,
+    поэтому бэкап без индекса считается незавершенным.
+    """
+
+    def __init__(self, options: Dict[str, Any], progress: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.backup_dir = os.path.abspath(options.get("path", "storage/backups"))
+        self.sources: List[str] = options.get("sources", ["storage", "logs", "config.json"])
+        self.exclude = [os.path.abspath(path) for path in options.get("exclude", [])] + [self.backup_dir]
+        self.full_every = options.get("full_every", 7)
+        self.options = options
+        self.codec = resolve_codec(options.get("codec", "gzip"))
+        self.level = options.get("level", 6 if self.codec == "gzip" else 3)
+        self.store_extensions = set(options.get("store_extensions", COMPRESSED_EXTENSIONS))
+        self.volume_size = options.get("volume_size", DEFAULT_VOLUME_SIZE)
+        self.progress = progress or (lambda event: None)
+        self.progress_interval = 0.5
+        self._last_progress = 0.0
+
+    def _excluded(self, path: str) -> bool:
+        path = os.path.abspath(path)
+        return any(path == excluded or path.startswith(excluded + os.sep) for excluded in self.exclude)
+
+    def scan(self) -> Dict[str, os.stat_result]:
+        """Обход источников: относительный путь -> stat обычного файла"""
+        files = {}
+        for source in self.sources:
+            if not os.path.exists(source) or self._excluded(source):
+                continue
+            if os.path.isfile(source):
+                files[os.path.normpath(source)] = os.stat(source)
+                continue
+            for root, dirs, names in os.walk(source):
+                dirs[:] = [d for d in dirs if not self._excluded(os.path.join(root, d))]
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path, follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if not os.path.isfile(path) or os.path.islink(path):
+                        continue
+                    files[os.path.normpath(path)] = st
+        return files
+
+    def load_manifest(self) -> Dict[str, Any]:
+        """Манифест последнего состояния; записи из удаленных бэкапов отбрасываются"""
+        manifest_path = os.path.join(self.backup_dir, MANIFEST_NAME)
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {"files": {}, "since_full": None}
+
+        present = {}
+        for name in {entry["backup"] for entry in manifest.get("files", {}).values()}:
+            present[name] = backup_exists(self.backup_dir, name)
+        manifest["files"] = {
+            path: entry for path, entry in manifest.get("files", {}).items() if present[entry["backup"]]
+        }
+        return manifest
+
+    def _save_manifest(self, manifest: Dict[str, Any]):
+        _write_json(os.path.join(self.backup_dir, MANIFEST_NAME), manifest)
+
+    def _emit(self, event: Dict[str, Any], force: bool = False):
+        now = time.monotonic()
+        if force or now - self._last_progress >= self.progress_interval:
+            self._last_progress = now
+            self.progress(event)
+
+    def run(self, full: bool = False) -> Dict[str, Any]:
+        """Создание бэкапа; возвращает сводку"""
+        os.makedirs(self.backup_dir, exist_ok=True)
+        manifest = self.load_manifest()
+        since_full = manifest.get("since_full")
+        if since_full is None or since_full + 1 >= self.full_every:
+            full = True
+        previous = {} if full else manifest["files"]
+
+        self._emit({"event": "progress", "phase": "scan"}, force=True)
+        current = self.scan()
+
+        changed = [
+            path for path, st in current.items()
+            if path not in previous
+            or previous[path]["size"] != st.st_size
+            or previous[path]["mtime_ns"] != st.st_mtime_ns
+        ]
+        deleted = sorted(set(previous) - set(current))
+
+        if not changed and not deleted:
+            return {"success": True, "unchanged": True, "type": "incremental", "files": 0, "deleted": 0}
+
+        backup_type = "full" if full else "incremental"
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        backup_name = f"backup_{timestamp}_{backup_type[:4]}{ARCHIVE_SUFFIXES[self.codec]}"
+        backup_path = os.path.join(self.backup_dir, backup_name)
+
+        bytes_total = sum(current[path].st_size for path in changed)
+        state = {"bytes_done": 0, "files_done": 0}
+
+        def on_read(count: int):
+            state["bytes_done"] += count
+            self._emit({
+                "event": "progress",
+                "phase": "pack",
+                "files_done": state["files_done"],
+                "files_total": len(changed),
+                "bytes_done": state["bytes_done"],
+                "bytes_total": bytes_total
+            })
+
+        archive_manifest = {
+            "name": backup_name,
+            "type": backup_type,
+            "created": datetime.now().isoformat(),
+            "base": None if full else manifest.get("last_backup"),
+            "files": {},
+            "deleted": deleted
+        }
+        output = VolumeWriter(backup_path, self.volume_size)
+        try:
+            compressor = open_compressor(output, {**self.options, "codec": self.codec, "level": self.level})
+            try:
+                stored_raw = self._write_tar(compressor, changed, archive_manifest, on_read, state)
+            finally:
+                compressor.close()
+            volume_index = output.finish()
+            _write_json(backup_path + VOLUMES_SUFFIX, volume_index)
+        except BaseException:
+            output.abort()
+            raise
+
+        files = {} if full else dict(manifest["files"])
+        for path in deleted:
+            files.pop(path, None)
+        new_entries = archive_manifest["files"]
+        files.update(new_entries)
+        self._save_manifest({
+            "files": files,
+            "last_backup": backup_name,
+            "since_full": 0 if full else since_full + 1
+        })
+
+        return {
+            "success": True,
+            "unchanged": False,
+            "name": backup_name,
+            "path": backup_path,
+            "type": backup_type,
+            "codec": self.codec,
+            "files": len(new_entries),
+            "stored_raw": stored_raw,
+            "deleted": len(deleted),
+            "bytes": state["bytes_done"],
+            "size": volume_index["size"],
+            "volumes": len(volume_index["volumes"])
+        }
+
+    def _write_tar(self, compressor, changed: List[str], archive_manifest: Dict[str, Any],
+                   on_read: Callable[[int], None], state: Dict[str, int]) -> int:
+        """Запись tar-потока в compressor; возвращает число файлов без сжатия
+
+        Записи об упакованных файлах добавляются в archive_manifest["files"],
+        сам манифест кладется последним членом архива.
+        """
+        stored_raw = 0
+        with tarfile.open(fileobj=compressor, mode="w|") as tar:
+            for path in changed:
+                try:
+                    with open(path, 'rb') as f:
+                        st = os.fstat(f.fileno())
+                        raw = is_precompressed(path, self.store_extensions)
+                        compressor.set_level(0 if raw else self.level)
+                        tarinfo = tar.gettarinfo(arcname=path, fileobj=f)
+                        reader = _HashingReader(f, on_read)
+                        tar.addfile(tarinfo, reader)
+                except FileNotFoundError:
+                    # Файл удален во время бэкапа
+                    continue
+                stored_raw += raw
+                archive_manifest["files"][path] = {
+                    "size": tarinfo.size,
+                    "mtime_ns": st.st_mtime_ns,
+                    "sha256": reader.digest.hexdigest(),
+                    "backup": archive_manifest["name"]
+                }
+                state["files_done"] += 1
+
+            compressor.set_level(self.level)
+            data = json.dumps(archive_manifest, ensure_ascii=False, indent=2).encode('utf-8')
+            tarinfo = tarfile.TarInfo(ARCHIVE_MANIFEST)
+            tarinfo.size = len(data)
+            tarinfo.mtime = int(time.time())
+            tar.addfile(tarinfo, io.BytesIO(data))
+        return stored_raw
+
+class BackupManager:
+    """Запуск BackupEngine в отдельном процессе и работа с готовыми бэкапами
+
+    Упаковка идет в дочернем процессе python -m modules.backup_engine,
+    который пишет в stdout JSON-строки прогресса; event loop бота только
+    читает их. Одновременно выполняется не больше одного бэкапа.
+    """
+
+    def __init__(self, config: dict):
+        self.options = {
+            "path": "storage/backups",
+            "sources": ["storage", "logs", "config.json"],
+            "exclude": ["storage/temp", "storage/blobs/tmp"],
+            "full_every": 7,
+            "codec": "gzip",
+            "threads": 0,
+            "volume_size": DEFAULT_VOLUME_SIZE
+        }
+        # Уже сжатые типы из разрешенных в хранилище сохраняются без сжатия
+        allowed = config.get("storage", {}).get("allowed_extensions")
+        self.options["store_extensions"] = sorted(
+            COMPRESSED_EXTENSIONS & set(allowed) if allowed else COMPRESSED_EXTENSIONS
+        )
+        self.options.update(config.get("backup", {}))
+        self.backup_dir = self.options["path"]
+        self.logger = logging.getLogger(__name__)
+        self._lock = asyncio.Lock()
+        # (бэкап, chat_id) отправляемых сейчас бэкапов
+        self.deliveries = set()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    async def create_backup(self, full: bool = False,
+                            on_progress: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None) -> Dict[str, Any]:
+        """Создание бэкапа в дочернем процессе с передачей прогресса"""
+        if self._lock.locked():
+            return {"success": False, "message": "❌ Бэкап уже выполняется"}
+
+        async with self._lock:
+            args = [sys.executable, "-m", "modules.backup_engine", "create", "--options", json.dumps(self.options)]
+            if full:
+                args.append("--full")
+            process = await asyncio.create_subprocess_exec(
+                *args,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=os.getcwd()
+            )
+
+            result = None
+            try:
+                async for line in process.stdout:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue
+                    if event.get("event") == "progress":
+                        if on_progress:
+                            try:
+                                await on_progress(event)
+                            except Exception as e:
+                                self.logger.debug(f"Ошибка обработчика прогресса бэкапа: {e}")
+                    elif event.get("event") in ("done", "error"):
+                        result = event
+                stderr = await process.stderr.read()
+                await process.wait()
+            except asyncio.CancelledError:
+                process.kill()
+                await process.wait()
+                raise
+
+            if result is None or result.get("event") == "error":
+                message = (result or {}).get("message") or stderr.decode(errors='replace').strip()[-500:]
+                self.logger.error(f"Ошибка создания бэкапа: {message}")
+                return {"success": False, "message": f"❌ Ошибка создания бэкапа: {message}"}
+
+            result.pop("event", None)
+            if not result.get("unchanged"):
+                self.logger.info(f"Бэкап {result['name']} создан ({result['type']}, файлов: {result['files']})")
+            return result
+
+    def get_backup_path(self, backup_name: str) -> Optional[str]:
+        """Путь к бэкапу по имени (только внутри каталога бэкапов)"""
+        if os.path.basename(backup_name) != backup_name or backup_name in ("", ".", ".."):
+            return None
+        if not backup_exists(self.backup_dir, backup_name):
+            return None
+        return os.path.join(self.backup_dir, backup_name)
+
+    def get_backup_volumes(self, backup_name: str) -> List[Dict[str, Any]]:
+        """Тома бэкапа по порядку: {"path", "file", "size", "sha256"}
+
+        Для одиночного архива без индекса (старый формат) - один том без хэша.
+        """
+        path = self.get_backup_path(backup_name)
+        if not path:
+            return []
+        if not os.path.exists(path + VOLUMES_SUFFIX):
+            return [{"path": path, "file": backup_name, "size": os.path.getsize(path), "sha256": None}]
+        index = read_volume_index(path + VOLUMES_SUFFIX)
+        return [
+            {**volume, "path": os.path.join(self.backup_dir, volume["file"])}
+            for volume in index["volumes"]
+        ]
+
+    def get_volume_index_path(self, backup_name: str) -> Optional[str]:
+        path = self.get_backup_path(backup_name)
+        if path and os.path.exists(path + VOLUMES_SUFFIX):
+            return path + VOLUMES_SUFFIX
+        return None
+
+    def verify_backup(self, backup_name: str) -> Dict[str, Any]:
+        """Проверка томов бэкапа по SHA-256 (читает все тома - вызывать в потоке)"""
+        index_path = self.get_volume_index_path(backup_name)
+        if not index_path:
+            return {"ok": False, "volumes": 0, "problems": ["нет индекса томов"]}
+        return verify_volumes(index_path)
+
+    def get_delivered_volumes(self, backup_name: str, chat_id: int) -> List[int]:
+        """Номера томов, уже отправленных в чат (для продолжения прерванной отправки)"""
+        path = self.get_backup_path(backup_name)
+        if not path:
+            return []
+        try:
+            with open(path + DELIVERY_SUFFIX, 'r', encoding='utf-8') as f:
+                return json.load(f).get(str(chat_id), [])
+        except (OSError, ValueError):
+            return []
+
+    def mark_volume_delivered(self, backup_name: str, chat_id: int, volume: Optional[int]):
+        """Отметка об отправке тома; volume=None сбрасывает отметки чата"""
+        path = self.get_backup_path(backup_name)
+        if not path:
+            return
+        try:
+            with open(path + DELIVERY_SUFFIX, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        if volume is None:
+            state.pop(str(chat_id), None)
+        else:
+            delivered = state.setdefault(str(chat_id), [])
+            if volume not in delivered:
+                delivered.append(volume)
+        _write_json(path + DELIVERY_SUFFIX, state)
+
+    def delete_backup(self, backup_name: str) -> bool:
+        """Удаление бэкапа со всеми томами; файлы из него попадут в следующий бэкап заново"""
+        path = self.get_backup_path(backup_name)
+        if not path:
+            return False
+        # Сначала индекс: без него бэкап уже считается удаленным
+        volumes = self.get_backup_volumes(backup_name)
+        for extra in (path + VOLUMES_SUFFIX, path + DELIVERY_SUFFIX):
+            if os.path.exists(extra):
+                os.remove(extra)
+        for volume in volumes:
+            if os.path.exists(volume["path"]):
+                os.remove(volume["path"])
+        return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Инкрементальный бэкап Sella-bot")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    create = subparsers.add_parser("create", help="создать бэкап")
+    create.add_argument("--options", default="{}", help="настройки бэкапа (JSON)")
+    create.add_argument("--full", action="store_true", help="полный бэкап")
+    verify = subparsers.add_parser("verify", help="проверить тома бэкапа по индексу")
+    verify.add_argument("index", help="файл <бэкап>.volumes.json рядом с томами")
+    join = subparsers.add_parser("join", help="собрать архив из томов с проверкой SHA-256")
+    join.add_argument("index", help="файл <бэкап>.volumes.json рядом с томами")
+    join.add_argument("output", nargs="?", help="путь архива (по умолчанию - имя бэкапа)")
+    args = parser.parse_args()
+
+    if args.command == "verify":
+        result = verify_volumes(args.index)
+        for problem in result["problems"]:
+            print(f"❌ {problem}")
+        if result["ok"]:
+            print(f"✅ Тома в порядке: {result['volumes']}")
+        sys.exit(0 if result["ok"] else 1)
+    if args.command == "join":
+        output = args.output or os.path.join(
+            os.path.dirname(os.path.abspath(args.index)), read_volume_index(args.index)["name"]
+        )
+        try:
+            result = join_volumes(args.index, output)
+        except (OSError, ValueError) as e:
+            print(f"❌ Ошибка сборки: {e}")
+            sys.exit(1)
+        print(f"✅ Архив собран: {result['path']} ({result['size']} байт)")
+        return
+
+    def emit(event: Dict[str, Any]):
+        print(json.dumps(event, ensure_ascii=False), flush=True)
+
+    try:
+        engine = BackupEngine(json.loads(args.options), progress=emit)
+        result = engine.run(full=args.full)
+        emit({"event": "done", **result})
+    except Exception as e:
+        emit({"event": "error", "message": str(e)})
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
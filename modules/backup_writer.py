@@ -0,0 +1,299 @@
+import gzip
+import hashlib
+import json
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterable, List
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Форматы, которые уже сжаты: повторное сжатие только тратит CPU
+COMPRESSED_EXTENSIONS = {
+    "jpg", "jpeg", "png", "gif", "webp", "mp4", "avi", "mkv", "mov", "wmv",
+    "mp3", "flac", "aac", "ogg", "zip", "rar", "7z", "gz", "bz2", "xz", "zst"
+}
+
+# Сигнатуры сжатых форматов: файлы в хранилище блобов лежат без расширения
+_MAGIC_PREFIXES = (
+    b"\xff\xd8\xff",            # JPEG
+    b"\x89PNG\r\n\x1a\n",       # PNG
+    b"GIF8",                    # GIF
+    b"PK\x03\x04",              # ZIP (и docx/xlsx)
+    b"Rar!\x1a\x07",            # RAR
+    b"7z\xbc\xaf\x27\x1c",      # 7z
+    b"\x1f\x8b",                # gzip
+    b"BZh",                     # bzip2
+    b"\xfd7zXZ\x00",            # xz
+    b"\x28\xb5\x2f\xfd",        # zstd
+    b"\x1a\x45\xdf\xa3",        # MKV/WebM
+    b"OggS",                    # OGG
+    b"fLaC",                    # FLAC
+    b"ID3",                     # MP3 с тегами
+    b"\xff\xfb", b"\xff\xf3",   # MP3
+)
+
+ARCHIVE_SUFFIXES = {"gzip": ".tar.gz", "zstd": ".tar.zst", "none": ".tar"}
+
+def is_precompressed(path: str, extensions: Iterable[str] = COMPRESSED_EXTENSIONS) -> bool:
+    """Уже сжатый файл: по расширению или по сигнатуре содержимого"""
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension and extension in extensions:
+        return True
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(16)
+    except OSError:
+        return False
+    if head.startswith(_MAGIC_PREFIXES):
+        return True
+    # MP4/MOV: "ftyp" после размера блока; WebP/AVI: контейнер RIFF
+    return head[4:8] == b"ftyp" or (head.startswith(b"RIFF") and head[8:12] in (b"WEBP", b"AVI "))
+
+class ChunkedGzipWriter:
+    """Параллельное gzip-сжатие потока
+
+    Поток режется на блоки по chunk_size, каждый блок сжимается в пуле
+    потоков отдельным gzip-членом (zlib отпускает GIL), члены пишутся
+    по порядку. Склейка gzip-членов - корректный gzip-файл, его читают
+    gzip, tar и tarfile. set_level() меняет уровень со следующего блока:
+    уровень 0 сохраняет уже сжатые данные почти без затрат CPU.
+    """
+
+    def __init__(self, fileobj, level: int = 6, threads: int = 0, chunk_size: int = 4 * 1024 * 1024):
+        self.fileobj = fileobj
+        self.level = level
+        self.chunk_size = chunk_size
+        self.threads = threads or os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(max_workers=self.threads)
+        self.pending: deque = deque()
+        self.buffer = bytearray()
+
+    def write(self, data) -> int:
+        self.buffer += data
+        while len(self.buffer) >= self.chunk_size:
+            chunk = bytes(self.buffer[:self.chunk_size])
+            del self.buffer[:self.chunk_size]
+            self._submit(chunk)
+        return len(data)
+
+    def set_level(self, level: int):
+        """Уровень сжатия для следующих данных"""
+        if level != self.level:
+            self._flush_buffer()
+            self.level = level
+
+    def _flush_buffer(self):
+        if self.buffer:
+            self._submit(bytes(self.buffer))
+            self.buffer.clear()
+
+    def _submit(self, chunk: bytes):
+        self.pending.append(self.executor.submit(gzip.compress, chunk, self.level, mtime=0))
+        # Ограничение памяти: не больше двух блоков на поток в очереди
+        while len(self.pending) > self.threads * 2:
+            self.fileobj.write(self.pending.popleft().result())
+
+    def flush(self):
+        pass
+
+    def close(self):
+        try:
+            self._flush_buffer()
+            while self.pending:
+                self.fileobj.write(self.pending.popleft().result())
+        finally:
+            self.executor.shutdown(wait=True)
+
+class ZstdWriter:
+    """Сжатие zstd с рабочими потоками библиотеки (нужен пакет zstandard)
+
+    Несжимаемые блоки zstd сам сохраняет как есть, поэтому set_level()
+    ничего не делает.
+    """
+
+    def __init__(self, fileobj, level: int = 3, threads: int = 0):
+        compressor = zstandard.ZstdCompressor(level=level, threads=threads or -1)
+        self.writer = compressor.stream_writer(fileobj, closefd=False)
+
+    def write(self, data) -> int:
+        return self.writer.write(data)
+
+    def set_level(self, level: int):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.writer.close()
+
+class PlainWriter:
+    """Без сжатия"""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+
+    def write(self, data) -> int:
+        return self.fileobj.write(data)
+
+    def set_level(self, level: int):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+def resolve_codec(codec: str) -> str:
+    """Кодек с учетом доступных библиотек: без zstandard - gzip"""
+    if codec == "zstd" and zstandard is None:
+        return "gzip"
+    return codec if codec in ARCHIVE_SUFFIXES else "gzip"
+
+def open_compressor(fileobj, options: Dict[str, Any]):
+    """Сжимающая обертка над fileobj по настройкам бэкапа (codec, level, threads, chunk_size)"""
+    codec = resolve_codec(options.get("codec", "gzip"))
+    threads = options.get("threads", 0)
+    if codec == "zstd":
+        return ZstdWriter(fileobj, level=options.get("level", 3), threads=threads)
+    if codec == "none":
+        return PlainWriter(fileobj)
+    return ChunkedGzipWriter(
+        fileobj,
+        level=options.get("level", 6),
+        threads=threads,
+        chunk_size=options.get("chunk_size", 4 * 1024 * 1024)
+    )
+
+class VolumeWriter:
+    """Запись архива томами не больше volume_size байт
+
+    Тома пишутся как <base>.001.part, <base>.002.part, ...; finish()
+    переименовывает их в <base>.001, ... (единственный том - просто
+    <base>) и возвращает размеры и SHA-256 томов и всего архива.
+    Тома - обычная нарезка байтов: cat <base>.* > <base> тоже собирает архив.
+    """
+
+    def __init__(self, base_path: str, volume_size: int = 0):
+        self.base_path = base_path
+        self.volume_size = volume_size
+        self.volumes: List[Dict[str, Any]] = []
+        self.total_digest = hashlib.sha256()
+        self.total_size = 0
+        self._file = None
+        self._digest = None
+        self._size = 0
+
+    def _part_path(self, index: int) -> str:
+        return f"{self.base_path}.{index:03d}.part"
+
+    def _open_next(self):
+        self._close_current()
+        self.volumes.append({"part": self._part_path(len(self.volumes) + 1)})
+        self._file = open(self.volumes[-1]["part"], 'wb')
+        self._digest = hashlib.sha256()
+        self._size = 0
+
+    def _close_current(self):
+        if self._file:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+            self.volumes[-1].update({"size": self._size, "sha256": self._digest.hexdigest()})
+
+    def write(self, data) -> int:
+        view = memoryview(data)
+        while view:
+            if self._file is None or (self.volume_size and self._size >= self.volume_size):
+                self._open_next()
+            room = self.volume_size - self._size if self.volume_size else len(view)
+            piece = view[:room]
+            self._file.write(piece)
+            self._digest.update(piece)
+            self.total_digest.update(piece)
+            self._size += len(piece)
+            self.total_size += len(piece)
+            view = view[len(piece):]
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def finish(self) -> Dict[str, Any]:
+        """Завершение записи: тома получают итоговые имена"""
+        if self._file is None and not self.volumes:
+            self._open_next()
+        self._close_current()
+        single = len(self.volumes) == 1
+        for index, volume in enumerate(self.volumes, 1):
+            path = self.base_path if single else f"{self.base_path}.{index:03d}"
+            os.replace(volume.pop("part"), path)
+            volume["file"] = os.path.basename(path)
+        return {
+            "name": os.path.basename(self.base_path),
+            "volumes": self.volumes,
+            "size": self.total_size,
+            "sha256": self.total_digest.hexdigest()
+        }
+
+    def abort(self):
+        """Удаление недописанных томов"""
+        if self._file:
+            self._file.close()
+            self._file = None
+        for volume in self.volumes:
+            if "part" in volume and os.path.exists(volume["part"]):
+                os.remove(volume["part"])
+
+def read_volume_index(index_path: str) -> Dict[str, Any]:
+    with open(index_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def verify_volumes(index_path: str, chunk_size: int = 1024 * 1024) -> Dict[str, Any]:
+    """Проверка томов по индексу: наличие, размер и SHA-256 каждого и всего архива"""
+    index = read_volume_index(index_path)
+    directory = os.path.dirname(os.path.abspath(index_path))
+    total_digest = hashlib.sha256()
+    problems = []
+    for volume in index["volumes"]:
+        path = os.path.join(directory, volume["file"])
+        if not os.path.exists(path):
+            problems.append(f"{volume['file']}: нет файла")
+            continue
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+                total_digest.update(chunk)
+        if os.path.getsize(path) != volume["size"] or digest.hexdigest() != volume["sha256"]:
+            problems.append(f"{volume['file']}: поврежден")
+    if not problems and total_digest.hexdigest() != index["sha256"]:
+        problems.append("контрольная сумма архива не совпадает")
+    return {"ok": not problems, "volumes": len(index["volumes"]), "problems": problems}
+
+def join_volumes(index_path: str, output_path: str, chunk_size: int = 1024 * 1024) -> Dict[str, Any]:
+    """Сборка архива из томов с проверкой SHA-256"""
+    index = read_volume_index(index_path)
+    directory = os.path.dirname(os.path.abspath(index_path))
+    digest = hashlib.sha256()
+    tmp_path = output_path + ".part"
+    try:
+        with open(tmp_path, 'wb') as out:
+            for volume in index["volumes"]:
+                with open(os.path.join(directory, volume["file"]), 'rb') as f:
+                    for chunk in iter(lambda: f.read(chunk_size), b""):
+                        digest.update(chunk)
+                        out.write(chunk)
+        if digest.hexdigest() != index["sha256"]:
+            raise ValueError("контрольная сумма собранного архива не совпадает")
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {"path": output_path, "size": index["size"]}
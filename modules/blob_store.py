@@ -0,0 +1,156 @@
+import hashlib
+import logging
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+class HashingWriter:
+    """Файловая обертка, считающая SHA-256 и размер записываемых данных
+
+    Через нее пишется скачанное содержимое (напрямую или как приемник
+    telegram.File.download_to_memory): хэш готов сразу после записи,
+    повторно читать файл не нужно.
+    """
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data) -> int:
+        self.digest.update(data)
+        self.size += len(data)
+        return self.fileobj.write(data)
+
+    def flush(self):
+        self.fileobj.flush()
+
+    def hexdigest(self) -> str:
+        return self.digest.hexdigest()
+
+class BlobStore:
+    """Хранилище содержимого по SHA-256 (content-addressed)
+
+    Одинаковое содержимое хранится один раз: blobs/ab/cd/<sha256>.
+    Хэш считается во время потокового копирования во временный файл
+    рядом с хранилищем, затем файл атомарно переименовывается на место.
+    Подсчет ссылок ведут метаданные хранилища; здесь только файлы.
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.tmp_path = self.root / "tmp"
+        self.tmp_path.mkdir(parents=True, exist_ok=True)
+        self.logger = logging.getLogger(__name__)
+
+    def path_for(self, content_hash: str) -> Path:
+        """Путь блоба с разбиением по первым байтам хэша"""
+        return self.root / content_hash[:2] / content_hash[2:4] / content_hash
+
+    def exists(self, content_hash: str) -> bool:
+        return self.path_for(content_hash).exists()
+
+    def new_temp_path(self) -> Path:
+        """Временный файл на той же файловой системе, что и блобы"""
+        return self.tmp_path / uuid.uuid4().hex
+
+    def ingest(self, source_path: str, content_hash: Optional[str] = None, consume: bool = False) -> Dict[str, Any]:
+        """Помещение файла в хранилище: stage() + commit()
+
+        Возвращает {"hash", "size", "path", "created"}; created=False,
+        если такое содержимое уже хранилось.
+        """
+        staged = self.stage(source_path, content_hash=content_hash, consume=consume)
+        try:
+            return self.commit(staged["tmp"], staged["hash"], staged["size"])
+        finally:
+            self.discard(staged)
+
+    def stage(self, source_path: str, content_hash: Optional[str] = None, consume: bool = False) -> Dict[str, Any]:
+        """Подготовка файла к публикации - вся медленная работа с диском
+
+        consume=True: файл на той же файловой системе используется как есть
+        (далее os.replace без копирования), с другой файловой системы он
+        переносится во временную папку. Если content_hash известен
+        (посчитан при скачивании), файл не перечитывается.
+        Без consume файл копируется с вычислением SHA-256 за один проход.
+
+        Возвращает {"tmp", "hash", "size"} для commit(); после commit
+        (или отказа от него) вызывается discard().
+        """
+        if consume:
+            size = os.path.getsize(source_path)
+            content_hash = content_hash or self.hash_file(source_path)
+            if os.stat(source_path).st_dev == os.stat(self.tmp_path).st_dev:
+                return {"tmp": Path(source_path), "hash": content_hash, "size": size}
+            # Другая файловая система: копируем во временный файл рядом с блобами
+            tmp_file = self.new_temp_path()
+            try:
+                shutil.copyfile(source_path, tmp_file)
+            except Exception:
+                tmp_file.unlink(missing_ok=True)
+                raise
+            Path(source_path).unlink(missing_ok=True)
+            return {"tmp": tmp_file, "hash": content_hash, "size": size}
+
+        tmp_file = self.new_temp_path()
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(source_path, 'rb') as src, open(tmp_file, 'wb') as dst:
+                while True:
+                    chunk = src.read(self.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    dst.write(chunk)
+                    size += len(chunk)
+        except Exception:
+            tmp_file.unlink(missing_ok=True)
+            raise
+        return {"tmp": tmp_file, "hash": digest.hexdigest(), "size": size}
+
+    def discard(self, staged: Dict[str, Any]):
+        """Удаление подготовленного файла, если он не был опубликован"""
+        Path(staged["tmp"]).unlink(missing_ok=True)
+
+    def commit(self, tmp_file: Path, content_hash: str, size: int) -> Dict[str, Any]:
+        """Публикация файла с уже посчитанным хэшем (перемещение, без копирования)"""
+        blob_path = self.path_for(content_hash)
+        created = False
+        if blob_path.exists():
+            # Дубликат: содержимое уже есть
+            Path(tmp_file).unlink(missing_ok=True)
+        else:
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_file, blob_path)
+            created = True
+        return {"hash": content_hash, "size": size, "path": str(blob_path), "created": created}
+
+    def remove(self, content_hash: str) -> bool:
+        """Удаление блоба (когда на него не осталось ссылок)"""
+        blob_path = self.path_for(content_hash)
+        try:
+            blob_path.unlink()
+        except FileNotFoundError:
+            return False
+        # Пустые каталоги разбиения тоже убираем
+        for parent in (blob_path.parent, blob_path.parent.parent):
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+        return True
+
+    @staticmethod
+    def hash_file(path: str, chunk_size: Optional[int] = None) -> str:
+        """SHA-256 файла потоковым чтением"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size or BlobStore.CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import os
+import signal
+import time
+from typing import Dict, Any, Optional, Callable, Awaitable
+
+class BotSupervisor:
+    """Надзор за дочерними процессами ботов на asyncio
+
+    Запускает ботов через asyncio.create_subprocess_exec, для каждого
+    дочернего процесса держит задачу-наблюдатель, которая ждет его
+    завершения без блокировки event loop. При неожиданном завершении и
+    включенном auto_restart бот перезапускается с экспоненциальной
+    задержкой.
+    """
+
+    def __init__(self, config: dict, on_event: Optional[Callable[[str, str, Optional[int]], Awaitable[None]]] = None):
+        self.config = config  # секция "bots"
+        self.on_event = on_event
+        self.logger = logging.getLogger(__name__)
+        # bot_name -> {"process", "watcher", "stopping", "started_at", "failures", "restarts"}
+        self.children: Dict[str, Dict[str, Any]] = {}
+
+    def is_running(self, bot_name: str) -> bool:
+        """Запущен ли бот под надзором"""
+        child = self.children.get(bot_name)
+        return bool(child and child["process"] and child["process"].returncode is None)
+
+    def get_pid(self, bot_name: str) -> Optional[int]:
+        """PID бота под надзором"""
+        return self.children[bot_name]["process"].pid if self.is_running(bot_name) else None
+
+    async def start(self, bot_name: str, script_path: str, log_file: str) -> int:
+        """Запуск бота под надзором, возвращает PID"""
+        if self.is_running(bot_name):
+            return self.get_pid(bot_name)
+
+        child = self.children.setdefault(bot_name, {"failures": 0, "restarts": 0})
+        child.update({
+            "script_path": script_path,
+            "log_file": log_file,
+            "stopping": False
+        })
+        await self._spawn(bot_name)
+        return child["process"].pid
+
+    async def _spawn(self, bot_name: str):
+        """Создание процесса и задачи-наблюдателя"""
+        child = self.children[bot_name]
+        script_path = child["script_path"]
+
+        # Дочерний процесс наследует дескриптор лога, наша копия не нужна
+        with open(child["log_file"], 'a') as log:
+            process = await asyncio.create_subprocess_exec(
+                "python", script_path,
+                stdout=log,
+                stderr=log,
+                cwd=os.path.dirname(script_path) or None,
+                start_new_session=hasattr(os, 'setsid')
+            )
+
+        child["process"] = process
+        child["started_at"] = time.monotonic()
+        child["watcher"] = asyncio.create_task(self._watch(bot_name, process))
+        self.logger.info(f"Бот {bot_name} запущен под надзором (PID: {process.pid})")
+
+    async def _watch(self, bot_name: str, process: asyncio.subprocess.Process):
+        """Ожидание завершения процесса и автоперезапуск"""
+        returncode = await process.wait()
+        child = self.children.get(bot_name)
+        if not child or child.get("process") is not process or child["stopping"]:
+            return
+
+        self.logger.warning(f"Бот {bot_name} завершился с кодом {returncode}")
+        await self._emit(bot_name, "exited", process.pid)
+
+        bot_config = self.config.get(bot_name, {})
+        if not bot_config.get("auto_restart", False):
+            return
+
+        # Долго проработавший процесс сбрасывает счетчик неудач
+        if time.monotonic() - child["started_at"] >= bot_config.get("restart_stable_after", 60):
+            child["failures"] = 0
+
+        # Неудачный запуск (нет скрипта, EMFILE) - следующая попытка с большей задержкой
+        while True:
+            delay = min(
+                bot_config.get("restart_delay", 1) * (2 ** child["failures"]),
+                bot_config.get("max_restart_delay", 60)
+            )
+            child["failures"] += 1
+            self.logger.info(f"Автоперезапуск бота {bot_name} через {delay}с (попытка {child['failures']})")
+            await asyncio.sleep(delay)
+
+            if child["stopping"] or child.get("process") is not process:
+                return
+
+            try:
+                await self._spawn(bot_name)
+            except Exception as e:
+                self.logger.error(f"Ошибка автоперезапуска бота {bot_name}: {e}")
+                continue
+            child["restarts"] += 1
+            await self._emit(bot_name, "auto_restarted", child["process"].pid)
+            return
+
+    async def _emit(self, bot_name: str, event: str, pid: Optional[int]):
+        if self.on_event:
+            try:
+                await self.on_event(bot_name, event, pid)
+            except Exception as e:
+                self.logger.error(f"Ошибка обработки события бота {bot_name}: {e}")
+
+    async def stop(self, bot_name: str, timeout: float = 10) -> Optional[int]:
+        """Остановка бота: SIGTERM группе процессов, затем SIGKILL по таймауту
+
+        Возвращает код завершения или None, если бот не был запущен.
+        """
+        child = self.children.get(bot_name)
+        if not child:
+            return None
+
+        # Отменяет и ожидающий автоперезапуск
+        child["stopping"] = True
+        process = child.get("process")
+        if not process or process.returncode is not None:
+            return None
+
+        self._signal(process, signal.SIGTERM)
+        try:
+            returncode = await asyncio.wait_for(process.wait(), timeout)
+        except asyncio.TimeoutError:
+            self.logger.warning(f"Бот {bot_name} не завершился за {timeout}с, SIGKILL")
+            self._signal(process, signal.SIGKILL)
+            returncode = await process.wait()
+
+        child["failures"] = 0
+        self.logger.info(f"Бот {bot_name} остановлен (код {returncode})")
+        return returncode
+
+    async def restart(self, bot_name: str, timeout: float = 10) -> Optional[int]:
+        """Перезапуск бота под надзором, возвращает новый PID"""
+        child = self.children.get(bot_name)
+        if not child:
+            return None
+        await self.stop(bot_name, timeout)
+        child["stopping"] = False
+        await self._spawn(bot_name)
+        child["restarts"] += 1
+        return child["process"].pid
+
+    def _signal(self, process: asyncio.subprocess.Process, sig: int):
+        """Сигнал всей группе процессов бота (или только процессу)"""
+        try:
+            if hasattr(os, 'killpg'):
+                os.killpg(os.getpgid(process.pid), sig)
+            else:
+                process.send_signal(sig)
+        except ProcessLookupError:
+            pass
+
+    async def shutdown(self, timeout: float = 10):
+        """Остановка всех ботов под надзором"""
+        running = [name for name in self.children if self.is_running(name)]
+        if running:
+            await asyncio.gather(*(self.stop(name, timeout) for name in running), return_exceptions=True)
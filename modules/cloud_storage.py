@@ -1,13 +1,14 @@
 import os
-import shutil
 import hashlib
-import json
 import logging
 import aiofiles
 import asyncio
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 from pathlib import Path
+from modules.storage_db import StorageDB
+from modules.blob_store import BlobStore
+from modules.search_index import SearchIndex
 
 class CloudStorage:
     """Модуль облачного хранилища"""
@@ -33,30 +34,62 @@ class CloudStorage:
         self.max_file_size = self.config.get("max_file_size", 52428800)  # 50MB
         self.allowed_extensions = self.config.get("allowed_extensions", [])
         
-        # Файл с метаданными
+        # Содержимое хранится по SHA-256, одинаковые файлы - один раз
+        self.blob_store = BlobStore(self.storage_path / "blobs")
+        # Публикация блоба + запись метаданных и удаление записи + блоба
+        # не должны перемежаться, иначе блоб можно удалить из-под новой ссылки
+        self._blob_lock = asyncio.Lock()
+        
+        # Метаданные в SQLite; старый metadata.json переносится один раз
         self.metadata_file = self.storage_path / "metadata.json"
-        self.metadata = self._load_metadata()
+        self.db = self._open_metadata_db()
+        
+        # Индекс имен для поиска строится по метаданным и обновляется при загрузке/удалении
+        self.search_index = SearchIndex()
+        self.rebuild_search_index()
+    
+    def rebuild_search_index(self) -> int:
+        """Полное построение поискового индекса по базе"""
+        self.search_index.clear()
+        for file_info in self.db.list_files():
+            self.search_index.add(file_info["file_id"], file_info["filename"], file_info["user_id"], file_info["upload_time"])
+        return len(self.search_index)
     
-    def _load_metadata(self) -> Dict[str, Any]:
-        """Загрузка метаданных файлов"""
+    def _open_metadata_db(self) -> StorageDB:
+        """Открытие базы метаданных и перенос metadata.json"""
+        db = StorageDB(self.storage_path / "metadata.db")
         try:
-            if self.metadata_file.exists():
-                with open(self.metadata_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+            db.migrate_from_json(self.metadata_file)
         except Exception as e:
-            self.logger.error(f"Ошибка загрузки метаданных: {e}")
-        return {"files": {}, "users": {}}
+            self.logger.error(f"Ошибка переноса метаданных: {e}")
+        self.reconcile_quotas(db)
+        return db
     
-    def _save_metadata(self):
-        """Сохранение метаданных файлов"""
+    def reconcile_quotas(self, db: Optional[StorageDB] = None) -> int:
+        """Сверка счетчиков квот с фактическими файлами"""
+        db = db or self.db
         try:
-            with open(self.metadata_file, 'w', encoding='utf-8') as f:
-                json.dump(self.metadata, f, indent=2, ensure_ascii=False)
+            fixed = db.reconcile_quotas()
+            if fixed:
+                self.logger.warning(f"Счетчики квот исправлены для {fixed} пользователей")
+            return fixed
         except Exception as e:
-            self.logger.error(f"Ошибка сохранения метаданных: {e}")
+            self.logger.error(f"Ошибка сверки квот: {e}")
+            return 0
     
-    async def upload_file(self, file_path: str, user_id: int, original_filename: str = None) -> Dict[str, Any]:
-        """Загрузка файла в хранилище"""
+    def _release_blob(self, content_hash: str):
+        """Удаление блоба, на который не ссылается ни один файл"""
+        if self.db.get_blob_refcount(content_hash) == 0:
+            self.blob_store.remove(content_hash)
+    
+    async def upload_file(self, file_path: str, user_id: int, original_filename: str = None,
+                          content_hash: Optional[str] = None, consume: bool = False) -> Dict[str, Any]:
+        """Загрузка файла в хранилище
+        
+        consume=True - файл (обычно скачанный в storage/blobs/tmp) перемещается
+        в хранилище без копирования; content_hash - SHA-256, посчитанный
+        при скачивании.
+        """
         if not await self.role_manager.check_permission(user_id, "storage", "upload"):
             return {"success": False, "message": "❌ Нет прав для загрузки файлов"}
         
@@ -71,41 +104,48 @@ class CloudStorage:
             if self.allowed_extensions and file_ext not in self.allowed_extensions:
                 return {"success": False, "message": f"❌ Расширение .{file_ext} не разрешено"}
             
-            # Проверка лимита файлов пользователя
-            user_files = await self.get_user_files(user_id)
-            if len(user_files) >= self.max_files_per_user:
+            # Проверка лимита файлов пользователя по счетчику (O(1))
+            if self.db.get_quota(user_id)["file_count"] >= self.max_files_per_user:
                 return {"success": False, "message": f"❌ Достигнут лимит файлов ({self.max_files_per_user})"}
             
-            # Генерация уникального имени файла
-            file_hash = hashlib.md5(f"{user_id}_{original_filename}_{datetime.now().isoformat()}".encode()).hexdigest()
-            file_ext = Path(original_filename or file_path).suffix
-            storage_filename = f"{file_hash}{file_ext}"
-            storage_path = self.uploads_path / storage_filename
-            
-            # Копирование файла
-            shutil.copy2(file_path, storage_path)
-            
-            # Сохранение метаданных
-            file_id = file_hash
-            self.metadata["files"][file_id] = {
-                "filename": original_filename or os.path.basename(file_path),
-                "storage_filename": storage_filename,
-                "user_id": user_id,
-                "size": file_size,
-                "extension": file_ext,
-                "upload_time": datetime.now().isoformat(),
-                "path": str(storage_path)
-            }
-            
-            # Обновление статистики пользователя
-            user_id_str = str(user_id)
-            if user_id_str not in self.metadata["users"]:
-                self.metadata["users"][user_id_str] = {"files": [], "total_size": 0}
+            # Хэширование/копирование - в пуле потоков, event loop не блокируется
+            staged = await asyncio.to_thread(
+                self.blob_store.stage, file_path, content_hash=content_hash, consume=consume
+            )
             
-            self.metadata["users"][user_id_str]["files"].append(file_id)
-            self.metadata["users"][user_id_str]["total_size"] += file_size
-            
-            self._save_metadata()
+            file_id = hashlib.md5(f"{user_id}_{original_filename}_{datetime.now().isoformat()}".encode()).hexdigest()
+            file_ext = Path(original_filename or file_path).suffix
+            filename = original_filename or os.path.basename(file_path)
+            upload_time = datetime.now().isoformat()
+            try:
+                async with self._blob_lock:
+                    # Перемещение на место (rename) и сохранение метаданных:
+                    # повторная проверка лимита и вставка в одной транзакции
+                    blob = await asyncio.to_thread(
+                        self.blob_store.commit, staged["tmp"], staged["hash"], staged["size"]
+                    )
+                    added = await asyncio.to_thread(self.db.add_file, {
+                        "file_id": file_id,
+                        "filename": filename,
+                        "storage_filename": blob["hash"],
+                        "user_id": user_id,
+                        "size": file_size,
+                        "extension": file_ext,
+                        "upload_time": upload_time,
+                        "path": blob["path"],
+                        "content_hash": blob["hash"]
+                    }, max_files=self.max_files_per_user)
+                    if not added:
+                        # Лимит заняли параллельные загрузки
+                        await asyncio.to_thread(self._release_blob, blob["hash"])
+                        return {"success": False, "message": f"❌ Достигнут лимит файлов ({self.max_files_per_user})"}
+            finally:
+                self.blob_store.discard(staged)
+            
+            self.search_index.add(file_id, filename, user_id, upload_time)
+            
+            if not blob["created"]:
+                self.logger.info(f"Файл {original_filename}: такое содержимое уже хранится, копия не создана")
             
             self.logger.info(f"Файл {original_filename} загружен пользователем {user_id} (ID: {file_id})")
             return {
@@ -125,11 +165,10 @@ class CloudStorage:
             return None
         
         try:
-            if file_id not in self.metadata["files"]:
+            file_info = self.db.get_file(file_id)
+            if not file_info:
                 return None
             
-            file_info = self.metadata["files"][file_id]
-            
             # Проверка прав доступа (пользователь может скачивать только свои файлы или админ)
             if file_info["user_id"] != user_id and not await self.role_manager.is_admin(user_id):
                 return None
@@ -150,72 +189,86 @@ class CloudStorage:
             return []
         
         try:
-            files = []
-            user_id_str = str(user_id)
+            # Если админ - показываем все файлы, иначе только файлы пользователя
+            owner = None if await self.role_manager.is_admin(user_id) else user_id
+            files = [self._listing_entry(file_info) for file_info in self.db.list_files(owner)]
             
-            # Если админ - показываем все файлы
-            if await self.role_manager.is_admin(user_id):
-                for file_id, file_info in self.metadata["files"].items():
-                    files.append({
-                        "id": file_id,
-                        "name": file_info["filename"],
-                        "size": file_info["size"],
-                        "extension": file_info["extension"],
-                        "upload_time": file_info["upload_time"],
-                        "owner": file_info["user_id"]
-                    })
-            else:
-                # Показываем только файлы пользователя
-                if user_id_str in self.metadata["users"]:
-                    for file_id in self.metadata["users"][user_id_str]["files"]:
-                        if file_id in self.metadata["files"]:
-                            file_info = self.metadata["files"][file_id]
-                            files.append({
-                                "id": file_id,
-                                "name": file_info["filename"],
-                                "size": file_info["size"],
-                                "extension": file_info["extension"],
-                                "upload_time": file_info["upload_time"],
-                                "owner": file_info["user_id"]
-                            })
-            
-            # Сортировка по времени загрузки
-            files.sort(key=lambda x: x["upload_time"], reverse=True)
+            # База уже отдает файлы по убыванию времени загрузки
             return files
             
         except Exception as e:
             self.logger.error(f"Ошибка получения списка файлов: {e}")
             return []
     
+    async def list_files_page(self, user_id: int, cursor: Optional[Tuple[str, str]] = None, limit: int = 10,
+                              is_admin: Optional[bool] = None) -> Dict[str, Any]:
+        """Страница списка файлов (новые первыми)
+        
+        cursor - курсор из next_cursor предыдущей страницы. Стоимость запроса
+        зависит от размера страницы, а не от числа файлов; total берется
+        из счетчиков квот.
+        """
+        empty = {"files": [], "next_cursor": None, "total": 0}
+        if not await self.role_manager.check_permission(user_id, "storage", "view"):
+            return empty
+        
+        try:
+            if is_admin is None:
+                is_admin = await self.role_manager.is_admin(user_id)
+            owner = None if is_admin else user_id
+            files, next_cursor = await asyncio.to_thread(self.db.list_files_page, owner, cursor, limit)
+            total = self.db.get_totals()["total_files"] if owner is None else self.db.get_quota(owner)["file_count"]
+            return {
+                "files": [self._listing_entry(file_info) for file_info in files],
+                "next_cursor": next_cursor,
+                "total": total
+            }
+        except Exception as e:
+            self.logger.error(f"Ошибка получения страницы файлов: {e}")
+            return empty
+    
+    def _listing_entry(self, file_info: Dict[str, Any]) -> Dict[str, Any]:
+        """Запись о файле в формате списков и поиска"""
+        return {
+            "id": file_info["file_id"],
+            "name": file_info["filename"],
+            "original_name": file_info["filename"],
+            "size": file_info["size"],
+            "size_formatted": self._format_file_size(file_info["size"]),
+            "extension": file_info["extension"],
+            "upload_time": file_info["upload_time"],
+            "owner": file_info["user_id"]
+        }
+    
     async def delete_file(self, file_id: str, user_id: int) -> Dict[str, Any]:
         """Удаление файла"""
         if not await self.role_manager.check_permission(user_id, "storage", "delete"):
             return {"success": False, "message": "❌ Нет прав для удаления файлов"}
         
         try:
-            if file_id not in self.metadata["files"]:
+            file_info = self.db.get_file(file_id)
+            if not file_info:
                 return {"success": False, "message": "❌ Файл не найден"}
             
-            file_info = self.metadata["files"][file_id]
-            
             # Проверка прав доступа
             if file_info["user_id"] != user_id and not await self.role_manager.is_admin(user_id):
                 return {"success": False, "message": "❌ Нет прав для удаления этого файла"}
             
-            # Удаление физического файла
-            file_path = file_info["path"]
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            
-            # Обновление метаданных
-            owner_id_str = str(file_info["user_id"])
-            if owner_id_str in self.metadata["users"]:
-                if file_id in self.metadata["users"][owner_id_str]["files"]:
-                    self.metadata["users"][owner_id_str]["files"].remove(file_id)
-                self.metadata["users"][owner_id_str]["total_size"] -= file_info["size"]
-            
-            del self.metadata["files"][file_id]
-            self._save_metadata()
+            async with self._blob_lock:
+                # Обновление метаданных (одна транзакция, со счетчиком ссылок блоба)
+                removed = await asyncio.to_thread(self.db.remove_file, file_id)
+                if removed is None:
+                    # Запись уже удалена параллельным запросом: диск не трогаем,
+                    # путь мог указывать на общий блоб
+                    return {"success": False, "message": "❌ Файл не найден"}
+                
+                # Удаление физического файла: блоб - только без оставшихся ссылок
+                if removed["content_hash"]:
+                    if removed["blob_released"]:
+                        await asyncio.to_thread(self.blob_store.remove, removed["content_hash"])
+                elif os.path.exists(removed["path"]):
+                    os.remove(removed["path"])
+            self.search_index.remove(file_id)
             
             self.logger.info(f"Файл {file_info['filename']} удален пользователем {user_id}")
             return {"success": True, "message": f"✅ Файл {file_info['filename']} успешно удален"}
@@ -230,11 +283,10 @@ class CloudStorage:
             return None
         
         try:
-            if file_id not in self.metadata["files"]:
+            file_info = self.db.get_file(file_id)
+            if not file_info:
                 return None
             
-            file_info = self.metadata["files"][file_id]
-            
             # Проверка прав доступа
             if file_info["user_id"] != user_id and not await self.role_manager.is_admin(user_id):
                 return None
@@ -253,21 +305,15 @@ class CloudStorage:
             self.logger.error(f"Ошибка получения информации о файле {file_id}: {e}")
             return None
     
-    async def search_files(self, query: str, user_id: int) -> List[Dict[str, Any]]:
-        """Поиск файлов"""
+    async def search_files(self, query: str, user_id: int, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Поиск файлов по индексу имен (подстрока, "префикс*", ".расширение")"""
         if not await self.role_manager.check_permission(user_id, "storage", "view"):
             return []
         
         try:
-            files = await self.list_files(user_id)
-            results = []
-            
-            query_lower = query.lower()
-            for file_info in files:
-                if query_lower in file_info["name"].lower():
-                    results.append(file_info)
-            
-            return results
+            owner = None if await self.role_manager.is_admin(user_id) else user_id
+            file_ids = self.search_index.search(query, owner=owner, limit=limit)
+            return [self._listing_entry(file_info) for file_info in self.db.get_files(file_ids)]
             
         except Exception as e:
             self.logger.error(f"Ошибка поиска файлов: {e}")
@@ -279,13 +325,12 @@ class CloudStorage:
             return {}
         
         try:
-            user_id_str = str(user_id)
-            
             if await self.role_manager.is_admin(user_id):
-                # Статистика для админа - общая
-                total_files = len(self.metadata["files"])
-                total_size = sum(file_info["size"] for file_info in self.metadata["files"].values())
-                total_users = len(self.metadata["users"])
+                # Статистика для админа - общая (по счетчикам пользователей)
+                totals = self.db.get_totals()
+                total_files = totals["total_files"]
+                total_size = totals["total_size"]
+                total_users = totals["total_users"]
                 
                 return {
                     "total_files": total_files,
@@ -298,25 +343,15 @@ class CloudStorage:
                 }
             else:
                 # Статистика для пользователя
-                if user_id_str in self.metadata["users"]:
-                    user_data = self.metadata["users"][user_id_str]
-                    return {
-                        "files_count": len(user_data["files"]),
-                        "total_size": user_data["total_size"],
-                        "total_size_formatted": self._format_file_size(user_data["total_size"]),
-                        "max_files": self.max_files_per_user,
-                        "max_file_size": self.max_file_size,
-                        "max_file_size_formatted": self._format_file_size(self.max_file_size)
-                    }
-                else:
-                    return {
-                        "files_count": 0,
-                        "total_size": 0,
-                        "total_size_formatted": "0 B",
-                        "max_files": self.max_files_per_user,
-                        "max_file_size": self.max_file_size,
-                        "max_file_size_formatted": self._format_file_size(self.max_file_size)
-                    }
+                quota = self.db.get_quota(user_id)
+                return {
+                    "files_count": quota["file_count"],
+                    "total_size": quota["total_bytes"],
+                    "total_size_formatted": self._format_file_size(quota["total_bytes"]),
+                    "max_files": self.max_files_per_user,
+                    "max_file_size": self.max_file_size,
+                    "max_file_size_formatted": self._format_file_size(self.max_file_size)
+                }
                     
         except Exception as e:
             self.logger.error(f"Ошибка получения статистики хранилища: {e}")
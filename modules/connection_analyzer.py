@@ -0,0 +1,74 @@
+from collections import Counter
+from typing import Dict, Any, Optional, List, Set, Tuple
+import psutil
+
+# Ключ соединения: (локальный IP, локальный порт, удаленный IP, удаленный порт, pid)
+ConnectionKey = Tuple[str, int, str, int, Optional[int]]
+
+class ConnectionAnalyzer:
+    """Анализ сетевых соединений по одному снимку за цикл
+
+    psutil.net_connections() вызывается один раз; за один проход по снимку
+    считаются соединения на каждый удаленный IP и гистограмма удаленных
+    портов. Снимок сравнивается с предыдущим, поэтому наружу отдаются только
+    новые соединения, а флуд с IP - только когда число соединений впервые
+    превышает порог.
+    """
+
+    def __init__(self, flood_threshold: int = 10, kind: str = "inet"):
+        self.flood_threshold = flood_threshold
+        self.kind = kind
+        self.previous: Set[ConnectionKey] = set()
+        self.previous_flood: Set[str] = set()
+        self.last: Optional[Dict[str, Any]] = None
+
+    def snapshot(self) -> List[Any]:
+        """Снимок соединений (блокирующий вызов - выполнять в потоке)"""
+        return psutil.net_connections(kind=self.kind)
+
+    def analyze(self, connections: List[Any]) -> Dict[str, Any]:
+        """Разбор снимка и сравнение с предыдущим"""
+        current: Set[ConnectionKey] = set()
+        new_connections = []
+        by_ip: Counter = Counter()
+        by_port: Counter = Counter()
+        previous = self.previous
+
+        for conn in connections:
+            if conn.status != psutil.CONN_ESTABLISHED or not conn.raddr:
+                continue
+            remote_ip, remote_port = conn.raddr.ip, conn.raddr.port
+            key = (conn.laddr.ip, conn.laddr.port, remote_ip, remote_port, conn.pid)
+            current.add(key)
+            by_ip[remote_ip] += 1
+            by_port[remote_port] += 1
+            if key not in previous:
+                new_connections.append(conn)
+
+        flood = {ip: count for ip, count in by_ip.items() if count > self.flood_threshold}
+        result = {
+            "total": len(connections),
+            "established": len(current),
+            "by_ip": by_ip,
+            "by_port": by_port,
+            "new": new_connections,
+            "closed": len(previous - current),
+            "flood": flood,
+            "new_flood": {ip: count for ip, count in flood.items() if ip not in self.previous_flood}
+        }
+        self.previous = current
+        self.previous_flood = set(flood)
+        self.last = result
+        return result
+
+    def run(self) -> Dict[str, Any]:
+        """Снимок и разбор за один вызов"""
+        return self.analyze(self.snapshot())
+
+    def top_remote_ips(self, limit: int = 10) -> List[Tuple[str, int]]:
+        """IP с наибольшим числом соединений по последнему снимку"""
+        return self.last["by_ip"].most_common(limit) if self.last else []
+
+    def top_ports(self, limit: int = 10) -> List[Tuple[int, int]]:
+        """Самые частые удаленные порты по последнему снимку"""
+        return self.last["by_port"].most_common(limit) if self.last else []
@@ -0,0 +1,276 @@
+import asyncio
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import struct
+from typing import Dict, Any, Optional, Callable, List, Tuple
+
+# Флаги inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+class _Inotify:
+    """Минимальная обертка над inotify через ctypes"""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc не найдена")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("inotify недоступен")
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), ctypes.c_uint32(mask))
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def rm_watch(self, wd: int):
+        self.libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self) -> List[Tuple[int, int, str]]:
+        """Чтение накопленных событий: (wd, mask, имя)"""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            if not data:
+                break
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+class FileWatcher:
+    """Наблюдение за файлами и каталогами: inotify или опрос stat
+
+    Подписка на файл ставит inotify-наблюдение на родительский каталог и
+    фильтрует события по имени, поэтому ротация лога (rename + create)
+    не теряет подписку. Подписка на каталог получает события всех его
+    непосредственных детей. Колбэк вызывается как callback(path, event),
+    где event - "modified", "created", "deleted" или "overflow" (очередь
+    inotify переполнена, состояние нужно перечитать целиком). Корутинные
+    колбэки запускаются задачами.
+
+    Если inotify недоступен (не Linux, нет прав, исчерпан лимит),
+    изменения находятся опросом stat с интервалом poll_interval.
+    """
+
+    def __init__(self, poll_interval: float = 1.0, use_inotify: bool = True):
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.logger = logging.getLogger(__name__)
+        # путь -> список колбэков
+        self.subscriptions: Dict[str, List[Callable]] = {}
+        self._inotify: Optional[_Inotify] = None
+        self._dir_wds: Dict[str, int] = {}
+        self._wd_dirs: Dict[int, str] = {}
+        self._poll_task: Optional[asyncio.Task] = None
+        self._poll_state: Dict[str, Any] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.mode: Optional[str] = None
+
+    def _ensure_started(self):
+        if self.mode:
+            return
+        self._loop = asyncio.get_running_loop()
+        if self.use_inotify:
+            try:
+                self._inotify = _Inotify()
+                self._loop.add_reader(self._inotify.fd, self._on_inotify_readable)
+                self.mode = "inotify"
+                return
+            except (OSError, AttributeError, NotImplementedError) as e:
+                self.logger.warning(f"inotify недоступен, используется опрос: {e}")
+                self._inotify = None
+        self.mode = "polling"
+
+    def watch(self, path: str, callback: Callable) -> None:
+        """Подписка на изменения файла или каталога (нужен работающий event loop)"""
+        self._ensure_started()
+        path = os.path.abspath(path)
+        self.subscriptions.setdefault(path, []).append(callback)
+
+        if self.mode == "inotify":
+            directory = path if os.path.isdir(path) else os.path.dirname(path)
+            try:
+                self._add_dir_watch(directory)
+                return
+            except OSError as e:
+                # Например, исчерпан fs.inotify.max_user_watches
+                self.logger.warning(f"Не удалось поставить inotify на {directory}, опрос: {e}")
+
+        self._poll_state[path] = self._poll_snapshot(path)
+        if not self._poll_task or self._poll_task.done():
+            self._poll_task = self._loop.create_task(self._poll_loop())
+
+    def unwatch(self, path: str, callback: Optional[Callable] = None) -> None:
+        """Отписка колбэка (или всех колбэков) от пути"""
+        path = os.path.abspath(path)
+        callbacks = self.subscriptions.get(path, [])
+        if callback is not None and callback in callbacks:
+            callbacks.remove(callback)
+        if callback is None or not callbacks:
+            self.subscriptions.pop(path, None)
+            self._poll_state.pop(path, None)
+
+        # Наблюдение за каталогом снимается, когда в нем не осталось подписок
+        if self._inotify:
+            for directory, wd in list(self._dir_wds.items()):
+                if not any(p == directory or os.path.dirname(p) == directory for p in self.subscriptions):
+                    self._inotify.rm_watch(wd)
+                    del self._dir_wds[directory]
+                    self._wd_dirs.pop(wd, None)
+
+    def _add_dir_watch(self, directory: str):
+        if directory in self._dir_wds:
+            return
+        wd = self._inotify.add_watch(directory, WATCH_MASK)
+        self._dir_wds[directory] = wd
+        self._wd_dirs[wd] = directory
+
+    def _on_inotify_readable(self):
+        try:
+            events = self._inotify.read_events()
+        except OSError as e:
+            self.logger.error(f"Ошибка чтения событий inotify: {e}")
+            return
+
+        for wd, mask, name in events:
+            if mask & IN_Q_OVERFLOW:
+                for path in list(self.subscriptions):
+                    self._dispatch(path, path, "overflow")
+                continue
+
+            directory = self._wd_dirs.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                # Каталог удален или размонтирован
+                self._dir_wds.pop(directory, None)
+                self._wd_dirs.pop(wd, None)
+                continue
+
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                event = "created"
+            elif mask & (IN_DELETE | IN_MOVED_FROM | IN_DELETE_SELF | IN_MOVE_SELF):
+                event = "deleted"
+            else:
+                event = "modified"
+
+            full_path = os.path.join(directory, name) if name else directory
+            # Подписчики на сам файл и на каталог целиком
+            self._dispatch(full_path, full_path, event)
+            if name:
+                self._dispatch(directory, full_path, event)
+
+    def _dispatch(self, subscribed_path: str, path: str, event: str):
+        for callback in list(self.subscriptions.get(subscribed_path, [])):
+            try:
+                result = callback(path, event)
+                if asyncio.iscoroutine(result):
+                    self._loop.create_task(result)
+            except Exception as e:
+                self.logger.error(f"Ошибка обработчика изменений {path}: {e}")
+
+    def _poll_snapshot(self, path: str) -> Any:
+        """Снимок состояния для опроса: stat файла или stat детей каталога"""
+        try:
+            if os.path.isdir(path):
+                snapshot = {}
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        try:
+                            st = entry.stat(follow_symlinks=False)
+                            snapshot[entry.path] = (st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns)
+                        except OSError:
+                            continue
+                return snapshot
+            st = os.stat(path)
+            return (st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns)
+        except OSError:
+            return None
+
+    async def _poll_loop(self):
+        while self._poll_state:
+            await asyncio.sleep(self.poll_interval)
+            for path in list(self._poll_state):
+                old = self._poll_state.get(path)
+                new = await asyncio.to_thread(self._poll_snapshot, path)
+                if path not in self._poll_state:
+                    continue
+                self._poll_state[path] = new
+                if old == new:
+                    continue
+
+                if isinstance(old, dict) or isinstance(new, dict):
+                    old = old if isinstance(old, dict) else {}
+                    new = new if isinstance(new, dict) else {}
+                    for child in new.keys() - old.keys():
+                        self._dispatch(path, child, "created")
+                    for child in old.keys() - new.keys():
+                        self._dispatch(path, child, "deleted")
+                    for child in new.keys() & old.keys():
+                        if new[child] != old[child]:
+                            self._dispatch(path, child, "modified")
+                elif new is None:
+                    self._dispatch(path, path, "deleted")
+                elif old is None or old[0] != new[0]:
+                    self._dispatch(path, path, "created")
+                else:
+                    self._dispatch(path, path, "modified")
+
+    def close(self):
+        """Остановка наблюдения"""
+        if self._poll_task:
+            self._poll_task.cancel()
+            self._poll_task = None
+        if self._inotify:
+            try:
+                self._loop.remove_reader(self._inotify.fd)
+            except Exception:
+                pass
+            self._inotify.close()
+            self._inotify = None
+        self.subscriptions.clear()
+        self._poll_state.clear()
+        self._dir_wds.clear()
+        self._wd_dirs.clear()
+        self.mode = None
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Dict, Any, Optional, List, Iterable
+
+BASELINE_FILE = "security/file_hashes.json"
+
+# Критические файлы по умолчанию
+DEFAULT_PROTECTED_PATHS = [
+    "/etc/passwd", "/etc/shadow", "/etc/hosts",
+    "/etc/ssh/sshd_config", "/etc/fstab",
+    "/boot/grub/grub.cfg", "/etc/resolv.conf"
+]
+
+class IntegrityBaseline:
+    """Эталонные хэши защищаемых файлов (в памяти, с сохранением на диск)
+
+    Эталон загружается из BASELINE_FILE один раз. Для каждого файла кроме
+    SHA-256 хранятся размер, mtime_ns, inode и ctime_ns: если они не
+    изменились, файл не перечитывается. Хэш считается блоками по 1 МБ.
+    Защищаемый путь может быть каталогом - тогда проверяется все дерево.
+    Файл эталона переписывается один раз за проверку и только при
+    изменениях. Первая проверка нового эталона (и нового защищаемого
+    каталога) заполняет его молча; после этого появившиеся файлы
+    сообщаются как "created". Удаленный файл остается в эталоне отметкой
+    "deleted", поэтому его повторное появление (с любым содержимым)
+    тоже сообщается как "created".
+
+    Блокирующие вызовы; из async-кода - через asyncio.to_thread.
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, path: str = BASELINE_FILE):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+        # Эталон уже заполнен: новые файлы - изменение, а не первичный снимок
+        self.initialized = bool(self.entries)
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Ошибка чтения хешей файлов: {e}")
+            return
+        for file_path, entry in data.items():
+            if isinstance(entry, str):
+                # Старый формат: только MD5, без stat
+                entry = {"hash": entry, "algorithm": "md5"}
+            self.entries[file_path] = entry
+
+    def save(self):
+        """Запись эталона, если он изменился"""
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.entries, f, indent=2)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except Exception as e:
+                self.logger.error(f"Ошибка сохранения хешей файлов: {e}")
+
+    @classmethod
+    def hash_file(cls, path: str, algorithm: str = "sha256") -> str:
+        digest = hashlib.new(algorithm)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(cls.CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _stat_key(st: os.stat_result) -> Dict[str, int]:
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "ino": st.st_ino, "ctime_ns": st.st_ctime_ns}
+
+    @staticmethod
+    def expand(paths: Iterable[str]) -> List[str]:
+        """Файлы защищаемых путей: каталоги раскрываются рекурсивно"""
+        files = []
+        stack = []
+        for path in paths:
+            if os.path.isdir(path):
+                stack.append(path)
+            elif os.path.isfile(path):
+                files.append(path)
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            files.append(entry.path)
+            except OSError:
+                continue
+        return files
+
+    def check_file(self, path: str, report_new: Optional[bool] = None) -> Optional[Dict[str, Any]]:
+        """Проверка одного файла по эталону
+
+        Возвращает изменение {"path", "change", "old_hash", "new_hash"}
+        (change: "modified", "deleted" или "created") либо None. Файл без
+        эталона добавляется в эталон; "created" возвращается, если
+        report_new (по умолчанию - эталон уже инициализирован) или файл
+        ранее был удален.
+        """
+        if report_new is None:
+            report_new = self.initialized
+        with self._lock:
+            entry = self.entries.get(path)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                if entry is None or entry.get("deleted"):
+                    return None
+                # Отметка вместо удаления записи: путь остается известным
+                self.entries[path] = {"hash": entry["hash"], "deleted": True}
+                self._dirty = True
+                return {"path": path, "change": "deleted", "old_hash": entry["hash"], "new_hash": ""}
+
+            stat_key = self._stat_key(st)
+            if entry is not None and entry.get("deleted"):
+                # Удаленный файл появился снова
+                try:
+                    current_hash = self.hash_file(path)
+                except OSError as e:
+                    self.logger.error(f"Ошибка вычисления хеша файла {path}: {e}")
+                    return None
+                self.entries[path] = {"hash": current_hash, **stat_key}
+                self._dirty = True
+                return {"path": path, "change": "created", "old_hash": entry["hash"], "new_hash": current_hash}
+
+            if entry is not None and all(entry.get(key) == value for key, value in stat_key.items()):
+                # Метаданные не менялись - содержимое не перечитываем
+                return None
+
+            try:
+                algorithm = entry.get("algorithm", "sha256") if entry else "sha256"
+                current_hash = self.hash_file(path, algorithm)
+            except OSError as e:
+                self.logger.error(f"Ошибка вычисления хеша файла {path}: {e}")
+                return None
+
+            if entry is not None and current_hash != entry["hash"]:
+                # Эталон остается прежним; о той же версии повторно не сообщаем
+                reported = entry.get("changed_hash") == current_hash
+                entry.update({"changed_hash": current_hash, **stat_key})
+                self._dirty = True
+                if reported:
+                    return None
+                return {"path": path, "change": "modified", "old_hash": entry["hash"], "new_hash": current_hash}
+
+            if algorithm != "sha256":
+                # Эталон старого формата совпал - переводим на SHA-256
+                current_hash = self.hash_file(path)
+            self.entries[path] = {"hash": current_hash, **stat_key}
+            self._dirty = True
+            if entry is None and report_new:
+                return {"path": path, "change": "created", "old_hash": "", "new_hash": current_hash}
+            return None
+
+    def check(self, paths: Iterable[str]) -> List[Dict[str, Any]]:
+        """Проверка всех защищаемых путей; эталон сохраняется один раз"""
+        roots = [os.path.abspath(path) for path in paths]
+        files = self.expand(roots)
+        seen = set(files)
+        # Защищаемые пути, уже представленные в эталоне
+        known_roots = [
+            root for root in roots
+            if self.initialized and any(known == root or known.startswith(root + os.sep) for known in self.entries)
+        ]
+        # Файлы из эталона, пропавшие из защищаемых каталогов
+        for known, entry in list(self.entries.items()):
+            if known not in seen and not entry.get("deleted") and any(known == root or known.startswith(root + os.sep) for root in roots):
+                files.append(known)
+
+        changes = []
+        for path in files:
+            report_new = any(path == root or path.startswith(root + os.sep) for root in known_roots)
+            change = self.check_file(path, report_new)
+            if change:
+                changes.append(change)
+        self.initialized = True
+        self.save()
+        return changes
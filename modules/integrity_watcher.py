@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import os
+from typing import Dict, Any, Optional, Callable, Awaitable, List, Set
+
+from modules.file_watcher import FileWatcher
+from modules.integrity_baseline import IntegrityBaseline
+
+class IntegrityWatcher:
+    """Проверка целостности по событиям файловой системы
+
+    На защищаемые файлы и все каталоги защищаемых деревьев ставится
+    подписка FileWatcher (inotify, без него - опрос stat). Событие только
+    запоминает путь; после паузы debounce накопленные пути проверяются
+    по эталону - перехэшируются лишь затронутые файлы. При переполнении
+    очереди inotify проверяется все целиком. Без событий работы нет.
+    """
+
+    def __init__(self, baseline: IntegrityBaseline, paths: List[str],
+                 on_changes: Callable[[List[Dict[str, Any]]], Awaitable[None]],
+                 watcher: Optional[FileWatcher] = None, debounce: float = 0.2):
+        self.baseline = baseline
+        self.roots = [os.path.abspath(path) for path in paths]
+        self.on_changes = on_changes
+        self.watcher = watcher or FileWatcher()
+        self.debounce = debounce
+        self.watched: Set[str] = set()
+        self.pending: Set[str] = set()
+        self.full_rescan = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def mode(self) -> Optional[str]:
+        return self.watcher.mode
+
+    def _protected(self, path: str) -> bool:
+        return any(path == root or path.startswith(root + os.sep) for root in self.roots)
+
+    @staticmethod
+    def _subdirectories(root: str) -> List[str]:
+        """Каталог и все вложенные каталоги"""
+        directories = []
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            directories.append(directory)
+            try:
+                with os.scandir(directory) as entries:
+                    stack.extend(entry.path for entry in entries if entry.is_dir(follow_symlinks=False))
+            except OSError:
+                continue
+        return directories
+
+    def _watch(self, path: str):
+        if path not in self.watched:
+            self.watcher.watch(path, self._on_event)
+            self.watched.add(path)
+
+    def _unwatch(self, path: str):
+        for watched in [p for p in self.watched if p == path or p.startswith(path + os.sep)]:
+            self.watcher.unwatch(watched, self._on_event)
+            self.watched.discard(watched)
+
+    async def _watch_tree(self, root: str):
+        for directory in await asyncio.to_thread(self._subdirectories, root):
+            self._watch(directory)
+
+    async def start(self):
+        """Начальная проверка и подписка на события"""
+        self._wakeup = asyncio.Event()
+        await self.check_all()
+        for root in self.roots:
+            if os.path.isdir(root):
+                await self._watch_tree(root)
+            else:
+                # Подписка на файл переживает замену файла через rename
+                self._watch(root)
+        self._task = asyncio.create_task(self._drain_loop())
+        self.logger.info(f"Слежение за целостностью: путей {len(self.watched)}, режим {self.mode}")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for path in list(self.watched):
+            self.watcher.unwatch(path, self._on_event)
+        self.watched.clear()
+
+    async def check_all(self):
+        """Полная проверка (при старте, переполнении очереди и как страховка)"""
+        changes = await asyncio.to_thread(self.baseline.check, self.roots)
+        if changes:
+            await self.on_changes(changes)
+
+    def _on_event(self, path: str, event: str):
+        if event == "overflow":
+            self.full_rescan = True
+        elif self._protected(path):
+            self.pending.add(path)
+        else:
+            return
+        self._wakeup.set()
+
+    async def _drain_loop(self):
+        while True:
+            await self._wakeup.wait()
+            # Серия событий (запись, chmod, rename) проверяется один раз
+            await asyncio.sleep(self.debounce)
+            self._wakeup.clear()
+            paths, self.pending = self.pending, set()
+            try:
+                if self.full_rescan:
+                    self.full_rescan = False
+                    await self.check_all()
+                    continue
+                for path in paths:
+                    if os.path.isdir(path):
+                        # Новый каталог в дереве: подписка и проверка его файлов
+                        await self._watch_tree(path)
+                    elif path in self.watched and path not in self.roots and not os.path.exists(path):
+                        self._unwatch(path)
+                changes = await asyncio.to_thread(self._check_paths, paths)
+                if changes:
+                    await self.on_changes(changes)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Ошибка проверки целостности по событию: {e}")
+
+    def _check_paths(self, paths: Set[str]) -> List[Dict[str, Any]]:
+        """Проверка затронутых путей (в потоке)"""
+        files: Set[str] = set()
+        for path in paths:
+            if os.path.isdir(path):
+                files.update(self.baseline.expand([path]))
+            elif os.path.exists(path) or path in self.baseline.entries:
+                files.add(path)
+            else:
+                # Удален или перемещен каталог: его файлы из эталона
+                prefix = path + os.sep
+                files.update(known for known in list(self.baseline.entries) if known.startswith(prefix))
+
+        changes = []
+        for path in sorted(files):
+            change = self.baseline.check_file(path)
+            if change:
+                changes.append(change)
+        self.baseline.save()
+        return changes
@@ -0,0 +1,142 @@
+import json
+import logging
+import os
+import re
+import threading
+from typing import Dict, Any, Optional, List, Tuple
+
+CURSORS_FILE = "security/log_cursors.json"
+
+# Правила классификации строк системных логов: имя -> регулярное выражение
+LOG_RULES = {
+    "failed_login": r"Failed password|authentication failure",
+    "suspicious": r"(?i:suspicious|malware|virus|attack)",
+    "privilege_escalation": r"sudo.*incorrect password"
+}
+
+class LogClassifier:
+    """Классификация строк лога набором заранее скомпилированных правил
+
+    Все правила объединены в один фильтр: строка, не подходящая ни под одно
+    правило (почти все строки), отсеивается одним поиском. Подходящие
+    строки проверяются по каждому правилу - одна строка может попасть
+    в несколько категорий.
+    """
+
+    def __init__(self, rules: Optional[Dict[str, str]] = None):
+        self.rules = [(name, re.compile(pattern)) for name, pattern in (rules or LOG_RULES).items()]
+        self.prefilter = re.compile("|".join(f"(?:{pattern})" for pattern in (rules or LOG_RULES).values()))
+
+    def classify(self, line: str) -> List[str]:
+        """Категории строки (пустой список - строка не интересна)"""
+        if not self.prefilter.search(line):
+            return []
+        return [name for name, regex in self.rules if regex.search(line)]
+
+class IncrementalLogReader:
+    """Чтение только новых строк логов с сохраняемым курсором
+
+    Для каждого файла хранится inode и смещение конца последней полной
+    строки; курсоры переживают перезапуск бота (CURSORS_FILE). При
+    ротации (другой inode) сначала дочитывается хвост старого файла,
+    если он лежит рядом как <лог>.1, затем новый файл читается с начала;
+    укороченный файл читается с начала. Файл, которого еще нет в курсорах,
+    начинается с конца - старые записи не учитываются.
+
+    Блокирующие вызовы; из async-кода - через asyncio.to_thread.
+    """
+
+    # Больше этого за один вызов не читается, остаток - в следующем цикле
+    MAX_READ = 8 * 1024 * 1024
+
+    def __init__(self, cursors_file: str = CURSORS_FILE):
+        self.cursors_file = cursors_file
+        self.cursors: Dict[str, Dict[str, int]] = {}
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.cursors_file, 'r', encoding='utf-8') as f:
+                self.cursors = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Ошибка чтения курсоров логов: {e}")
+
+    def save(self):
+        """Сохранение курсоров, если они изменились"""
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.cursors_file) or ".", exist_ok=True)
+                tmp_path = self.cursors_file + ".tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.cursors, f)
+                os.replace(tmp_path, self.cursors_file)
+                self._dirty = False
+            except Exception as e:
+                self.logger.error(f"Ошибка сохранения курсоров логов: {e}")
+
+    def read_new_lines(self, path: str, encoding: str = 'utf-8') -> List[str]:
+        """Полные строки, дописанные после прошлого вызова"""
+        with self._lock:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                return []
+
+            cursor = self.cursors.get(path)
+            if cursor is None:
+                # Новый файл: начинаем с конца
+                self._set_cursor(path, st.st_ino, st.st_size)
+                return []
+
+            chunks: List[bytes] = []
+            offset = cursor["offset"]
+            if cursor["ino"] != st.st_ino:
+                # Ротация: хвост старого файла, затем новый с начала
+                rotated = self._find_rotated(path, cursor["ino"])
+                if rotated:
+                    chunks.append(self._read_complete(rotated, offset)[0])
+                offset = 0
+            elif st.st_size < offset:
+                # Файл усечен
+                offset = 0
+
+            data, offset = self._read_complete(path, offset)
+            chunks.append(data)
+            self._set_cursor(path, st.st_ino, offset)
+
+        text = b"".join(chunks).decode(encoding, errors='ignore')
+        return text.splitlines()
+
+    def _set_cursor(self, path: str, ino: int, offset: int):
+        if self.cursors.get(path) != {"ino": ino, "offset": offset}:
+            self.cursors[path] = {"ino": ino, "offset": offset}
+            self._dirty = True
+
+    @staticmethod
+    def _find_rotated(path: str, ino: int) -> Optional[str]:
+        """Ротированная копия лога с прежним inode"""
+        for candidate in (path + ".1", path + ".0", path + "-old"):
+            try:
+                if os.stat(candidate).st_ino == ino:
+                    return candidate
+            except OSError:
+                continue
+        return None
+
+    def _read_complete(self, path: str, offset: int) -> Tuple[bytes, int]:
+        """Байты от offset до конца последней полной строки и новое смещение"""
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(self.MAX_READ)
+        end = data.rfind(b"\n") + 1
+        if not end and len(data) == self.MAX_READ:
+            # Строка длиннее MAX_READ пропускается, чтобы курсор не застрял
+            end = len(data)
+        return data[:end], offset + end
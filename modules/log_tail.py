@@ -0,0 +1,91 @@
+import os
+import threading
+from collections import deque
+from typing import Dict, Any, List
+
+class LogTail:
+    """Чтение последних строк логов без загрузки всего файла
+
+    Первый запрос читает файл блоками с конца, пока не наберется нужное
+    число строк. Для каждого лога запоминается смещение конца, inode и
+    последние строки, поэтому повторное "обновить" дочитывает только
+    дописанные байты. Ротация (другой inode или файл стал короче)
+    сбрасывает кэш.
+    """
+
+    BLOCK_SIZE = 64 * 1024
+    # Прирост больше этого порога выгоднее перечитать с конца
+    MAX_DELTA = 16 * BLOCK_SIZE
+
+    def __init__(self):
+        self.cache: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def tail(self, path: str, lines: int = 50, encoding: str = 'utf-8') -> List[str]:
+        """Последние строки файла (как readlines()[-lines:])
+
+        Блокирующий вызов; из async-кода вызывать через asyncio.to_thread.
+        """
+        if lines <= 0:
+            return []
+
+        with self._lock, open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            entry = self.cache.get(path)
+
+            if (entry is None
+                    or entry["ino"] != st.st_ino
+                    or st.st_size < entry["offset"]
+                    or st.st_size - entry["offset"] > self.MAX_DELTA
+                    or lines > entry["lines"].maxlen):
+                entry = self._read_from_end(f, st, lines)
+                self.cache[path] = entry
+            elif st.st_size > entry["offset"]:
+                self._read_appended(f, st, entry)
+
+            result = list(entry["lines"])[-lines:]
+            if entry["partial"]:
+                result = result[-(lines - 1):] if lines > 1 else []
+                result.append(entry["partial"])
+
+        return [line.decode(encoding, errors='replace') for line in result]
+
+    def _read_from_end(self, f, st: os.stat_result, count: int) -> Dict[str, Any]:
+        """Чтение блоками с конца до count полных строк"""
+        pos = st.st_size
+        buf = b""
+        while pos > 0 and buf.count(b"\n") <= count:
+            step = min(self.BLOCK_SIZE, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+
+        pieces = buf.split(b"\n")
+        partial = pieces.pop()
+        # Первый кусок обрезан, если начало файла не достигнуто
+        if pos > 0 and pieces:
+            pieces.pop(0)
+
+        return {
+            "ino": st.st_ino,
+            "offset": st.st_size,
+            "lines": deque((piece + b"\n" for piece in pieces[-count:]), maxlen=count),
+            "partial": partial
+        }
+
+    def _read_appended(self, f, st: os.stat_result, entry: Dict[str, Any]):
+        """Дочитывание байтов, дописанных после прошлого запроса"""
+        f.seek(entry["offset"])
+        data = entry["partial"] + f.read(st.st_size - entry["offset"])
+        pieces = data.split(b"\n")
+        entry["partial"] = pieces.pop()
+        entry["lines"].extend(piece + b"\n" for piece in pieces)
+        entry["offset"] = st.st_size
+
+    def forget(self, path: str):
+        """Сброс кэша для файла"""
+        with self._lock:
+            self.cache.pop(path, None)
+
+# Общий экземпляр: кэш смещений живет между нажатиями "обновить"
+log_tail = LogTail()
@@ -1,5 +1,4 @@
 import asyncio
-import subprocess
 import psutil
 import logging
 import os
@@ -8,6 +7,8 @@ import time
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 import json
+from modules.bot_supervisor import BotSupervisor
+from modules.log_tail import log_tail
 
 class ProcessManager:
     """Модуль управления процессами для Termux"""
@@ -18,6 +19,11 @@ class ProcessManager:
         self.logger = logging.getLogger(__name__)
         self.processes = {}  # {bot_name: process_info}
         self.process_logs = {}  # {bot_name: [log_entries]}
+        # PID -> psutil.Process между обновлениями: cpu_percent(interval=None)
+        # считает загрузку от прошлого вызова на том же объекте
+        self._proc_cache: Dict[int, psutil.Process] = {}
+        # Жизненный цикл запущенных нами ботов (ожидание, автоперезапуск)
+        self.supervisor = BotSupervisor(self.config, self._on_supervisor_event)
         
     async def get_bots_status(self, user_id: int) -> Optional[List[Dict[str, Any]]]:
         """Получение статуса всех ботов"""
@@ -25,12 +31,20 @@ class ProcessManager:
             return None
             
         bots_status = []
+        enabled_bots = {name: cfg for name, cfg in self.config.items() if cfg.get("enabled", True)}
         
-        for bot_name, bot_config in self.config.items():
-            if not bot_config.get("enabled", True):
-                continue
-                
-            status = await self._get_bot_status(bot_name, bot_config)
+        # Один обход процессов на всех ботов, кроме запущенных нами и живых
+        untracked = [
+            os.path.basename(cfg.get("path", "")) for name, cfg in enabled_bots.items()
+            if cfg.get("path") and self._get_tracked_process(name) is None
+        ]
+        process_index = await asyncio.to_thread(self._build_process_index, untracked) if untracked else {}
+        
+        seen_pids = set()
+        for bot_name, bot_config in enabled_bots.items():
+            status = await self._get_bot_status(bot_name, bot_config, process_index)
+            if status["pid"]:
+                seen_pids.add(status["pid"])
             bots_status.append({
                 "name": bot_name,
                 "display_name": bot_config.get("name", bot_name),
@@ -44,49 +58,118 @@ class ProcessManager:
                 "last_error": status.get("last_error"),
                 "restart_count": status.get("restart_count", 0)
             })
+        
+        # Завершившиеся процессы из кэша убираем
+        for pid in list(self._proc_cache):
+            if pid not in seen_pids:
+                del self._proc_cache[pid]
             
         return bots_status
     
-    async def _get_bot_status(self, bot_name: str, bot_config: dict) -> Dict[str, Any]:
-        """Получение статуса конкретного бота"""
+    def _cached_process(self, pid: int) -> psutil.Process:
+        """psutil.Process из кэша, если PID не переиспользован (сверка по create_time)"""
+        proc = psutil.Process(pid)
+        cached = self._proc_cache.get(pid)
+        # Process.__eq__ сравнивает PID и время создания
+        if cached is not None and cached == proc:
+            return cached
+        self._proc_cache[pid] = proc
+        return proc
+    
+    def _build_process_index(self, script_names: List[str]) -> Dict[str, int]:
+        """Индекс "имя скрипта -> PID" за один обход процессов
+        
+        Сопоставление идет по basename аргументов командной строки,
+        поэтому /proc/*/cmdline читается один раз на обновление.
+        """
+        wanted = set(script_names)
+        index = {}
+        if not wanted:
+            return index
+        
+        for proc in psutil.process_iter(['pid', 'cmdline']):
+            try:
+                for arg in proc.info.get('cmdline') or []:
+                    name = os.path.basename(arg)
+                    if name in wanted and name not in index:
+                        index[name] = proc.info['pid']
+                        break
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            if len(index) == len(wanted):
+                break
+        
+        return index
+    
+    def _get_tracked_process(self, bot_name: str) -> Optional[psutil.Process]:
+        """Процесс, запущенный нами, если он жив и PID не переиспользован"""
+        info = self.processes.get(bot_name)
+        if not info or not info.get("pid"):
+            return None
+        try:
+            proc = self._cached_process(info["pid"])
+            if info.get("create_time") and abs(proc.create_time() - info["create_time"]) > 1:
+                return None
+            if proc.status() == psutil.STATUS_ZOMBIE:
+                return None
+            return proc
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return None
+    
+    def _describe_process(self, proc: psutil.Process) -> Dict[str, Any]:
+        """Сведения о процессе бота (один снимок через oneshot)"""
+        with proc.oneshot():
+            uptime_seconds = int(time.time() - proc.create_time())
+            return {
+                "status": "running",
+                "pid": proc.pid,
+                "uptime": self._format_uptime(uptime_seconds),
+                "memory_mb": round(proc.memory_info().rss / (1024**2), 1),
+                "cpu_percent": round(proc.cpu_percent(interval=None), 1),
+                "status_detail": proc.status(),
+                "num_threads": proc.num_threads(),
+                "num_fds": proc.num_fds() if hasattr(proc, 'num_fds') else None,
+                "connections": len(proc.connections()) if hasattr(proc, 'connections') else 0
+            }
+    
+    async def _get_bot_status(self, bot_name: str, bot_config: dict, process_index: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """Получение статуса конкретного бота
+        
+        process_index - индекс из _build_process_index; без него строится
+        индекс только для этого бота.
+        """
         try:
-            # Поиск процесса по имени файла
             process_path = bot_config.get("path", "")
             if not process_path:
                 return {"status": "unknown", "pid": None, "uptime": "0", "memory_mb": 0, "cpu_percent": 0}
             
-            script_name = os.path.basename(process_path)
+            restart_count = self.processes.get(bot_name, {}).get("restart_count", 0)
             
-            for proc in psutil.process_iter(['pid', 'name', 'cmdline', 'create_time', 'memory_info', 'cpu_percent', 'status']):
-                try:
-                    proc_info = proc.info
-                    cmdline = proc_info.get('cmdline', [])
-                    
-                    # Проверка по имени скрипта
-                    if any(script_name in cmd for cmd in cmdline if cmd):
-                        uptime_seconds = int(time.time() - proc_info['create_time'])
-                        uptime_str = self._format_uptime(uptime_seconds)
-                        
-                        # Получаем дополнительную информацию о процессе
-                        proc_obj = psutil.Process(proc_info['pid'])
-                        memory_info = proc_obj.memory_info()
-                        
-                        return {
-                            "status": "running",
-                            "pid": proc_info['pid'],
-                            "uptime": uptime_str,
-                            "memory_mb": round(memory_info.rss / (1024**2), 1),
-                            "cpu_percent": round(proc_info['cpu_percent'], 1),
-                            "status_detail": proc_info['status'],
-                            "num_threads": proc_obj.num_threads(),
-                            "num_fds": proc_obj.num_fds() if hasattr(proc_obj, 'num_fds') else None,
-                            "connections": len(proc_obj.connections()) if hasattr(proc_obj, 'connections') else 0
-                        }
-                        
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
+            # Сначала процесс, который мы запустили сами
+            proc = self._get_tracked_process(bot_name)
             
-            return {"status": "stopped", "pid": None, "uptime": "0", "memory_mb": 0, "cpu_percent": 0}
+            if proc is None:
+                script_name = os.path.basename(process_path)
+                if process_index is None:
+                    process_index = await asyncio.to_thread(self._build_process_index, [script_name])
+                pid = process_index.get(script_name)
+                if pid:
+                    try:
+                        proc = self._cached_process(pid)
+                    except psutil.NoSuchProcess:
+                        proc = None
+            
+            if proc is None:
+                return {"status": "stopped", "pid": None, "uptime": "0", "memory_mb": 0, "cpu_percent": 0, "restart_count": restart_count}
+            
+            try:
+                # oneshot и connections() читают /proc - не в event loop
+                status = await asyncio.to_thread(self._describe_process, proc)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                return {"status": "stopped", "pid": None, "uptime": "0", "memory_mb": 0, "cpu_percent": 0, "restart_count": restart_count}
+            
+            status["restart_count"] = restart_count
+            return status
             
         except Exception as e:
             self.logger.error(f"Ошибка получения статуса бота {bot_name}: {e}")
@@ -120,30 +203,17 @@ class ProcessManager:
             os.makedirs(log_dir, exist_ok=True)
             log_file = os.path.join(log_dir, f"{bot_name}.log")
             
-            # Запуск в фоновом режиме с перенаправлением вывода
-            with open(log_file, 'a') as log:
-                process = subprocess.Popen(
-                    ["python", process_path],
-                    stdout=log,
-                    stderr=log,
-                    cwd=os.path.dirname(process_path),
-                    preexec_fn=os.setsid if hasattr(os, 'setsid') else None
-                )
+            # Запуск под надзором с перенаправлением вывода
+            pid = await self.supervisor.start(bot_name, process_path, log_file)
             
             # Сохранение информации о процессе
-            self.processes[bot_name] = {
-                "pid": process.pid,
-                "start_time": datetime.now(),
-                "started_by": user_id,
-                "log_file": log_file,
-                "restart_count": self.processes.get(bot_name, {}).get("restart_count", 0) + 1
-            }
+            self._track_process(bot_name, pid, started_by=user_id, log_file=log_file)
             
             # Логирование запуска
-            await self._log_bot_event(bot_name, "started", user_id, process.pid)
+            await self._log_bot_event(bot_name, "started", user_id, pid)
             
-            self.logger.info(f"Бот {bot_name} запущен пользователем {user_id} (PID: {process.pid})")
-            return {"success": True, "message": f"✅ Бот {bot_name} успешно запущен (PID: {process.pid})"}
+            self.logger.info(f"Бот {bot_name} запущен пользователем {user_id} (PID: {pid})")
+            return {"success": True, "message": f"✅ Бот {bot_name} успешно запущен (PID: {pid})"}
             
         except Exception as e:
             self.logger.error(f"Ошибка запуска бота {bot_name}: {e}")
@@ -160,27 +230,17 @@ class ProcessManager:
             current_status = await self._get_bot_status(bot_name, bot_config)
             
             if current_status["status"] != "running":
+                # Отменяем ожидающий автоперезапуск, если он есть
+                await self.supervisor.stop(bot_name)
                 return {"success": False, "message": f"❌ Бот {bot_name} не запущен"}
             
-            # Остановка процесса
+            # Остановка процесса: свой - через надзор, чужой - в отдельном потоке
             pid = current_status["pid"]
             if pid:
-                process = psutil.Process(pid)
-                
-                # Попытка graceful shutdown
-                process.terminate()
-                
-                # Ждем завершения
-                try:
-                    process.wait(timeout=10)
-                except psutil.TimeoutExpired:
-                    # Принудительное завершение
-                    try:
-                        process.kill()
-                        process.wait(timeout=5)
-                    except psutil.TimeoutExpired:
-                        # Последняя попытка - SIGKILL
-                        os.kill(pid, signal.SIGKILL)
+                if self.supervisor.get_pid(bot_name) == pid:
+                    await self.supervisor.stop(bot_name)
+                else:
+                    await asyncio.to_thread(self._terminate_process, pid)
                 
                 # Удаление из списка процессов
                 if bot_name in self.processes:
@@ -203,14 +263,27 @@ class ProcessManager:
         if not await self.role_manager.check_permission(user_id, "processes", "restart"):
             return {"success": False, "message": "❌ Нет прав для перезапуска процессов"}
             
-        # Сначала останавливаем
+        bot_config = self.config.get(bot_name, {})
+        if bot_name in self.supervisor.children and bot_config.get("enabled", True):
+            # Бот уже запускался под надзором: перезапуск тем же скриптом и логом
+            current_status = await self._get_bot_status(bot_name, bot_config)
+            if current_status["status"] != "running" or current_status["pid"] == self.supervisor.get_pid(bot_name):
+                try:
+                    pid = await self.supervisor.restart(bot_name)
+                    self._track_process(bot_name, pid, started_by=user_id)
+                    await self._log_bot_event(bot_name, "restarted", user_id, pid)
+                    self.logger.info(f"Бот {bot_name} перезапущен пользователем {user_id} (PID: {pid})")
+                    return {"success": True, "message": f"✅ Бот {bot_name} успешно перезапущен (PID: {pid})"}
+                except Exception as e:
+                    self.logger.error(f"Ошибка перезапуска бота {bot_name}: {e}")
+                    return {"success": False, "message": f"❌ Ошибка перезапуска бота {bot_name}: {str(e)}"}
+        
+        # Бот не под надзором (или запущен извне): остановка и запуск
         stop_result = await self.stop_bot(bot_name, user_id)
         if not stop_result["success"] and "не запущен" not in stop_result["message"]:
             return stop_result
         
-        # Ждем немного
-        await asyncio.sleep(2)
-        
+        # stop_bot дожидается завершения процесса, пауза не нужна
         # Затем запускаем
         start_result = await self.start_bot(bot_name, user_id)
         if start_result["success"]:
@@ -229,11 +302,8 @@ class ProcessManager:
             if not os.path.exists(log_file):
                 return f"📝 Логи для бота {bot_name} не найдены"
             
-            with open(log_file, 'r', encoding='utf-8') as f:
-                log_lines = f.readlines()
-            
-            # Берем последние строки
-            recent_logs = log_lines[-lines:] if len(log_lines) > lines else log_lines
+            # Последние строки читаются с конца файла, повторно - только дописанное
+            recent_logs = await asyncio.to_thread(log_tail.tail, log_file, lines)
             
             if not recent_logs:
                 return f"📝 Логи для бота {bot_name} пусты"
@@ -244,6 +314,14 @@ class ProcessManager:
             self.logger.error(f"Ошибка чтения логов бота {bot_name}: {e}")
             return f"❌ Ошибка чтения логов: {str(e)}"
     
+    async def get_bot_log_file(self, bot_name: str, user_id: int) -> Optional[str]:
+        """Путь к логу бота для режима слежения (с проверкой прав)"""
+        if not await self.role_manager.check_permission(user_id, "processes", "view"):
+            return None
+        if bot_name not in self.config:
+            return None
+        return f"logs/bots/{bot_name}.log"
+    
     async def get_bots_status_text(self, user_id: int) -> str:
         """Получение статуса ботов в текстовом виде"""
         if not await self.role_manager.check_permission(user_id, "processes", "view"):
@@ -285,7 +363,7 @@ class ProcessManager:
             
         try:
             processes = []
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'status', 'create_time', 'username']):
+            for proc in psutil.process_iter(['pid', 'name', 'cmdline', 'cpu_percent', 'memory_percent', 'status', 'create_time', 'username']):
                 try:
                     proc_info = proc.info
                     if proc_info['cpu_percent'] > 0 or proc_info['memory_percent'] > 0:
@@ -295,6 +373,7 @@ class ProcessManager:
                         processes.append({
                             'pid': proc_info['pid'],
                             'name': proc_info['name'],
+                            'cmdline': proc_info.get('cmdline') or [],
                             'cpu_percent': round(proc_info['cpu_percent'], 1),
                             'memory_percent': round(proc_info['memory_percent'], 1),
                             'memory_mb': round(memory_info.rss / (1024**2), 1),
@@ -321,13 +400,7 @@ class ProcessManager:
             return False
             
         try:
-            process = psutil.Process(pid)
-            process.terminate()
-            
-            try:
-                process.wait(timeout=10)
-            except psutil.TimeoutExpired:
-                process.kill()
+            await asyncio.to_thread(self._terminate_process, pid)
             
             self.logger.info(f"Процесс {pid} завершен пользователем {user_id}")
             return True
@@ -336,7 +409,47 @@ class ProcessManager:
             self.logger.error(f"Ошибка завершения процесса {pid}: {e}")
             return False
     
-    async def _log_bot_event(self, bot_name: str, event: str, user_id: int, pid: Optional[int] = None):
+    def _terminate_process(self, pid: int, timeout: float = 10):
+        """Завершение процесса с ожиданием (блокирующее, вызывать через to_thread)"""
+        process = psutil.Process(pid)
+        process.terminate()
+        try:
+            process.wait(timeout=timeout)
+        except psutil.TimeoutExpired:
+            process.kill()
+            try:
+                process.wait(timeout=5)
+            except psutil.TimeoutExpired:
+                os.kill(pid, signal.SIGKILL)
+    
+    def _track_process(self, bot_name: str, pid: int, **extra):
+        """Запоминание PID запущенного бота вместе с create_time"""
+        try:
+            create_time = psutil.Process(pid).create_time()
+        except psutil.NoSuchProcess:
+            create_time = None
+        
+        info = self.processes.get(bot_name, {})
+        info.update(extra)
+        info.update({
+            "pid": pid,
+            "create_time": create_time,
+            "start_time": datetime.now(),
+            "restart_count": info.get("restart_count", 0) + 1
+        })
+        self.processes[bot_name] = info
+    
+    async def _on_supervisor_event(self, bot_name: str, event: str, pid: Optional[int]):
+        """События надзора: завершение и автоперезапуск ботов"""
+        if event == "auto_restarted":
+            self._track_process(bot_name, pid)
+        await self._log_bot_event(bot_name, event, None, pid)
+    
+    async def shutdown(self):
+        """Остановка ботов под надзором при завершении"""
+        await self.supervisor.shutdown()
+    
+    async def _log_bot_event(self, bot_name: str, event: str, user_id: Optional[int], pid: Optional[int] = None):
         """Логирование событий бота"""
         try:
             log_entry = {
@@ -0,0 +1,105 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List
+
+class SlidingWindowDetector:
+    """Счетчик событий по ключу (IP) в скользящем окне с блокировками
+
+    Окно делится на buckets корзин; для ключа хранятся только непустые
+    корзины последнего окна, старые отбрасываются при следующем событии.
+    Число отслеживаемых ключей и блокировок ограничено (max_tracked,
+    max_blocked): при переполнении вытесняется ключ, который дольше всех
+    не встречался (LRU). Блокировки снимаются сами через block_duration,
+    поэтому память не растет даже при распределенном переборе с сотен
+    тысяч адресов.
+    """
+
+    def __init__(self, threshold: int, window: float, block_duration: Optional[float] = None,
+                 buckets: int = 12, max_tracked: int = 10000, max_blocked: int = 10000):
+        self.threshold = threshold
+        self.window = window
+        self.block_duration = block_duration if block_duration is not None else window
+        self.bucket_width = window / buckets
+        self.max_tracked = max_tracked
+        self.max_blocked = max_blocked
+        # ключ -> {"buckets": {номер корзины: счет}, "first": время, "last": время}
+        self.tracked: OrderedDict = OrderedDict()
+        # ключ -> время снятия блокировки (по возрастанию: длительность одна)
+        self.blocked: OrderedDict = OrderedDict()
+
+    def hit(self, key: str, now: Optional[float] = None) -> int:
+        """Учет события; возвращает число событий ключа в окне"""
+        now = time.monotonic() if now is None else now
+        current = int(now // self.bucket_width)
+        oldest = current - int(self.window // self.bucket_width) + 1
+
+        entry = self.tracked.get(key)
+        if entry is None:
+            entry = {"buckets": {}, "first": now, "last": now}
+            self.tracked[key] = entry
+            if len(self.tracked) > self.max_tracked:
+                self.tracked.popitem(last=False)
+        else:
+            self.tracked.move_to_end(key)
+
+        buckets = entry["buckets"]
+        for index in [index for index in buckets if index < oldest]:
+            del buckets[index]
+        buckets[current] = buckets.get(current, 0) + 1
+        entry["last"] = now
+        return sum(buckets.values())
+
+    def count(self, key: str, now: Optional[float] = None) -> int:
+        """Число событий ключа в текущем окне"""
+        entry = self.tracked.get(key)
+        if entry is None:
+            return 0
+        now = time.monotonic() if now is None else now
+        oldest = int(now // self.bucket_width) - int(self.window // self.bucket_width) + 1
+        return sum(count for index, count in entry["buckets"].items() if index >= oldest)
+
+    def exceeded(self, key: str, now: Optional[float] = None) -> bool:
+        """Превышен ли порог событий в окне"""
+        return self.count(key, now) >= self.threshold
+
+    def block(self, key: str, now: Optional[float] = None) -> float:
+        """Блокировка ключа на block_duration; возвращает время снятия"""
+        now = time.monotonic() if now is None else now
+        self.blocked.pop(key, None)
+        self.blocked[key] = now + self.block_duration
+        if len(self.blocked) > self.max_blocked:
+            self.blocked.popitem(last=False)
+        # Счетчик заблокированного ключа больше не нужен
+        self.tracked.pop(key, None)
+        return self.blocked[key]
+
+    def is_blocked(self, key: str, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        expires = self.blocked.get(key)
+        if expires is None:
+            return False
+        if expires <= now:
+            del self.blocked[key]
+            return False
+        return True
+
+    def expire(self, now: Optional[float] = None) -> List[str]:
+        """Снятие истекших блокировок и забывание неактивных ключей"""
+        now = time.monotonic() if now is None else now
+        released = []
+        while self.blocked:
+            key, expires = next(iter(self.blocked.items()))
+            if expires > now:
+                break
+            self.blocked.popitem(last=False)
+            released.append(key)
+        # Ключи без событий дольше окна: их корзины все равно пусты
+        while self.tracked:
+            key, entry = next(iter(self.tracked.items()))
+            if now - entry["last"] < self.window:
+                break
+            self.tracked.popitem(last=False)
+        return released
+
+    def stats(self) -> Dict[str, Any]:
+        return {"tracked": len(self.tracked), "blocked": len(self.blocked)}
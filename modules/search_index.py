@@ -0,0 +1,167 @@
+import heapq
+import os
+import re
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Set, Tuple
+
+_WORD_START = re.compile(r"[^0-9a-zа-яё]")
+
+class SearchIndex:
+    """Индекс имен файлов для поиска в хранилище (в памяти)
+
+    Имена разбиваются на триграммы; подстрока длиной от 3 символов ищется
+    пересечением списков файлов по ее триграммам (от самого короткого),
+    после чего совпадение проверяется по самому имени. Отдельно ведутся
+    списки по владельцу и по расширению, поэтому обычный пользователь
+    проверяет только свои файлы.
+
+    Синтаксис запроса: слова через пробел - все должны входить в имя;
+    "отчет*" - имя начинается с "отчет"; ".pdf" - фильтр по расширению.
+    """
+
+    def __init__(self):
+        # file_id -> (имя в нижнем регистре, владелец, расширение, время загрузки)
+        self.docs: Dict[str, Tuple[str, Any, str, float]] = {}
+        self.trigrams: Dict[str, Set[str]] = {}
+        self.by_owner: Dict[Any, Set[str]] = {}
+        self.by_extension: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    @staticmethod
+    def _trigrams(text: str) -> Set[str]:
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    @staticmethod
+    def _timestamp(upload_time: str) -> float:
+        try:
+            return datetime.fromisoformat(upload_time).timestamp()
+        except (TypeError, ValueError):
+            return 0.0
+
+    @staticmethod
+    def _extension(name: str) -> str:
+        return os.path.splitext(name)[1].lower().lstrip('.')
+
+    def add(self, file_id: str, name: str, owner: Any, upload_time: str = "") -> None:
+        """Добавление (или обновление) файла в индексе"""
+        if file_id in self.docs:
+            self.remove(file_id)
+        name_lower = name.lower()
+        extension = self._extension(name_lower)
+        self.docs[file_id] = (name_lower, owner, extension, self._timestamp(upload_time))
+        for trigram in self._trigrams(name_lower):
+            self.trigrams.setdefault(trigram, set()).add(file_id)
+        self.by_owner.setdefault(owner, set()).add(file_id)
+        self.by_extension.setdefault(extension, set()).add(file_id)
+
+    def remove(self, file_id: str) -> bool:
+        """Удаление файла из индекса"""
+        doc = self.docs.pop(file_id, None)
+        if doc is None:
+            return False
+        name_lower, owner, extension, _ = doc
+        for trigram in self._trigrams(name_lower):
+            self._discard(self.trigrams, trigram, file_id)
+        self._discard(self.by_owner, owner, file_id)
+        self._discard(self.by_extension, extension, file_id)
+        return True
+
+    @staticmethod
+    def _discard(postings: Dict[Any, Set[str]], key: Any, file_id: str):
+        ids = postings.get(key)
+        if ids is not None:
+            ids.discard(file_id)
+            if not ids:
+                del postings[key]
+
+    def clear(self):
+        self.docs.clear()
+        self.trigrams.clear()
+        self.by_owner.clear()
+        self.by_extension.clear()
+
+    @staticmethod
+    def parse_query(query: str) -> Dict[str, List[str]]:
+        """Разбор запроса на подстроки, префиксы и расширения"""
+        parsed = {"terms": [], "prefixes": [], "extensions": []}
+        for token in query.lower().split():
+            if token.startswith('.') and len(token) > 1 and '.' not in token[1:]:
+                parsed["extensions"].append(token[1:])
+            elif token.endswith('*') and len(token) > 1:
+                parsed["prefixes"].append(token.rstrip('*'))
+            elif token != '*':
+                parsed["terms"].append(token)
+        return parsed
+
+    def search(self, query: str, owner: Any = None, limit: Optional[int] = None) -> List[str]:
+        """ID найденных файлов, лучшие совпадения первыми
+
+        owner=None - поиск по всем файлам (для админа).
+        """
+        parsed = self.parse_query(query)
+        if not any(parsed.values()):
+            return []
+
+        # Кандидаты: самые узкие списки первыми
+        candidate_sets: List[Set[str]] = []
+        if owner is not None:
+            candidate_sets.append(self.by_owner.get(owner, set()))
+        if parsed["extensions"]:
+            by_ext: Set[str] = set()
+            for extension in parsed["extensions"]:
+                by_ext |= self.by_extension.get(extension, set())
+            candidate_sets.append(by_ext)
+        for text in parsed["terms"] + parsed["prefixes"]:
+            if len(text) >= 3:
+                for trigram in self._trigrams(text):
+                    candidate_sets.append(self.trigrams.get(trigram, set()))
+
+        if candidate_sets:
+            candidate_sets.sort(key=len)
+            candidates = set(candidate_sets[0])
+            for ids in candidate_sets[1:]:
+                if not candidates:
+                    break
+                candidates &= ids
+        else:
+            # Только короткие подстроки: проверяются все имена
+            candidates = self.docs.keys()
+
+        terms = parsed["terms"]
+        prefixes = tuple(parsed["prefixes"])
+        docs = self.docs
+        results = []
+        for file_id in candidates:
+            name_lower, _, _, timestamp = docs[file_id]
+            if prefixes and not all(name_lower.startswith(prefix) for prefix in prefixes):
+                continue
+            for term in terms:
+                if term not in name_lower:
+                    break
+            else:
+                # Выше: точное совпадение, начало имени, начало слова; затем короче и новее
+                score = self._score(name_lower, terms) if terms else 0
+                results.append((-score, len(name_lower), -timestamp, file_id))
+
+        if limit:
+            results = heapq.nsmallest(limit, results)
+        else:
+            results.sort()
+        return [item[3] for item in results]
+
+    @staticmethod
+    def _score(name_lower: str, terms: List[str]) -> int:
+        stem = os.path.splitext(name_lower)[0]
+        score = 0
+        for term in terms:
+            if stem == term or name_lower == term:
+                score += 3
+            elif name_lower.startswith(term):
+                score += 2
+            else:
+                position = name_lower.find(term)
+                if position > 0 and _WORD_START.match(name_lower[position - 1]):
+                    score += 1
+        return score
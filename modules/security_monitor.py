@@ -10,6 +10,13 @@ import re
 import subprocess
 import psutil
 from pathlib import Path
+from modules.threat_signatures import get_signature_matcher
+from modules.connection_analyzer import ConnectionAnalyzer
+from modules.log_analyzer import IncrementalLogReader, LogClassifier
+from modules.rate_detector import SlidingWindowDetector
+from modules.integrity_baseline import IntegrityBaseline, DEFAULT_PROTECTED_PATHS
+from modules.integrity_watcher import IntegrityWatcher
+from modules.file_watcher import FileWatcher
 
 class SecurityMonitor:
     """Модуль мониторинга безопасности и обнаружения угроз"""
@@ -32,14 +39,12 @@ class SecurityMonitor:
         self.threat_database = {
             "suspicious_processes": set(),
             "suspicious_connections": set(),
-            "failed_login_attempts": {},
             "file_integrity_violations": [],
             "network_anomalies": []
         }
         
         # История событий безопасности
         self.security_events = []
-        self.blocked_ips = set()
         self.suspicious_users = set()
         
         # Настройки мониторинга
@@ -47,6 +52,41 @@ class SecurityMonitor:
         self.max_failed_attempts = self.config.get("max_failed_attempts", 5)
         self.block_duration = self.config.get("block_duration", 3600)  # 1 час
         
+        # Неудачные входы по IP в скользящем окне block_duration; состояние
+        # ограничено по числу IP, блокировки снимаются через block_duration
+        self.failed_logins = SlidingWindowDetector(
+            self.max_failed_attempts,
+            window=self.block_duration,
+            max_tracked=self.config.get("max_tracked_ips", 10000),
+            max_blocked=self.config.get("max_blocked_ips", 10000)
+        )
+        self.blocked_ips = self.failed_logins.blocked
+        
+        # Эталон целостности загружается один раз; пути - файлы или каталоги
+        self.integrity_baseline = IntegrityBaseline()
+        self.protected_paths = self.config.get("protected_paths", DEFAULT_PROTECTED_PATHS)
+        self.integrity_interval = self.config.get("integrity_interval", self.monitoring_interval)
+        
+        # Слежение по событиям ФС (inotify или опрос); полная проверка - страховка
+        self.integrity_watch = self.config.get("integrity_watch", True)
+        self.integrity_rescan_interval = self.config.get("integrity_rescan_interval", 3600)
+        self.integrity_watcher = IntegrityWatcher(
+            self.integrity_baseline,
+            self.protected_paths,
+            self._report_integrity_changes,
+            watcher=FileWatcher(poll_interval=self.config.get("integrity_poll_interval", 5.0))
+        )
+        
+        # Сигнатуры угроз (общие с ИИ-ассистентом)
+        self.signatures = get_signature_matcher(config)
+        
+        # Снимки сетевых соединений (более 10 соединений с IP - флуд)
+        self.connection_analyzer = ConnectionAnalyzer(self.config.get("max_connections_per_ip", 10))
+        
+        # Системные логи читаются с сохраненного курсора - только новые строки
+        self.log_reader = IncrementalLogReader()
+        self.log_classifier = LogClassifier()
+        
     async def start_security_monitoring(self):
         """Запуск мониторинга безопасности"""
         if not self.enabled:
@@ -78,8 +118,7 @@ class SecurityMonitor:
             # Проверка сетевых соединений
             await self._detect_suspicious_connections()
             
-            # Проверка файловой системы
-            await self._check_file_integrity()
+            # Целостность файлов проверяет _file_integrity_monitoring
             
             # Проверка системных логов
             await self._analyze_system_logs()
@@ -94,46 +133,22 @@ class SecurityMonitor:
             if not processes:
                 return
             
-            suspicious_patterns = [
-                # Криптомайнеры
-                r"xmrig", r"cpuminer", r"ccminer", r"ethminer", r"t-rex",
-                r"nbminer", r"lolminer", r"teamredminer", r"phoenixminer",
-                
-                # Вредоносное ПО
-                r"malware", r"virus", r"trojan", r"backdoor", r"keylogger",
-                r"spyware", r"adware", r"ransomware", r"botnet",
-                
-                # Подозрительные расширения
-                r"\.exe$", r"\.bat$", r"\.cmd$", r"\.scr$", r"\.com$",
-                r"\.pif$", r"\.vbs$", r"\.js$", r"\.jar$",
-                
-                # Подозрительные имена
-                r"crypto", r"miner", r"hash", r"coin", r"wallet",
-                r"update", r"install", r"setup", r"service",
-                
-                # Сетевые сканеры и атаки
-                r"nmap", r"masscan", r"hydra", r"medusa", r"sqlmap",
-                r"nikto", r"dirb", r"gobuster", r"wfuzz"
-            ]
-            
             for proc in processes:
-                process_name = proc["name"].lower()
+                # Все сигнатуры за один проход по имени и строке запуска
+                matches = self.signatures.match_all(proc["name"], proc.get("cmdline") or "")
                 
-                # Проверка по паттернам
-                for pattern in suspicious_patterns:
-                    if re.search(pattern, process_name, re.IGNORECASE):
-                        await self._report_suspicious_process(proc, pattern)
-                        break
+                # Аргументы майнера - отдельное критическое событие
+                if any(m["category"] == "mining_args" for m in matches):
+                    await self._report_mining_activity(proc)
+                
+                # Остальные категории (в том числе свои из файла сигнатур)
+                other = next((m for m in matches if m["category"] != "mining_args"), None)
+                if other:
+                    await self._report_suspicious_process(proc, other)
                 
                 # Проверка аномального потребления ресурсов
                 if proc["cpu_percent"] > 80 and proc["memory_percent"] > 20:
                     await self._report_resource_abuse(proc)
-                
-                # Проверка процессов с подозрительными аргументами
-                if proc.get("cmdline"):
-                    cmdline = " ".join(proc["cmdline"]).lower()
-                    if any(keyword in cmdline for keyword in ["--mining", "--pool", "--wallet", "--hashrate"]):
-                        await self._report_mining_activity(proc)
                         
         except Exception as e:
             self.logger.error(f"Ошибка обнаружения подозрительных процессов: {e}")
@@ -141,7 +156,9 @@ class SecurityMonitor:
     async def _detect_suspicious_connections(self):
         """Обнаружение подозрительных сетевых соединений"""
         try:
-            connections = psutil.net_connections()
+            # Один снимок за цикл, разбор в потоке: на нагруженном хосте
+            # соединений десятки тысяч
+            snapshot = await asyncio.to_thread(self.connection_analyzer.run)
             
             suspicious_ports = {
                 22, 23, 3389, 5900, 5901, 5902,  # SSH, Telnet, RDP, VNC
@@ -171,19 +188,19 @@ class SecurityMonitor:
                 8000, 8001, 8002,  # Django, другие
             }
             
-            for conn in connections:
-                if conn.status == 'ESTABLISHED':
-                    # Проверка подозрительных портов
-                    if conn.raddr and conn.raddr.port in suspicious_ports:
-                        await self._report_suspicious_connection(conn)
-                    
-                    # Проверка соединений с известными вредоносными IP
-                    if conn.raddr and self._is_suspicious_ip(conn.raddr.ip):
-                        await self._report_malicious_connection(conn)
-                    
-                    # Проверка множественных соединений
-                    if self._has_multiple_connections(conn.raddr.ip if conn.raddr else None):
-                        await self._report_connection_flood(conn)
+            # Проверяются только соединения, появившиеся с прошлого снимка
+            for conn in snapshot["new"]:
+                # Проверка подозрительных портов
+                if conn.raddr.port in suspicious_ports:
+                    await self._report_suspicious_connection(conn)
+                
+                # Проверка соединений с известными вредоносными IP
+                if self._is_suspicious_ip(conn.raddr.ip):
+                    await self._report_malicious_connection(conn)
+            
+            # Проверка множественных соединений: IP, впервые превысившие порог
+            for ip_address, count in snapshot["new_flood"].items():
+                await self._report_connection_flood(ip_address, count)
                         
         except Exception as e:
             self.logger.error(f"Ошибка обнаружения подозрительных соединений: {e}")
@@ -191,29 +208,27 @@ class SecurityMonitor:
     async def _check_file_integrity(self):
         """Проверка целостности файлов"""
         try:
-            critical_files = [
-                "/etc/passwd", "/etc/shadow", "/etc/hosts",
-                "/etc/ssh/sshd_config", "/etc/fstab",
-                "/boot/grub/grub.cfg", "/etc/resolv.conf"
-            ]
-            
-            for file_path in critical_files:
-                if Path(file_path).exists():
-                    current_hash = await self._calculate_file_hash(file_path)
-                    stored_hash = self._get_stored_hash(file_path)
-                    
-                    if stored_hash and current_hash != stored_hash:
-                        await self._report_file_integrity_violation(file_path, stored_hash, current_hash)
-                    elif not stored_hash:
-                        # Первый запуск - сохраняем хеш
-                        self._store_file_hash(file_path, current_hash)
+            # Обход и хэширование в потоке; неизмененные по stat файлы не читаются
+            changes = await asyncio.to_thread(self.integrity_baseline.check, self.protected_paths)
+            await self._report_integrity_changes(changes)
                         
         except Exception as e:
             self.logger.error(f"Ошибка проверки целостности файлов: {e}")
     
+    async def _report_integrity_changes(self, changes: List[Dict[str, Any]]):
+        """Отчеты по изменениям защищаемых файлов"""
+        for change in changes:
+            await self._report_file_integrity_violation(
+                change["path"], change["old_hash"], change["new_hash"], change["change"]
+            )
+    
     async def _analyze_system_logs(self):
         """Анализ системных логов"""
         try:
+            # Снятие истекших блокировок
+            for ip_address in self.failed_logins.expire():
+                self.logger.info(f"Блокировка IP {ip_address} истекла")
+            
             log_files = [
                 "/var/log/auth.log",
                 "/var/log/syslog",
@@ -224,6 +239,8 @@ class SecurityMonitor:
             for log_file in log_files:
                 if Path(log_file).exists():
                     await self._analyze_log_file(log_file)
+            
+            await asyncio.to_thread(self.log_reader.save)
                     
         except Exception as e:
             self.logger.error(f"Ошибка анализа системных логов: {e}")
@@ -231,34 +248,37 @@ class SecurityMonitor:
     async def _analyze_log_file(self, log_file: str):
         """Анализ конкретного лог-файла"""
         try:
-            with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-                
-            # Анализ последних 1000 строк
-            recent_lines = lines[-1000:] if len(lines) > 1000 else lines
+            # Только строки, дописанные с прошлого цикла: каждая учитывается один раз
+            lines = await asyncio.to_thread(self.log_reader.read_new_lines, log_file)
             
-            for line in recent_lines:
+            for line in lines:
+                categories = self.log_classifier.classify(line)
+                if not categories:
+                    continue
+                
                 # Поиск неудачных попыток входа
-                if "Failed password" in line or "authentication failure" in line:
+                if "failed_login" in categories:
                     await self._analyze_failed_login(line)
                 
                 # Поиск подозрительной активности
-                if any(keyword in line.lower() for keyword in ["suspicious", "malware", "virus", "attack"]):
+                if "suspicious" in categories:
                     await self._report_suspicious_log_entry(line)
                 
                 # Поиск попыток эскалации привилегий
-                if "sudo" in line and "incorrect password" in line:
+                if "privilege_escalation" in categories:
                     await self._report_privilege_escalation_attempt(line)
                     
         except Exception as e:
             self.logger.error(f"Ошибка анализа лог-файла {log_file}: {e}")
     
-    async def _report_suspicious_process(self, process: Dict[str, Any], pattern: str):
+    async def _report_suspicious_process(self, process: Dict[str, Any], signature: Dict[str, Any]):
         """Отчет о подозрительном процессе"""
+        pattern = signature["pattern"]
         event = {
             "timestamp": datetime.now().isoformat(),
             "type": "suspicious_process",
-            "severity": "high",
+            "severity": signature["severity"],
+            "category": signature["category"],
             "process": {
                 "pid": process["pid"],
                 "name": process["name"],
@@ -355,16 +375,40 @@ class SecurityMonitor:
         
         self.logger.critical(f"ВРЕДОНОСНОЕ СОЕДИНЕНИЕ: {connection.raddr.ip}:{connection.raddr.port}")
     
-    async def _report_file_integrity_violation(self, file_path: str, original_hash: str, current_hash: str):
+    async def _report_connection_flood(self, ip_address: str, count: int):
+        """Отчет о множественных соединениях с одного IP"""
+        event = {
+            "timestamp": datetime.now().isoformat(),
+            "type": "connection_flood",
+            "severity": "medium",
+            "ip_address": ip_address,
+            "connections": count,
+            "description": f"Множественные соединения с IP {ip_address}: {count}"
+        }
+        
+        self.security_events.append(event)
+        self.threat_database["network_anomalies"].append(event)
+        
+        self.logger.warning(f"Множественные соединения: {ip_address} ({count})")
+    
+    async def _report_file_integrity_violation(self, file_path: str, original_hash: str, current_hash: str,
+                                               change: str = "modified"):
         """Отчет о нарушении целостности файла"""
+        if change == "deleted":
+            description = f"Удален критический файл: {file_path}"
+        elif change == "created":
+            description = f"Появился новый файл в защищаемом пути: {file_path}"
+        else:
+            description = f"Нарушена целостность критического файла: {file_path}"
         event = {
             "timestamp": datetime.now().isoformat(),
             "type": "file_integrity_violation",
             "severity": "critical",
             "file": file_path,
+            "change": change,
             "original_hash": original_hash,
             "current_hash": current_hash,
-            "description": f"Нарушена целостность критического файла: {file_path}"
+            "description": description
         }
         
         self.security_events.append(event)
@@ -382,36 +426,60 @@ class SecurityMonitor:
             if ip_match:
                 ip_address = ip_match.group(1)
                 
-                if ip_address not in self.threat_database["failed_login_attempts"]:
-                    self.threat_database["failed_login_attempts"][ip_address] = {
-                        "count": 0,
-                        "first_attempt": datetime.now(),
-                        "last_attempt": datetime.now()
-                    }
+                # Заблокированный IP уже учтен
+                if self.failed_logins.is_blocked(ip_address):
+                    return
                 
-                self.threat_database["failed_login_attempts"][ip_address]["count"] += 1
-                self.threat_database["failed_login_attempts"][ip_address]["last_attempt"] = datetime.now()
+                attempts = self.failed_logins.hit(ip_address)
                 
-                # Проверка на брутфорс атаку
-                if self.threat_database["failed_login_attempts"][ip_address]["count"] >= self.max_failed_attempts:
-                    await self._report_bruteforce_attack(ip_address)
+                # Проверка на брутфорс атаку: попытки в окне block_duration
+                if attempts >= self.max_failed_attempts:
+                    await self._report_bruteforce_attack(ip_address, attempts)
                     
         except Exception as e:
             self.logger.error(f"Ошибка анализа неудачного входа: {e}")
     
-    async def _report_bruteforce_attack(self, ip_address: str):
+    async def _report_suspicious_log_entry(self, log_line: str):
+        """Отчет о подозрительной записи в системном логе"""
+        event = {
+            "timestamp": datetime.now().isoformat(),
+            "type": "suspicious_log_entry",
+            "severity": "medium",
+            "log_line": log_line[:500],
+            "description": "Подозрительная запись в системном логе"
+        }
+        
+        self.security_events.append(event)
+        self.logger.warning(f"Подозрительная запись в логе: {log_line[:200]}")
+    
+    async def _report_privilege_escalation_attempt(self, log_line: str):
+        """Отчет о попытке эскалации привилегий"""
+        event = {
+            "timestamp": datetime.now().isoformat(),
+            "type": "privilege_escalation",
+            "severity": "high",
+            "log_line": log_line[:500],
+            "description": "Неудачная попытка sudo (неверный пароль)"
+        }
+        
+        self.security_events.append(event)
+        await self._notify_security_event(event)
+        
+        self.logger.warning(f"Попытка эскалации привилегий: {log_line[:200]}")
+    
+    async def _report_bruteforce_attack(self, ip_address: str, attempts: int):
         """Отчет о брутфорс атаке"""
         event = {
             "timestamp": datetime.now().isoformat(),
             "type": "bruteforce_attack",
             "severity": "high",
             "ip_address": ip_address,
-            "attempts": self.threat_database["failed_login_attempts"][ip_address]["count"],
+            "attempts": attempts,
             "description": f"Брутфорс атака с IP {ip_address}"
         }
         
         self.security_events.append(event)
-        self.blocked_ips.add(ip_address)
+        self.failed_logins.block(ip_address)
         
         await self._notify_security_event(event)
         
@@ -450,60 +518,6 @@ class SecurityMonitor:
         ]
         return ip_address in suspicious_ranges
     
-    def _has_multiple_connections(self, ip_address: str) -> bool:
-        """Проверка множественных соединений с одного IP"""
-        if not ip_address:
-            return False
-        
-        connections = psutil.net_connections()
-        count = sum(1 for conn in connections 
-                   if conn.raddr and conn.raddr.ip == ip_address and conn.status == 'ESTABLISHED')
-        
-        return count > 10  # Более 10 соединений считается подозрительным
-    
-    async def _calculate_file_hash(self, file_path: str) -> str:
-        """Вычисление хеша файла"""
-        try:
-            hash_md5 = hashlib.md5()
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
-        except Exception as e:
-            self.logger.error(f"Ошибка вычисления хеша файла {file_path}: {e}")
-            return ""
-    
-    def _get_stored_hash(self, file_path: str) -> Optional[str]:
-        """Получение сохраненного хеша файла"""
-        hash_file = Path("security/file_hashes.json")
-        if hash_file.exists():
-            try:
-                with open(hash_file, 'r') as f:
-                    hashes = json.load(f)
-                return hashes.get(file_path)
-            except Exception as e:
-                self.logger.error(f"Ошибка чтения хешей файлов: {e}")
-        return None
-    
-    def _store_file_hash(self, file_path: str, file_hash: str):
-        """Сохранение хеша файла"""
-        try:
-            hash_file = Path("security/file_hashes.json")
-            hash_file.parent.mkdir(exist_ok=True)
-            
-            hashes = {}
-            if hash_file.exists():
-                with open(hash_file, 'r') as f:
-                    hashes = json.load(f)
-            
-            hashes[file_path] = file_hash
-            
-            with open(hash_file, 'w') as f:
-                json.dump(hashes, f, indent=2)
-                
-        except Exception as e:
-            self.logger.error(f"Ошибка сохранения хеша файла: {e}")
-    
     async def get_security_report(self, user_id: int) -> Dict[str, Any]:
         """Получение отчета по безопасности"""
         if not await self.role_manager.check_permission(user_id, "security", "view"):
@@ -567,10 +581,26 @@ class SecurityMonitor:
     
     async def _file_integrity_monitoring(self):
         """Мониторинг целостности файлов"""
+        interval = self.integrity_interval
+        watching = False
+        if self.integrity_watch:
+            try:
+                # Изменения приходят событиями; опрос остается редкой страховкой
+                await self.integrity_watcher.start()
+                interval = self.integrity_rescan_interval
+                watching = True
+            except Exception as e:
+                self.logger.error(f"Ошибка запуска слежения за целостностью, только опрос: {e}")
+        
+        if not watching:
+            # Без слежения начальная проверка не ждет первого интервала
+            await self._check_file_integrity()
+        
         while self.enabled:
             try:
+                await asyncio.sleep(interval)
+                # Проверка дешевая: хэшируются только файлы с измененным stat
                 await self._check_file_integrity()
-                await asyncio.sleep(300)  # Проверка каждые 5 минут
             except Exception as e:
                 self.logger.error(f"Ошибка мониторинга целостности файлов: {e}")
                 await asyncio.sleep(300) 
\ No newline at end of file
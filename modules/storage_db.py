@@ -0,0 +1,308 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    file_id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    storage_filename TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    extension TEXT NOT NULL DEFAULT '',
+    upload_time TEXT NOT NULL,
+    path TEXT NOT NULL,
+    content_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_files_user_time ON files(user_id, upload_time, file_id);
+CREATE INDEX IF NOT EXISTS idx_files_upload_time ON files(upload_time, file_id);
+
+CREATE TABLE IF NOT EXISTS user_quota (
+    user_id INTEGER PRIMARY KEY,
+    file_count INTEGER NOT NULL DEFAULT 0,
+    total_bytes INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS blobs (
+    content_hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    refcount INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+FILE_COLUMNS = ("file_id", "user_id", "filename", "storage_filename", "size", "extension", "upload_time", "path", "content_hash")
+
+class StorageDB:
+    """Метаданные облачного хранилища в SQLite (режим WAL)
+
+    Загрузка и удаление файла - одна транзакция на одну строку files и
+    одну строку user_quota, вместо перезаписи всего metadata.json.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._upgrade_schema()
+
+    def _upgrade_schema(self):
+        """Добавление колонок, появившихся после создания базы"""
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(files)")}
+        if "content_hash" not in columns:
+            self.conn.execute("ALTER TABLE files ADD COLUMN content_hash TEXT")
+        # Индексы по времени загрузки дополнены file_id для постраничного вывода
+        index_columns = [row["name"] for row in self.conn.execute("PRAGMA index_info(idx_files_user_time)")]
+        if "file_id" not in index_columns:
+            self.conn.execute("DROP INDEX IF EXISTS idx_files_user_time")
+            self.conn.execute("DROP INDEX IF EXISTS idx_files_upload_time")
+            self.conn.executescript(SCHEMA)
+
+    def _row_to_info(self, row: sqlite3.Row) -> Dict[str, Any]:
+        return {column: row[column] for column in FILE_COLUMNS}
+
+    def add_file(self, info: Dict[str, Any], max_files: Optional[int] = None) -> bool:
+        """Добавление файла и обновление счетчиков владельца в одной транзакции
+
+        При заданном max_files проверка лимита и вставка атомарны;
+        возвращает False, если лимит уже достигнут.
+        """
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                if max_files is not None:
+                    row = self.conn.execute(
+                        "SELECT file_count FROM user_quota WHERE user_id = ?", (info["user_id"],)
+                    ).fetchone()
+                    if row is not None and row["file_count"] >= max_files:
+                        self.conn.execute("ROLLBACK")
+                        return False
+                self.conn.execute(
+                    f"INSERT INTO files ({', '.join(FILE_COLUMNS)}) VALUES ({', '.join('?' * len(FILE_COLUMNS))})",
+                    tuple(info[column] for column in FILE_COLUMNS)
+                )
+                self._bump_quota(info["user_id"], 1, info["size"])
+                if info.get("content_hash"):
+                    self.conn.execute(
+                        "INSERT INTO blobs (content_hash, size, refcount) VALUES (?, ?, 1) "
+                        "ON CONFLICT(content_hash) DO UPDATE SET refcount = refcount + 1",
+                        (info["content_hash"], info["size"])
+                    )
+                self.conn.execute("COMMIT")
+                return True
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def remove_file(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """Удаление записи о файле; возвращает удаленную запись
+
+        Для файлов в хранилище блобов уменьшается счетчик ссылок;
+        blob_released=True означает, что на содержимое ссылок не осталось.
+        """
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute("SELECT * FROM files WHERE file_id = ?", (file_id,)).fetchone()
+                if row is None:
+                    self.conn.execute("ROLLBACK")
+                    return None
+                self.conn.execute("DELETE FROM files WHERE file_id = ?", (file_id,))
+                self._bump_quota(row["user_id"], -1, -row["size"])
+                info = self._row_to_info(row)
+                info["blob_released"] = False
+                if row["content_hash"]:
+                    self.conn.execute(
+                        "UPDATE blobs SET refcount = refcount - 1 WHERE content_hash = ?", (row["content_hash"],)
+                    )
+                    deleted = self.conn.execute(
+                        "DELETE FROM blobs WHERE content_hash = ? AND refcount <= 0", (row["content_hash"],)
+                    ).rowcount
+                    info["blob_released"] = deleted > 0
+                self.conn.execute("COMMIT")
+                return info
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def _bump_quota(self, user_id: int, files_delta: int, bytes_delta: int):
+        self.conn.execute(
+            "INSERT INTO user_quota (user_id, file_count, total_bytes) VALUES (?, ?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET "
+            "file_count = file_count + excluded.file_count, "
+            "total_bytes = total_bytes + excluded.total_bytes",
+            (user_id, files_delta, bytes_delta)
+        )
+
+    def get_file(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """Запись о файле по ID"""
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM files WHERE file_id = ?", (file_id,)).fetchone()
+        return self._row_to_info(row) if row else None
+
+    def list_files(self, user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Файлы пользователя (или все при user_id=None), новые первыми"""
+        with self._lock:
+            if user_id is None:
+                rows = self.conn.execute("SELECT * FROM files ORDER BY upload_time DESC").fetchall()
+            else:
+                rows = self.conn.execute(
+                    "SELECT * FROM files WHERE user_id = ? ORDER BY upload_time DESC", (user_id,)
+                ).fetchall()
+        return [self._row_to_info(row) for row in rows]
+
+    def list_files_page(self, user_id: Optional[int] = None, cursor: Optional[Tuple[str, str]] = None,
+                        limit: int = 10) -> Tuple[List[Dict[str, Any]], Optional[Tuple[str, str]]]:
+        """Страница файлов, новые первыми (keyset-пагинация)
+
+        cursor - (upload_time, file_id) последнего файла предыдущей страницы;
+        запрос идет по индексу и читает не больше limit + 1 строк. Возвращает
+        файлы страницы и курсор следующей страницы (None - страница последняя).
+        """
+        conditions = []
+        params: List[Any] = []
+        if user_id is not None:
+            conditions.append("user_id = ?")
+            params.append(user_id)
+        if cursor is not None:
+            conditions.append("(upload_time, file_id) < (?, ?)")
+            params.extend(cursor)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT * FROM files {where}ORDER BY upload_time DESC, file_id DESC LIMIT ?",
+                (*params, limit + 1)
+            ).fetchall()
+
+        files = [self._row_to_info(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = (files[-1]["upload_time"], files[-1]["file_id"])
+        return files, next_cursor
+
+    def get_files(self, file_ids: List[str]) -> List[Dict[str, Any]]:
+        """Записи о файлах по списку ID в том же порядке"""
+        rows = {}
+        with self._lock:
+            # Ограничение SQLite на число параметров запроса
+            for start in range(0, len(file_ids), 500):
+                chunk = file_ids[start:start + 500]
+                for row in self.conn.execute(
+                    f"SELECT * FROM files WHERE file_id IN ({', '.join('?' * len(chunk))})", chunk
+                ):
+                    rows[row["file_id"]] = row
+        return [self._row_to_info(rows[file_id]) for file_id in file_ids if file_id in rows]
+
+    def get_blob_refcount(self, content_hash: str) -> int:
+        """Число файлов, ссылающихся на содержимое"""
+        with self._lock:
+            row = self.conn.execute("SELECT refcount FROM blobs WHERE content_hash = ?", (content_hash,)).fetchone()
+        return row["refcount"] if row else 0
+
+    def get_quota(self, user_id: int) -> Dict[str, int]:
+        """Счетчики пользователя: число файлов и суммарный размер"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT file_count, total_bytes FROM user_quota WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        if row is None:
+            return {"file_count": 0, "total_bytes": 0}
+        return {"file_count": row["file_count"], "total_bytes": row["total_bytes"]}
+
+    def reconcile_quotas(self) -> int:
+        """Пересчет счетчиков по таблице files; возвращает число исправленных пользователей"""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                drift = self.conn.execute(
+                    "SELECT COUNT(*) FROM ("
+                    "  SELECT q.user_id FROM user_quota q"
+                    "  LEFT JOIN (SELECT user_id, COUNT(*) AS c, SUM(size) AS s FROM files GROUP BY user_id) f"
+                    "  ON f.user_id = q.user_id"
+                    "  WHERE q.file_count != COALESCE(f.c, 0) OR q.total_bytes != COALESCE(f.s, 0)"
+                    "  UNION"
+                    "  SELECT user_id FROM files WHERE user_id NOT IN (SELECT user_id FROM user_quota)"
+                    ")"
+                ).fetchone()[0]
+                if drift:
+                    self.conn.execute("DELETE FROM user_quota")
+                    self.conn.execute(
+                        "INSERT INTO user_quota (user_id, file_count, total_bytes) "
+                        "SELECT user_id, COUNT(*), SUM(size) FROM files GROUP BY user_id"
+                    )
+                self.conn.execute("COMMIT")
+                return drift
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def get_totals(self) -> Dict[str, int]:
+        """Общая статистика хранилища по счетчикам"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT COALESCE(SUM(file_count), 0) AS files, COALESCE(SUM(total_bytes), 0) AS bytes, "
+                "COUNT(*) AS users FROM user_quota WHERE file_count > 0"
+            ).fetchone()
+        return {"total_files": row["files"], "total_size": row["bytes"], "total_users": row["users"]}
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM files LIMIT 1").fetchone() is None
+
+    def migrate_from_json(self, metadata_file: Path) -> int:
+        """Однократный перенос metadata.json в базу; исходный файл переименовывается"""
+        metadata_file = Path(metadata_file)
+        if not metadata_file.exists() or not self.is_empty():
+            return 0
+
+        with open(metadata_file, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+
+        migrated = 0
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for file_id, file_info in metadata.get("files", {}).items():
+                    info = {
+                        "file_id": file_id,
+                        "user_id": file_info["user_id"],
+                        "filename": file_info["filename"],
+                        "storage_filename": file_info.get("storage_filename", os.path.basename(file_info["path"])),
+                        "size": file_info["size"],
+                        "extension": file_info.get("extension", ""),
+                        "upload_time": file_info["upload_time"],
+                        "path": file_info["path"],
+                        "content_hash": file_info.get("content_hash")
+                    }
+                    self.conn.execute(
+                        f"INSERT OR IGNORE INTO files ({', '.join(FILE_COLUMNS)}) VALUES ({', '.join('?' * len(FILE_COLUMNS))})",
+                        tuple(info[column] for column in FILE_COLUMNS)
+                    )
+                    migrated += 1
+                # Счетчики строятся по фактическим строкам
+                self.conn.execute("DELETE FROM user_quota")
+                self.conn.execute(
+                    "INSERT INTO user_quota (user_id, file_count, total_bytes) "
+                    "SELECT user_id, COUNT(*), SUM(size) FROM files GROUP BY user_id"
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+        os.replace(metadata_file, str(metadata_file) + ".migrated")
+        self.logger.info(f"Метаданные хранилища перенесены в SQLite: {migrated} файлов")
+        return migrated
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
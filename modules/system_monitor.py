@@ -4,6 +4,8 @@ import asyncio
 import platform
 import os
 import subprocess
+import time
+from collections import deque
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 
@@ -18,93 +20,170 @@ class SystemMonitor:
         self.last_check = None
         self.alerts = []
         
+        # Фоновый сборщик метрик: замеры складываются в кольцевой буфер,
+        # обработчики читают последний замер вместо собственного опроса psutil
+        self.sample_interval = self.monitoring_config.get("sample_interval", 2)
+        self.samples = deque(maxlen=self.monitoring_config.get("history_size", 300))
+        self._sampler_task: Optional[asyncio.Task] = None
+        self._pending_sample: Optional[asyncio.Future] = None
+        self._last_sample_time = 0.0
+        
+        # Первый вызов cpu_percent(None) задает точку отсчета для следующих замеров
+        psutil.cpu_percent(interval=None)
+        
+    def start_sampler(self) -> None:
+        """Запуск фонового сборщика метрик (требует работающий event loop)"""
+        if self._sampler_task and not self._sampler_task.done():
+            return
+        self._sampler_task = asyncio.get_running_loop().create_task(self._sampler_loop())
+        self.logger.info(f"Фоновый сбор метрик запущен (интервал {self.sample_interval}с)")
+    
+    async def stop_sampler(self) -> None:
+        """Остановка фонового сборщика метрик"""
+        if not self._sampler_task:
+            return
+        self._sampler_task.cancel()
+        try:
+            await self._sampler_task
+        except asyncio.CancelledError:
+            pass
+        self._sampler_task = None
+    
+    async def _sampler_loop(self):
+        """Цикл сбора метрик: один замер на всех зрителей"""
+        while True:
+            try:
+                await self._take_sample()
+            except Exception as e:
+                self.logger.error(f"Ошибка фонового сбора метрик: {e}")
+            await asyncio.sleep(self.sample_interval)
+    
+    async def _take_sample(self) -> Dict[str, Any]:
+        """Снять новый замер; параллельные вызовы ждут один и тот же замер"""
+        if self._pending_sample is None or self._pending_sample.done():
+            self._pending_sample = asyncio.ensure_future(asyncio.to_thread(self._collect_snapshot))
+        snapshot = await asyncio.shield(self._pending_sample)
+        
+        if snapshot is not self.last_check:
+            self.samples.append(snapshot)
+            self.last_check = snapshot
+            self._last_sample_time = time.monotonic()
+        return snapshot
+    
+    def get_latest_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Последний замер из кольцевого буфера (O(1), без проверки прав)"""
+        return self.samples[-1] if self.samples else None
+    
+    def get_snapshots(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Последние замеры из кольцевого буфера, от старых к новым"""
+        snapshots = list(self.samples)
+        return snapshots[-limit:] if limit else snapshots
+    
+    def _is_snapshot_stale(self) -> bool:
+        """Замер устарел, если сборщик не запущен или отстал"""
+        if not self.samples:
+            return True
+        max_age = max(self.sample_interval * 3, 5)
+        return time.monotonic() - self._last_sample_time > max_age
+    
     async def get_system_info(self, user_id: int) -> Optional[Dict[str, Any]]:
-        """Получение информации о системе"""
+        """Получение информации о системе
+        
+        Возвращает последний замер фонового сборщика. Словарь общий для
+        всех вызывающих, изменять его нельзя.
+        """
         if not await self.role_manager.check_permission(user_id, "system", "view"):
             return None
             
+        return await self.get_current_snapshot()
+    
+    async def get_current_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Актуальный замер без проверки прав (для общих представлений)"""
         try:
-            # CPU
-            cpu_percent = psutil.cpu_percent(interval=1)
-            cpu_count = psutil.cpu_count()
-            cpu_freq = psutil.cpu_freq()
-            
-            # Memory
-            memory = psutil.virtual_memory()
-            
-            # Disk - используем текущую директорию
-            try:
-                disk = psutil.disk_usage('.')
-            except:
-                # Fallback на корневую директорию
-                disk = psutil.disk_usage('/')
-            
-            # Network
-            network = psutil.net_io_counters()
-            
-            # Расширенная информация о системе
-            system_info_extended = await self._get_extended_system_info()
-            
-            # Temperature (улучшенное получение)
-            temperature = await self._get_temperature_advanced()
-            
-            system_info = {
-                "timestamp": datetime.now().isoformat(),
-                "platform": platform.system(),
-                "platform_version": platform.version(),
-                "architecture": platform.machine(),
-                "hostname": platform.node(),
-                "cpu": {
-                    "usage_percent": cpu_percent,
-                    "count": cpu_count,
-                    "frequency_mhz": cpu_freq.current if cpu_freq else None,
-                    "threshold": self.monitoring_config.get("cpu_threshold", 80),
-                    "load_avg": await self._get_load_average()
-                },
-                "memory": {
-                    "total_gb": round(memory.total / (1024**3), 2),
-                    "available_gb": round(memory.available / (1024**3), 2),
-                    "used_gb": round(memory.used / (1024**3), 2),
-                    "usage_percent": memory.percent,
-                    "threshold": self.monitoring_config.get("memory_threshold", 85),
-                    "swap": await self._get_swap_info()
-                },
-                "disk": {
-                    "total_gb": round(disk.total / (1024**3), 2),
-                    "free_gb": round(disk.free / (1024**3), 2),
-                    "used_gb": round(disk.used / (1024**3), 2),
-                    "usage_percent": round((disk.used / disk.total) * 100, 2),
-                    "threshold": self.monitoring_config.get("disk_threshold", 90),
-                    "io_stats": await self._get_disk_io_stats()
-                },
-                "network": {
-                    "bytes_sent_mb": round(network.bytes_sent / (1024**2), 2),
-                    "bytes_recv_mb": round(network.bytes_recv / (1024**2), 2),
-                    "packets_sent": network.packets_sent,
-                    "packets_recv": network.packets_recv,
-                    "interfaces": await self._get_network_interfaces()
-                },
-                "temperature": {
-                    "current": temperature,
-                    "threshold": self.monitoring_config.get("temperature_threshold", 45),
-                    "sensors": await self._get_all_temperature_sensors()
-                },
-                "uptime": {
-                    "seconds": int(psutil.boot_time()),
-                    "formatted": self._format_uptime(psutil.boot_time())
-                },
-                "battery": await self._get_battery_info(),
-                "system_load": system_info_extended
-            }
-            
-            self.last_check = system_info
-            return system_info
+            if self._is_snapshot_stale():
+                return await self._take_sample()
+            return self.get_latest_snapshot()
             
         except Exception as e:
             self.logger.error(f"Ошибка получения системной информации: {e}")
             return None
     
-    async def _get_temperature_advanced(self) -> Optional[float]:
+    def _collect_snapshot(self) -> Dict[str, Any]:
+        """Сбор всех метрик системы (блокирующий, выполняется в отдельном потоке)"""
+        # CPU: без interval замер считается от предыдущего вызова и не блокирует
+        cpu_percent = psutil.cpu_percent(interval=None)
+        cpu_count = psutil.cpu_count()
+        cpu_freq = psutil.cpu_freq()
+        
+        # Memory
+        memory = psutil.virtual_memory()
+        
+        # Disk - используем текущую директорию
+        try:
+            disk = psutil.disk_usage('.')
+        except:
+            # Fallback на корневую директорию
+            disk = psutil.disk_usage('/')
+        
+        # Network
+        network = psutil.net_io_counters()
+        
+        # Расширенная информация о системе
+        system_info_extended = self._get_extended_system_info()
+        
+        # Temperature (улучшенное получение)
+        temperature = self._get_temperature_advanced()
+        
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "platform": platform.system(),
+            "platform_version": platform.version(),
+            "architecture": platform.machine(),
+            "hostname": platform.node(),
+            "cpu": {
+                "usage_percent": cpu_percent,
+                "count": cpu_count,
+                "frequency_mhz": cpu_freq.current if cpu_freq else None,
+                "threshold": self.monitoring_config.get("cpu_threshold", 80),
+                "load_avg": self._get_load_average()
+            },
+            "memory": {
+                "total_gb": round(memory.total / (1024**3), 2),
+                "available_gb": round(memory.available / (1024**3), 2),
+                "used_gb": round(memory.used / (1024**3), 2),
+                "usage_percent": memory.percent,
+                "threshold": self.monitoring_config.get("memory_threshold", 85),
+                "swap": self._get_swap_info()
+            },
+            "disk": {
+                "total_gb": round(disk.total / (1024**3), 2),
+                "free_gb": round(disk.free / (1024**3), 2),
+                "used_gb": round(disk.used / (1024**3), 2),
+                "usage_percent": round((disk.used / disk.total) * 100, 2),
+                "threshold": self.monitoring_config.get("disk_threshold", 90),
+                "io_stats": self._get_disk_io_stats()
+            },
+            "network": {
+                "bytes_sent_mb": round(network.bytes_sent / (1024**2), 2),
+                "bytes_recv_mb": round(network.bytes_recv / (1024**2), 2),
+                "packets_sent": network.packets_sent,
+                "packets_recv": network.packets_recv,
+                "interfaces": self._get_network_interfaces()
+            },
+            "temperature": {
+                "current": temperature,
+                "threshold": self.monitoring_config.get("temperature_threshold", 45),
+                "sensors": self._get_all_temperature_sensors()
+            },
+            "uptime": {
+                "seconds": int(psutil.boot_time()),
+                "formatted": self._format_uptime(psutil.boot_time())
+            },
+            "battery": self._get_battery_info(),
+            "system_load": system_info_extended
+        }
+    
+    def _get_temperature_advanced(self) -> Optional[float]:
         """Расширенное получение температуры системы"""
         try:
             # Метод 1: psutil sensors
@@ -180,7 +259,7 @@ class SystemMonitor:
             self.logger.error(f"Ошибка получения температуры: {e}")
             return None
     
-    async def _get_all_temperature_sensors(self) -> Dict[str, float]:
+    def _get_all_temperature_sensors(self) -> Dict[str, float]:
         """Получение всех доступных датчиков температуры"""
         sensors = {}
         
@@ -228,7 +307,7 @@ class SystemMonitor:
         
         return sensors
     
-    async def _get_load_average(self) -> Dict[str, float]:
+    def _get_load_average(self) -> Dict[str, float]:
         """Получение средней нагрузки системы"""
         try:
             if hasattr(os, 'getloadavg'):
@@ -243,7 +322,7 @@ class SystemMonitor:
         
         return {"1min": 0, "5min": 0, "15min": 0}
     
-    async def _get_swap_info(self) -> Dict[str, Any]:
+    def _get_swap_info(self) -> Dict[str, Any]:
         """Получение информации о swap"""
         try:
             swap = psutil.swap_memory()
@@ -256,7 +335,7 @@ class SystemMonitor:
         except:
             return {"total_gb": 0, "used_gb": 0, "free_gb": 0, "percent": 0}
     
-    async def _get_disk_io_stats(self) -> Dict[str, Any]:
+    def _get_disk_io_stats(self) -> Dict[str, Any]:
         """Получение статистики ввода-вывода диска"""
         try:
             disk_io = psutil.disk_io_counters()
@@ -269,7 +348,7 @@ class SystemMonitor:
         except:
             return {"read_count": 0, "write_count": 0, "read_bytes_mb": 0, "write_bytes_mb": 0}
     
-    async def _get_network_interfaces(self) -> Dict[str, Any]:
+    def _get_network_interfaces(self) -> Dict[str, Any]:
         """Получение информации о сетевых интерфейсах"""
         try:
             interfaces = {}
@@ -289,7 +368,7 @@ class SystemMonitor:
         except:
             return {}
     
-    async def _get_battery_info(self) -> Dict[str, Any]:
+    def _get_battery_info(self) -> Dict[str, Any]:
         """Получение информации о батарее"""
         try:
             battery = psutil.sensors_battery()
@@ -304,7 +383,7 @@ class SystemMonitor:
         
         return {"percent": None, "power_plugged": None, "time_left_minutes": None}
     
-    async def _get_extended_system_info(self) -> Dict[str, Any]:
+    def _get_extended_system_info(self) -> Dict[str, Any]:
         """Получение расширенной системной информации"""
         try:
             # Информация о системе
@@ -354,15 +433,22 @@ class SystemMonitor:
         else:
             return f"{minutes}м"
     
-    async def check_alerts(self, user_id: int) -> List[Dict[str, Any]]:
-        """Проверка алертов системы"""
+    async def check_alerts(self, user_id: int, system_info: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Проверка алертов системы (по переданному или последнему замеру)"""
         if not await self.role_manager.check_permission(user_id, "system", "monitor"):
             return []
             
-        system_info = await self.get_system_info(user_id)
+        if system_info is None:
+            system_info = await self.get_system_info(user_id)
         if not system_info:
             return []
             
+        alerts = self.build_alerts(system_info)
+        self.alerts = alerts
+        return alerts
+    
+    def build_alerts(self, system_info: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Построение списка алертов по замеру (без проверки прав)"""
         alerts = []
         
         # CPU alert
@@ -410,7 +496,6 @@ class SystemMonitor:
                 "value": system_info["battery"]["percent"]
             })
         
-        self.alerts = alerts
         return alerts
     
     async def get_system_status(self, user_id: int) -> str:
@@ -422,7 +507,24 @@ class SystemMonitor:
         if not system_info:
             return "❌ Ошибка получения системной информации"
             
-        alerts = await self.check_alerts(user_id)
+        alerts = await self.check_alerts(user_id, system_info)
+        return self.format_system_status(system_info, alerts)
+    
+    async def render_system_status(self, include_alerts: bool = True) -> str:
+        """Статус системы по общему замеру без проверки прав
+        
+        Используется живым дашбордом: один рендер на представление,
+        права проверяются при подписке.
+        """
+        system_info = await self.get_current_snapshot()
+        if not system_info:
+            return "❌ Ошибка получения системной информации"
+        
+        alerts = self.build_alerts(system_info) if include_alerts else []
+        return self.format_system_status(system_info, alerts)
+    
+    def format_system_status(self, system_info: Dict[str, Any], alerts: List[Dict[str, Any]]) -> str:
+        """Форматирование статуса системы в текст"""
         alert_count = len(alerts)
         
         # Формируем расширенный статус
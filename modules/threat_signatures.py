@@ -0,0 +1,252 @@
+import json
+import logging
+import re
+from collections import deque
+from typing import Dict, Any, Optional, List, Set
+
+logger = logging.getLogger(__name__)
+
+SIGNATURES_FILE = "security/threat_signatures.json"
+
+# Встроенные сигнатуры: (шаблон, категория, важность, поле, regex)
+# Поле "name" - имя процесса, "cmdline" - строка запуска целиком
+DEFAULT_SIGNATURES = [
+    # Криптомайнеры
+    *[(word, "miner", "high", "name", False) for word in (
+        "xmrig", "cpuminer", "ccminer", "ethminer", "t-rex",
+        "nbminer", "lolminer", "teamredminer", "phoenixminer"
+    )],
+    # Вредоносное ПО
+    *[(word, "malware", "high", "name", False) for word in (
+        "malware", "virus", "trojan", "backdoor", "keylogger",
+        "spyware", "adware", "ransomware", "botnet"
+    )],
+    # Подозрительные расширения
+    *[(rf"\.{ext}$", "extension", "high", "name", True) for ext in (
+        "exe", "bat", "cmd", "scr", "com", "pif", "vbs", "js", "jar"
+    )],
+    # Подозрительные имена
+    *[(word, "suspicious_name", "medium", "name", False) for word in (
+        "crypto", "miner", "hash", "coin", "wallet",
+        "update", "install", "setup", "service"
+    )],
+    # Сетевые сканеры и атаки
+    *[(word, "scanner", "high", "name", False) for word in (
+        "nmap", "masscan", "hydra", "medusa", "sqlmap",
+        "nikto", "dirb", "gobuster", "wfuzz"
+    )],
+    # Аргументы майнеров
+    *[(word, "mining_args", "critical", "cmdline", False) for word in (
+        "--mining", "--pool", "--wallet", "--hashrate"
+    )],
+]
+
+class _AhoCorasick:
+    """Автомат Ахо-Корасик: все ключевые слова за один проход по тексту"""
+
+    def __init__(self, words: Dict[str, List[int]]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[int]] = [[]]
+        for word, ids in words.items():
+            state = 0
+            for char in word:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.out[state].extend(ids)
+
+        # Ссылки неудачи обходом в ширину
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[child] = target if target != child else 0
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    def search(self, text: str) -> Set[int]:
+        found: Set[int] = set()
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+_GLOBAL_FLAGS = re.compile(r"\(\?[aiLmsux]+\)")
+_BACKREFERENCE = re.compile(r"(?<!\\)(?:\\\\)*\\[1-9]|\(\?P=")
+
+class SignatureMatcher:
+    """Поиск сигнатур угроз в имени и строке запуска процесса
+
+    Сигнатуры компилируются один раз: ключевые слова - в автомат
+    Ахо-Корасик, регулярные выражения - в одно объединение на поле.
+    Объединение служит фильтром: обычный (чистый) процесс отсеивается
+    одним проходом по имени и одним по строке запуска, и только при
+    срабатывании выражения поля проверяются по одному, чтобы найти все
+    совпавшие. Выражения, которые нельзя безопасно объединить (глобальные
+    флаги вроде (?i), обратные ссылки), всегда проверяются по отдельности.
+    match_all возвращает все сработавшие сигнатуры, match - первую
+    в порядке объявления.
+    """
+
+    FIELDS = ("name", "cmdline")
+
+    def __init__(self, signatures: List[Dict[str, Any]]):
+        self.signatures = signatures
+        self.keywords: Dict[str, Optional[_AhoCorasick]] = {}
+        self.regexes: Dict[str, Optional[re.Pattern]] = {}
+        self.combined: Dict[str, List[tuple]] = {}
+        self.separate: Dict[str, List[tuple]] = {}
+        for field in self.FIELDS:
+            words: Dict[str, List[int]] = {}
+            alternatives = []
+            self.separate[field] = []
+            for index, signature in enumerate(signatures):
+                if signature["field"] != field:
+                    continue
+                if not signature["regex"]:
+                    words.setdefault(signature["pattern"].lower(), []).append(index)
+                elif self._combinable(signature["pattern"]):
+                    alternatives.append((index, signature["pattern"]))
+                else:
+                    self.separate[field].append((index, re.compile(signature["pattern"], re.IGNORECASE)))
+            self.keywords[field] = _AhoCorasick(words) if words else None
+            self.regexes[field] = None
+            self.combined[field] = []
+            if alternatives:
+                try:
+                    self.regexes[field] = re.compile(
+                        "|".join(f"(?:{pattern})" for _, pattern in alternatives), re.IGNORECASE
+                    )
+                    self.combined[field] = [
+                        (index, re.compile(pattern, re.IGNORECASE)) for index, pattern in alternatives
+                    ]
+                except re.error as e:
+                    # Не должно случаться; на всякий случай - по одному выражению
+                    logger.warning(f"Сигнатуры не объединились ({e}), проверка по одной")
+                    self.separate[field].extend(
+                        (index, re.compile(pattern, re.IGNORECASE)) for index, pattern in alternatives
+                    )
+
+    @staticmethod
+    def _combinable(pattern: str) -> bool:
+        """Можно ли включить выражение в общее объединение"""
+        return not _GLOBAL_FLAGS.search(pattern) and not _BACKREFERENCE.search(pattern)
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def _match_field(self, field: str, text: str) -> Set[int]:
+        found: Set[int] = set()
+        if not text:
+            return found
+        automaton = self.keywords[field]
+        if automaton:
+            found = automaton.search(text.lower())
+        regex = self.regexes[field]
+        if regex and regex.search(text):
+            # Объединение дает лишь самое левое совпадение - остальные ищем по одному
+            for index, compiled in self.combined[field]:
+                if compiled.search(text):
+                    found.add(index)
+        for index, compiled in self.separate[field]:
+            if compiled.search(text):
+                found.add(index)
+        return found
+
+    def match_all(self, name: str, cmdline: Any = "") -> List[Dict[str, Any]]:
+        """Все сработавшие сигнатуры в порядке объявления"""
+        if isinstance(cmdline, (list, tuple)):
+            cmdline = " ".join(cmdline)
+        found = self._match_field("name", name or "") | self._match_field("cmdline", cmdline or "")
+        return [self.signatures[index] for index in sorted(found)]
+
+    def match(self, name: str, cmdline: Any = "", field: Optional[str] = None,
+              category: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Первая сработавшая сигнатура (с фильтром по полю и категории)"""
+        for signature in self.match_all(name, cmdline):
+            if (field is None or signature["field"] == field) and (category is None or signature["category"] == category):
+                return signature
+        return None
+
+def _normalize(entry: Any) -> Optional[Dict[str, Any]]:
+    """Сигнатура из файла: строка (ключевое слово по имени) или объект"""
+    if isinstance(entry, str):
+        entry = {"pattern": entry}
+    if not isinstance(entry, dict) or not entry.get("pattern"):
+        return None
+    signature = {
+        "pattern": entry["pattern"],
+        "category": entry.get("category", "custom"),
+        "severity": entry.get("severity", "high"),
+        "field": entry.get("field", "name"),
+        "regex": bool(entry.get("regex", False))
+    }
+    if signature["field"] not in SignatureMatcher.FIELDS:
+        return None
+    if signature["regex"]:
+        try:
+            re.compile(signature["pattern"], re.IGNORECASE)
+        except re.error:
+            return None
+    return signature
+
+def load_signatures(path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Встроенные сигнатуры и сигнатуры из JSON-файла
+
+    Файл: {"signatures": [...]} или просто список; элемент - строка
+    или {"pattern", "category", "severity", "field", "regex"}.
+    """
+    signatures = [
+        {"pattern": pattern, "category": category, "severity": severity, "field": field, "regex": regex}
+        for pattern, category, severity, field, regex in DEFAULT_SIGNATURES
+    ]
+    if not path:
+        return signatures
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return signatures
+    except (OSError, ValueError) as e:
+        logger.error(f"Ошибка чтения сигнатур {path}: {e}")
+        return signatures
+
+    entries = data.get("signatures", []) if isinstance(data, dict) else data
+    skipped = 0
+    for entry in entries:
+        signature = _normalize(entry)
+        if signature is None:
+            skipped += 1
+        else:
+            signatures.append(signature)
+    if skipped:
+        logger.warning(f"Пропущено некорректных сигнатур в {path}: {skipped}")
+    return signatures
+
+_matchers: Dict[str, SignatureMatcher] = {}
+
+def get_signature_matcher(config: dict) -> SignatureMatcher:
+    """Общий для модулей экземпляр SignatureMatcher (компилируется один раз)"""
+    path = config.get("security", {}).get("signatures_file", SIGNATURES_FILE)
+    if path not in _matchers:
+        try:
+            _matchers[path] = SignatureMatcher(load_signatures(path))
+        except Exception as e:
+            # Испорченный файл сигнатур не должен мешать запуску бота
+            logger.error(f"Ошибка загрузки сигнатур {path}, используются встроенные: {e}")
+            _matchers[path] = SignatureMatcher(load_signatures())
+        logger.info(f"Загружено сигнатур угроз: {len(_matchers[path])}")
+    return _matchers[path]
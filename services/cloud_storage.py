@@ -1,12 +1,15 @@
 import os
 import json
-import shutil
 import hashlib
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple, Set
 import logging
 from pathlib import Path
 import time
+import asyncio
+import bisect
+from modules.blob_store import BlobStore
+from modules.search_index import SearchIndex
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +25,30 @@ class CloudStorage:
         # Создаем структуру папок
         self.ensure_storage_exists()
         self.load_metadata()
+        
+        # Содержимое хранится по SHA-256, ссылки считаются в metadata["blobs"]
+        self.blob_store = BlobStore(Path(storage_path) / "blobs")
+        self.metadata.setdefault("blobs", {})
+        
+        # Индекс имен для поиска, обновляется вместе с метаданными
+        self.search_index = SearchIndex()
+        # Отсортированные ключи (upload_time, id) для постраничного вывода:
+        # по владельцу и общий (ключ None)
+        self._file_order: Dict[Any, List[Tuple[str, str]]] = {}
+        for file_id, file_info in self.metadata["files"].items():
+            self.search_index.add(file_id, file_info["original_name"], file_info["user_id"], file_info["upload_time"])
+            self._order_add(file_info, sort=False)
+        for keys in self._file_order.values():
+            keys.sort()
+        
+        # Фоновая проверка наличия файлов на диске (вместо stat при каждом списке).
+        # Запускается первым обращением к списку; пропавшие файлы, замеченные
+        # при открытии, ставятся в очередь и убираются пачкой без ожидания
+        # полного прохода.
+        self._integrity_task: Optional[asyncio.Task] = None
+        self.integrity_interval = 3600
+        self._suspected_missing: Set[str] = set()
+        self._suspected_event = asyncio.Event()
     
     def ensure_storage_exists(self):
         """Создание структуры папок для хранения"""
@@ -137,8 +164,13 @@ class CloudStorage:
             logger.error(f"Ошибка проверки лимитов: {e}")
             return {"allowed": False, "message": "Ошибка проверки лимитов"}
     
-    async def save_file(self, user_id: int, file_path: str, original_filename: str) -> Dict[str, Any]:
-        """Сохранение файла в хранилище"""
+    async def save_file(self, user_id: int, file_path: str, original_filename: str,
+                        content_hash: Optional[str] = None, consume: bool = False) -> Dict[str, Any]:
+        """Сохранение файла в хранилище
+        
+        consume=True - файл перемещается в хранилище без копирования;
+        content_hash - SHA-256, посчитанный при скачивании.
+        """
         try:
             # Проверяем существование файла
             if not os.path.exists(file_path):
@@ -156,20 +188,19 @@ class CloudStorage:
             if not self.is_allowed_file_type(original_filename):
                 return {"success": False, "message": "Тип файла не разрешен"}
             
-            # Создаем папку пользователя
-            self.ensure_user_storage_exists(user_id)
-            
-            # Генерируем уникальное имя файла
+            # Генерируем уникальный ID файла
             file_id = self.generate_file_id(user_id, original_filename)
             file_extension = self.get_file_extension(original_filename)
-            storage_filename = f"{file_id}{file_extension}"
             
-            # Путь для сохранения
-            user_storage_path = self.get_user_storage_path(user_id)
-            storage_file_path = os.path.join(user_storage_path, storage_filename)
+            # Перемещаем (или копируем с подсчетом SHA-256) содержимое в хранилище блобов
+            blob = self.blob_store.ingest(file_path, content_hash=content_hash, consume=consume)
+            storage_filename = blob["hash"]
+            storage_file_path = blob["path"]
             
-            # Копируем файл
-            shutil.copy2(file_path, storage_file_path)
+            blob_info = self.metadata["blobs"].setdefault(blob["hash"], {"size": file_size, "refcount": 0})
+            blob_info["refcount"] += 1
+            if not blob["created"]:
+                logger.info(f"Файл {original_filename}: такое содержимое уже хранится, копия не создана")
             
             # Добавляем в метаданные
             file_info = {
@@ -181,10 +212,13 @@ class CloudStorage:
                 "extension": file_extension,
                 "user_id": user_id,
                 "upload_time": datetime.now().isoformat(),
-                "path": storage_file_path
+                "path": storage_file_path,
+                "content_hash": blob["hash"]
             }
             
             self.metadata["files"][file_id] = file_info
+            self.search_index.add(file_id, original_filename, user_id, file_info["upload_time"])
+            self._order_add(file_info)
             
             # Обновляем статистику пользователя
             if str(user_id) not in self.metadata["users"]:
@@ -230,6 +264,7 @@ class CloudStorage:
             
             # Проверяем существование файла
             if not os.path.exists(file_info["path"]):
+                self._suspect_missing(file_id)
                 return None
             
             return file_info
@@ -262,16 +297,13 @@ class CloudStorage:
         """Получение списка файлов пользователя"""
         try:
             files = []
+            self.start_integrity_scanner(self.integrity_interval)
             
-            for file_id, file_info in self.metadata["files"].items():
+            # Только по метаданным: пропавшие с диска файлы убирает фоновая проверка
+            for file_info in self.metadata["files"].values():
                 # Проверяем права доступа
                 if file_info["user_id"] == user_id or is_admin:
-                    # Проверяем существование файла
-                    if os.path.exists(file_info["path"]):
-                        files.append(file_info)
-                    else:
-                        # Удаляем несуществующий файл из метаданных
-                        await self.delete_file_metadata(file_id)
+                    files.append(file_info)
             
             # Сортируем по дате загрузки (новые сначала)
             files.sort(key=lambda x: x["upload_time"], reverse=True)
@@ -282,6 +314,44 @@ class CloudStorage:
             logger.error(f"Ошибка получения списка файлов: {e}")
             return []
     
+    def _order_add(self, file_info: Dict[str, Any], sort: bool = True):
+        key = (file_info["upload_time"], file_info["id"])
+        for owner in (None, file_info["user_id"]):
+            keys = self._file_order.setdefault(owner, [])
+            if sort:
+                bisect.insort(keys, key)
+            else:
+                keys.append(key)
+    
+    def _order_remove(self, file_info: Dict[str, Any]):
+        key = (file_info["upload_time"], file_info["id"])
+        for owner in (None, file_info["user_id"]):
+            keys = self._file_order.get(owner, [])
+            index = bisect.bisect_left(keys, key)
+            if index < len(keys) and keys[index] == key:
+                del keys[index]
+    
+    async def list_files_page(self, user_id: int, cursor: Optional[Tuple[str, str]] = None, limit: int = 10,
+                              is_admin: bool = False) -> Dict[str, Any]:
+        """Страница списка файлов (новые первыми)
+        
+        cursor - (upload_time, id) последнего файла предыдущей страницы;
+        позиция находится бинарным поиском, читается только сама страница.
+        """
+        try:
+            keys = self._file_order.get(None if is_admin else user_id, [])
+            end = bisect.bisect_left(keys, tuple(cursor)) if cursor else len(keys)
+            start = max(0, end - limit)
+            files = [self.metadata["files"][file_id] for _, file_id in reversed(keys[start:end])]
+            return {
+                "files": files,
+                "next_cursor": keys[start] if start > 0 else None,
+                "total": len(keys)
+            }
+        except Exception as e:
+            logger.error(f"Ошибка получения страницы файлов: {e}")
+            return {"files": [], "next_cursor": None, "total": 0}
+    
     async def delete_file(self, file_id: str, user_id: int) -> Dict[str, Any]:
         """Удаление файла"""
         try:
@@ -290,13 +360,13 @@ class CloudStorage:
             if not file_info:
                 return {"success": False, "message": "Файл не найден или нет доступа"}
             
-            # Удаляем физический файл
-            if os.path.exists(file_info["path"]):
-                os.remove(file_info["path"])
-            
-            # Удаляем из метаданных
+            # Удаляем из метаданных (блоб освобождается, если ссылок не осталось)
             await self.delete_file_metadata(file_id)
             
+            # Удаляем физический файл старого формата (без хранилища блобов)
+            if not file_info.get("content_hash") and os.path.exists(file_info["path"]):
+                os.remove(file_info["path"])
+            
             logger.info(f"Файл удален: {file_info['original_name']}")
             
             return {"success": True, "message": "Файл успешно удален"}
@@ -305,8 +375,12 @@ class CloudStorage:
             logger.error(f"Ошибка удаления файла: {e}")
             return {"success": False, "message": f"Ошибка удаления: {str(e)}"}
     
-    async def delete_file_metadata(self, file_id: str):
-        """Удаление файла из метаданных"""
+    async def delete_file_metadata(self, file_id: str, save: bool = True):
+        """Удаление файла из метаданных
+        
+        save=False - без записи metadata.json (для пакетного удаления,
+        вызывающий сохраняет метаданные сам один раз).
+        """
         try:
             if file_id in self.metadata["files"]:
                 file_info = self.metadata["files"][file_id]
@@ -321,28 +395,33 @@ class CloudStorage:
                 self.metadata["statistics"]["total_files"] -= 1
                 self.metadata["statistics"]["total_size"] -= file_info["size"]
                 
+                # Уменьшаем счетчик ссылок на содержимое
+                content_hash = file_info.get("content_hash")
+                if content_hash and content_hash in self.metadata["blobs"]:
+                    self.metadata["blobs"][content_hash]["refcount"] -= 1
+                    if self.metadata["blobs"][content_hash]["refcount"] <= 0:
+                        del self.metadata["blobs"][content_hash]
+                        self.blob_store.remove(content_hash)
+                
                 # Удаляем файл из метаданных
                 del self.metadata["files"][file_id]
+                self.search_index.remove(file_id)
+                self._order_remove(file_info)
                 
                 # Сохраняем метаданные
-                self.save_metadata()
+                if save:
+                    self.save_metadata()
                 
         except Exception as e:
             logger.error(f"Ошибка удаления метаданных файла: {e}")
     
-    async def search_files(self, user_id: int, query: str, is_admin: bool = False) -> List[Dict[str, Any]]:
-        """Поиск файлов по имени"""
+    async def search_files(self, user_id: int, query: str, is_admin: bool = False,
+                           limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Поиск файлов по индексу имен (подстрока, "префикс*", ".расширение")"""
         try:
-            all_files = await self.list_files(user_id, is_admin)
-            query_lower = query.lower()
-            
-            # Фильтруем файлы по запросу
-            matching_files = []
-            for file_info in all_files:
-                if query_lower in file_info["original_name"].lower():
-                    matching_files.append(file_info)
-            
-            return matching_files
+            owner = None if is_admin else user_id
+            file_ids = self.search_index.search(query, owner=owner, limit=limit)
+            return [self.metadata["files"][file_id] for file_id in file_ids]
             
         except Exception as e:
             logger.error(f"Ошибка поиска файлов: {e}")
@@ -414,21 +493,95 @@ class CloudStorage:
         except Exception as e:
             logger.error(f"Ошибка очистки временных файлов: {e}")
     
-    async def validate_storage_integrity(self):
-        """Проверка целостности хранилища"""
+    def _find_missing_files(self, files: List[tuple]) -> List[str]:
+        """ID файлов, которых нет на диске (блокирующая проверка)
+        
+        Одинаковое содержимое лежит в одном блобе, поэтому каждый путь
+        проверяется один раз.
+        """
+        exists_cache: Dict[str, bool] = {}
+        missing = []
+        for file_id, path in files:
+            if path not in exists_cache:
+                exists_cache[path] = os.path.exists(path)
+            if not exists_cache[path]:
+                missing.append(file_id)
+        return missing
+    
+    def _suspect_missing(self, file_id: str):
+        """Постановка файла, не найденного на диске, в очередь проверки"""
+        self._suspected_missing.add(file_id)
+        self._suspected_event.set()
+        self.start_integrity_scanner(self.integrity_interval)
+    
+    async def _remove_missing(self, file_ids: List[str]) -> int:
+        """Удаление из метаданных пропавших файлов одной записью metadata.json"""
+        removed = 0
+        for file_id in file_ids:
+            file_info = self.metadata["files"].get(file_id)
+            # Файл мог быть удален или перезаписан, пока шла проверка
+            if not file_info or os.path.exists(file_info["path"]):
+                continue
+            logger.warning(f"Файл не найден: {file_info['original_name']}")
+            await self.delete_file_metadata(file_id, save=False)
+            removed += 1
+        
+        if removed:
+            self.save_metadata()
+        return removed
+    
+    async def validate_storage_integrity(self) -> int:
+        """Проверка целостности хранилища
+        
+        Проверка диска идет в пуле потоков, все пропавшие файлы удаляются
+        из метаданных одной записью metadata.json. Возвращает число
+        удаленных записей.
+        """
         try:
-            files_to_remove = []
-            
-            for file_id, file_info in self.metadata["files"].items():
-                if not os.path.exists(file_info["path"]):
-                    files_to_remove.append(file_id)
-                    logger.warning(f"Файл не найден: {file_info['original_name']}")
+            files = [(file_id, file_info["path"]) for file_id, file_info in self.metadata["files"].items()]
+            files_to_remove = await asyncio.to_thread(self._find_missing_files, files)
             
             # Удаляем несуществующие файлы
-            for file_id in files_to_remove:
-                await self.delete_file_metadata(file_id)
+            removed = await self._remove_missing(files_to_remove)
             
-            logger.info(f"Проверка целостности завершена. Удалено {len(files_to_remove)} несуществующих файлов")
+            logger.info(f"Проверка целостности завершена. Удалено {removed} несуществующих файлов")
+            return removed
             
         except Exception as e:
-            logger.error(f"Ошибка проверки целостности хранилища: {e}") 
\ No newline at end of file
+            logger.error(f"Ошибка проверки целостности хранилища: {e}")
+            return 0
+    
+    def start_integrity_scanner(self, interval: float = 3600) -> None:
+        """Запуск периодической проверки целостности (требует работающий event loop)"""
+        if self._integrity_task and not self._integrity_task.done():
+            return
+        self._integrity_task = asyncio.get_running_loop().create_task(self._integrity_loop(interval))
+        logger.info(f"Фоновая проверка целостности хранилища запущена (интервал {interval}с)")
+    
+    async def stop_integrity_scanner(self) -> None:
+        """Остановка периодической проверки целостности"""
+        if not self._integrity_task:
+            return
+        self._integrity_task.cancel()
+        try:
+            await self._integrity_task
+        except asyncio.CancelledError:
+            pass
+        self._integrity_task = None
+    
+    async def _integrity_loop(self, interval: float):
+        while True:
+            await self.validate_storage_integrity()
+            deadline = time.monotonic() + interval
+            # До следующего полного прохода - только файлы из очереди
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    await asyncio.wait_for(self._suspected_event.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                self._suspected_event.clear()
+                suspected, self._suspected_missing = list(self._suspected_missing), set()
+                try:
+                    await self._remove_missing(suspected)
+                except Exception as e:
+                    logger.error(f"Ошибка удаления пропавших файлов: {e}")
@@ -0,0 +1,268 @@
+import json
+import os
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (имя уровня, шаг агрегации в секундах, срок хранения в секундах)
+DEFAULT_TIERS = (
+    ("raw", 0, 3600),           # сырые замеры за 1 час
+    ("1m", 60, 24 * 3600),      # минутные агрегаты за 24 часа
+    ("15m", 900, 30 * 24 * 3600)  # 15-минутные агрегаты за 30 дней
+)
+
+class _Tier:
+    """Один уровень истории: колонки array('d') и индекс начала окна
+
+    Для агрегатов хранятся среднее, минимум, максимум и число замеров.
+    У сырого уровня min/max указывают на ту же колонку, что и avg.
+    """
+
+    def __init__(self, name: str, step: int, retention: int, fields: Sequence[str]):
+        self.name = name
+        self.step = step
+        self.retention = retention
+        self.fields = tuple(fields)
+        self.ts = array('d')
+        self.count = array('d')
+        self.avg = {f: array('d') for f in self.fields}
+        if step:
+            self.min = {f: array('d') for f in self.fields}
+            self.max = {f: array('d') for f in self.fields}
+        else:
+            self.min = self.max = self.avg
+        # Все, что левее head, уже вне окна хранения
+        self.head = 0
+
+    def __len__(self) -> int:
+        return len(self.ts) - self.head
+
+    def push(self, ts: float, count: float, avg: Dict[str, float],
+             mins: Optional[Dict[str, float]] = None, maxs: Optional[Dict[str, float]] = None):
+        self.ts.append(ts)
+        self.count.append(count)
+        for f in self.fields:
+            self.avg[f].append(avg[f])
+            if self.step:
+                self.min[f].append(mins[f])
+                self.max[f].append(maxs[f])
+
+    def evict(self, now: float):
+        """Сдвиг начала окна; физическое удаление раз в половину буфера (амортизированно O(1))"""
+        cutoff = now - self.retention
+        while self.head < len(self.ts) and self.ts[self.head] < cutoff:
+            self.head += 1
+        if self.head and self.head * 2 >= len(self.ts):
+            self._compact()
+
+    def _compact(self):
+        head = self.head
+        del self.ts[:head]
+        del self.count[:head]
+        for f in self.fields:
+            del self.avg[f][:head]
+            if self.step:
+                del self.min[f][:head]
+                del self.max[f][:head]
+        self.head = 0
+
+    def window_start(self, since: float) -> int:
+        return max(self.head, bisect_left(self.ts, since))
+
+    def to_dict(self) -> Dict[str, Any]:
+        self._compact()
+        data = {
+            "step": self.step,
+            "ts": self.ts.tolist(),
+            "count": self.count.tolist(),
+            "avg": {f: self.avg[f].tolist() for f in self.fields}
+        }
+        if self.step:
+            data["min"] = {f: self.min[f].tolist() for f in self.fields}
+            data["max"] = {f: self.max[f].tolist() for f in self.fields}
+        return data
+
+    def load_dict(self, data: Dict[str, Any]):
+        self.ts = array('d', data["ts"])
+        self.count = array('d', data["count"])
+        self.avg = {f: array('d', data["avg"][f]) for f in self.fields}
+        if self.step:
+            self.min = {f: array('d', data["min"][f]) for f in self.fields}
+            self.max = {f: array('d', data["max"][f]) for f in self.fields}
+        else:
+            self.min = self.max = self.avg
+        self.head = 0
+
+class MetricHistory:
+    """Колоночная история метрик с уровнями агрегации
+
+    Каждый замер попадает в сырой уровень и в открытые корзины уровней
+    агрегации. Закрытая корзина превращается в одну точку (avg/min/max/count).
+    Окно хранения каждого уровня сдвигается за амортизированное O(1).
+    """
+
+    def __init__(self, fields: Sequence[str], data_file: Optional[str] = None,
+                 tiers: Sequence[Tuple[str, int, int]] = DEFAULT_TIERS):
+        self.fields = tuple(fields)
+        self.data_file = data_file
+        self.tiers = [_Tier(name, step, retention, self.fields) for name, step, retention in tiers]
+        # Открытые корзины агрегатов: имя уровня -> состояние
+        self.buckets: Dict[str, Optional[Dict[str, Any]]] = {tier.name: None for tier in self.tiers if tier.step}
+
+    def add(self, values: Dict[str, float], ts: Optional[float] = None) -> bool:
+        """Добавить замер; возвращает True, если закрылась хотя бы одна корзина"""
+        ts = time.time() if ts is None else ts
+        closed = False
+
+        for tier in self.tiers:
+            if not tier.step:
+                tier.push(ts, 1, values)
+            else:
+                closed |= self._accumulate(tier, ts, values)
+            tier.evict(ts)
+
+        return closed
+
+    def _accumulate(self, tier: _Tier, ts: float, values: Dict[str, float]) -> bool:
+        bucket_start = ts - ts % tier.step
+        bucket = self.buckets[tier.name]
+        closed = False
+
+        if bucket and bucket["start"] != bucket_start:
+            self._close_bucket(tier, bucket)
+            bucket = None
+            closed = True
+
+        if bucket is None:
+            bucket = {
+                "start": bucket_start,
+                "count": 0,
+                "sum": {f: 0.0 for f in self.fields},
+                "min": {f: values[f] for f in self.fields},
+                "max": {f: values[f] for f in self.fields}
+            }
+            self.buckets[tier.name] = bucket
+
+        bucket["count"] += 1
+        for f in self.fields:
+            value = values[f]
+            bucket["sum"][f] += value
+            if value < bucket["min"][f]:
+                bucket["min"][f] = value
+            if value > bucket["max"][f]:
+                bucket["max"][f] = value
+        return closed
+
+    def _close_bucket(self, tier: _Tier, bucket: Dict[str, Any]):
+        count = bucket["count"]
+        tier.push(
+            bucket["start"], count,
+            {f: bucket["sum"][f] / count for f in self.fields},
+            bucket["min"], bucket["max"]
+        )
+
+    def _tier_for(self, seconds: float) -> _Tier:
+        """Самый подробный уровень, покрывающий окно"""
+        for tier in self.tiers:
+            if tier.retention >= seconds:
+                return tier
+        return self.tiers[-1]
+
+    def stats(self, field: str, seconds: float, now: Optional[float] = None) -> Dict[str, Any]:
+        """Среднее/минимум/максимум/число замеров поля за окно
+
+        Считается свертками по колонкам (sum/min/max по срезам array),
+        без обхода словарей.
+        """
+        now = time.time() if now is None else now
+        tier = self._tier_for(seconds)
+        start = tier.window_start(now - seconds)
+        end = len(tier.ts)
+
+        total = 0.0
+        count = 0.0
+        lo = hi = None
+        if end > start:
+            counts = tier.count[start:end]
+            avgs = tier.avg[field][start:end]
+            count = sum(counts)
+            total = sum(avgs) if not tier.step else sum(a * c for a, c in zip(avgs, counts))
+            lo = min(tier.min[field][start:end])
+            hi = max(tier.max[field][start:end])
+
+        # Незакрытая корзина уровня тоже входит в окно
+        bucket = self.buckets.get(tier.name)
+        if bucket and bucket["count"]:
+            count += bucket["count"]
+            total += bucket["sum"][field]
+            lo = bucket["min"][field] if lo is None else min(lo, bucket["min"][field])
+            hi = bucket["max"][field] if hi is None else max(hi, bucket["max"][field])
+
+        if not count:
+            return {"avg": 0, "min": 0, "max": 0, "count": 0}
+        return {"avg": total / count, "min": lo, "max": hi, "count": int(count)}
+
+    def points(self, seconds: float, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Точки уровня, покрывающего окно (для графиков и выгрузки)"""
+        now = time.time() if now is None else now
+        tier = self._tier_for(seconds)
+        start = tier.window_start(now - seconds)
+        result = []
+        for i in range(start, len(tier.ts)):
+            point = {"timestamp": tier.ts[i], "count": int(tier.count[i])}
+            for f in self.fields:
+                point[f] = tier.avg[f][i]
+            result.append(point)
+        return result
+
+    def evict(self, now: Optional[float] = None):
+        """Принудительный сдвиг окон всех уровней"""
+        now = time.time() if now is None else now
+        for tier in self.tiers:
+            tier.evict(now)
+
+    def save(self):
+        """Сохранение истории в колоночном JSON"""
+        if not self.data_file:
+            return
+        data = {
+            "version": 2,
+            "fields": list(self.fields),
+            "tiers": {tier.name: tier.to_dict() for tier in self.tiers},
+            "buckets": self.buckets
+        }
+        tmp_path = self.data_file + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, self.data_file)
+
+    def load(self, legacy_converter=None) -> bool:
+        """Загрузка истории; старый формат (список словарей) переносится через legacy_converter"""
+        if not self.data_file or not os.path.exists(self.data_file):
+            return False
+
+        with open(self.data_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        if isinstance(data, list):
+            if legacy_converter:
+                for entry in data:
+                    converted = legacy_converter(entry)
+                    if converted:
+                        self.add(converted[1], ts=converted[0])
+                self.evict()
+                logger.info(f"История метрик перенесена в колоночный формат: {len(data)} записей")
+            return True
+
+        for tier in self.tiers:
+            if tier.name in data.get("tiers", {}):
+                tier.load_dict(data["tiers"][tier.name])
+        for name, bucket in data.get("buckets", {}).items():
+            if name in self.buckets:
+                self.buckets[name] = bucket
+        self.evict()
+        return True
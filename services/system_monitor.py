@@ -3,9 +3,10 @@ import platform
 import os
 import json
 import time
-from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
 import logging
+from services.metric_history import MetricHistory
 
 logger = logging.getLogger(__name__)
 
@@ -26,22 +27,27 @@ class SystemMonitor:
     
     def load_memory_history(self):
         """Загрузка истории данных о памяти"""
+        self.memory_history = MetricHistory(("percent", "used", "total"), self.memory_data_file)
         try:
-            if os.path.exists(self.memory_data_file):
-                with open(self.memory_data_file, 'r', encoding='utf-8') as f:
-                    self.memory_history = json.load(f)
-            else:
-                self.memory_history = []
+            if not self.memory_history.load(self._convert_legacy_memory_entry):
                 self.save_memory_history()
         except Exception as e:
             logger.error(f"Ошибка загрузки истории памяти: {e}")
-            self.memory_history = []
+            self.memory_history = MetricHistory(("percent", "used", "total"), self.memory_data_file)
+    
+    @staticmethod
+    def _convert_legacy_memory_entry(entry: Dict[str, Any]) -> Optional[Tuple[float, Dict[str, float]]]:
+        """Преобразование записи старого формата (словарь с ISO-временем)"""
+        try:
+            ts = datetime.fromisoformat(entry["timestamp"]).timestamp()
+            return ts, {"percent": entry["percent"], "used": entry["used"], "total": entry["total"]}
+        except (KeyError, ValueError, TypeError):
+            return None
     
     def save_memory_history(self):
         """Сохранение истории данных о памяти"""
         try:
-            with open(self.memory_data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.memory_history, f, ensure_ascii=False, indent=2)
+            self.memory_history.save()
         except Exception as e:
             logger.error(f"Ошибка сохранения истории памяти: {e}")
     
@@ -235,27 +241,11 @@ class SystemMonitor:
     def add_memory_data(self, percent: float, used: int, total: int):
         """Добавление данных о памяти в историю"""
         try:
-            timestamp = datetime.now().isoformat()
-            data = {
-                "timestamp": timestamp,
-                "percent": percent,
-                "used": used,
-                "total": total,
-                "used_formatted": self.format_bytes(used),
-                "total_formatted": self.format_bytes(total)
-            }
+            # Окна уровней сдвигаются внутри истории за O(1)
+            bucket_closed = self.memory_history.add({"percent": percent, "used": used, "total": total})
             
-            self.memory_history.append(data)
-            
-            # Оставляем только данные за последние 24 часа
-            cutoff_time = datetime.now() - timedelta(hours=24)
-            self.memory_history = [
-                entry for entry in self.memory_history
-                if datetime.fromisoformat(entry["timestamp"]) > cutoff_time
-            ]
-            
-            # Сохраняем каждые 10 записей
-            if len(self.memory_history) % 10 == 0:
+            # Сохраняем при закрытии минутной корзины
+            if bucket_closed:
                 self.save_memory_history()
                 
         except Exception as e:
@@ -264,32 +254,30 @@ class SystemMonitor:
     def get_memory_history(self, hours: int = 24) -> List[Dict[str, Any]]:
         """Получение истории использования памяти"""
         try:
-            cutoff_time = datetime.now() - timedelta(hours=hours)
-            return [
-                entry for entry in self.memory_history
-                if datetime.fromisoformat(entry["timestamp"]) > cutoff_time
-            ]
+            history = []
+            for point in self.memory_history.points(hours * 3600):
+                point["timestamp"] = datetime.fromtimestamp(point["timestamp"]).isoformat()
+                point["used_formatted"] = self.format_bytes(point["used"])
+                point["total_formatted"] = self.format_bytes(point["total"])
+                history.append(point)
+            return history
         except Exception as e:
             logger.error(f"Ошибка получения истории памяти: {e}")
             return []
     
-    def get_memory_stats(self) -> Dict[str, Any]:
+    def get_memory_stats(self, hours: int = 24) -> Dict[str, Any]:
         """Получение статистики использования памяти"""
         try:
-            history = self.get_memory_history(24)
-            if not history:
-                return {"avg_percent": 0, "max_percent": 0, "min_percent": 0}
-            
-            percents = [entry["percent"] for entry in history]
+            stats = self.memory_history.stats("percent", hours * 3600)
             return {
-                "avg_percent": sum(percents) / len(percents),
-                "max_percent": max(percents),
-                "min_percent": min(percents),
-                "data_points": len(history)
+                "avg_percent": stats["avg"],
+                "max_percent": stats["max"],
+                "min_percent": stats["min"],
+                "data_points": stats["count"]
             }
         except Exception as e:
             logger.error(f"Ошибка получения статистики памяти: {e}")
-            return {"avg_percent": 0, "max_percent": 0, "min_percent": 0}
+            return {"avg_percent": 0, "max_percent": 0, "min_percent": 0, "data_points": 0}
     
     async def get_system_status(self, user_id: int) -> str:
         """Получение полного статуса системы с горизонтальными шкалами"""
@@ -364,12 +352,8 @@ class SystemMonitor:
     def cleanup_old_data(self):
         """Очистка старых данных (вызывать периодически)"""
         try:
-            # Очищаем данные старше 7 дней
-            cutoff_time = datetime.now() - timedelta(days=7)
-            self.memory_history = [
-                entry for entry in self.memory_history
-                if datetime.fromisoformat(entry["timestamp"]) > cutoff_time
-            ]
+            # Уровни истории сами ограничены сроком хранения (до 30 дней)
+            self.memory_history.evict()
             self.save_memory_history()
             logger.info("Очищены старые данные мониторинга")
         except Exception as e:
@@ -4,26 +4,45 @@
 Работает без matplotlib/plotly, использует только текст и JSON
 """
 
+import asyncio
+import atexit
+import glob
 import json
 import os
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import psutil
 
 class SimpleAnalytics:
+    """Аналитика на журнале сегментов
+    
+    Каждое событие дописывается строкой JSON в активный сегмент
+    (``<data_file без расширения>_segments/segment_NNNNNN.jsonl``). Запись
+    на диск и fsync выполняются пачками. Когда сегментов становится много,
+    текущее (ограниченное) состояние сжимается в snapshot-сегмент, а старые
+    сегменты удаляются. При запуске сегменты читаются построчно, начиная
+    с последнего snapshot. Фоновая задача (start_flusher) сбрасывает
+    буфер раз в FLUSH_INTERVAL, даже если новых событий нет.
+    """
+    
+    SEGMENT_MAX_BYTES = 4 * 1024 * 1024
+    MAX_SEGMENTS = 8
+    FLUSH_EVERY = 50
+    FLUSH_INTERVAL = 5.0
+    
     def __init__(self, data_file: str = "analytics_data.json"):
         self.data_file = data_file
+        self.segments_dir = os.path.splitext(data_file)[0] + "_segments"
+        self._buffer: List[str] = []
+        self._last_flush = time.monotonic()
+        self._segment_file = None
+        self._segment_seq = 0
+        self._flush_task: Optional[asyncio.Task] = None
         self.data = self.load_data()
+        atexit.register(self.close)
     
-    def load_data(self) -> Dict[str, Any]:
-        """Загружает данные аналитики из JSON файла"""
-        if os.path.exists(self.data_file):
-            try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                pass
+    def _empty_data(self) -> Dict[str, Any]:
         return {
             "system_stats": [],
             "bot_events": [],
@@ -31,10 +50,219 @@ class SimpleAnalytics:
             "performance_metrics": []
         }
     
+    def _segment_paths(self) -> List[tuple]:
+        """Список (номер, путь, snapshot?) всех сегментов по возрастанию номера"""
+        result = []
+        for path in glob.glob(os.path.join(self.segments_dir, "*.jsonl")):
+            name = os.path.basename(path)
+            kind, _, seq = name[:-len(".jsonl")].partition("_")
+            if kind in ("segment", "snapshot") and seq.isdigit():
+                result.append((int(seq), path, kind == "snapshot"))
+        return sorted(result)
+    
+    def load_data(self) -> Dict[str, Any]:
+        """Загружает данные аналитики из сегментов (потоково, построчно)"""
+        self.data = self._empty_data()
+        
+        if not os.path.isdir(self.segments_dir):
+            os.makedirs(self.segments_dir, exist_ok=True)
+            self._migrate_legacy_file()
+            self.data = self._empty_data()
+        
+        segments = self._segment_paths()
+        # Все, что раньше последнего snapshot, уже в нем учтено
+        start = 0
+        for index, (_, _, is_snapshot) in enumerate(segments):
+            if is_snapshot:
+                start = index
+        
+        for seq, path, _ in segments[start:]:
+            self._segment_seq = max(self._segment_seq, seq)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            self._apply(json.loads(line))
+                        except (ValueError, KeyError, TypeError):
+                            # Оборванная последняя строка после аварийного завершения
+                            continue
+            except OSError:
+                continue
+        
+        return self.data
+    
+    def _migrate_legacy_file(self):
+        """Однократный перенос старого analytics_data.json в snapshot-сегмент"""
+        if not os.path.exists(self.data_file):
+            return
+        try:
+            with open(self.data_file, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except:
+            return
+        
+        data = self._empty_data()
+        data.update({k: v for k, v in legacy.items() if k in data})
+        self.data = data
+        self.compact()
+        os.replace(self.data_file, self.data_file + ".migrated")
+    
+    def _apply(self, record: Dict[str, Any]):
+        """Применяет запись журнала к состоянию в памяти (с ограничением размера)"""
+        kind = record["kind"]
+        
+        if kind == "system_stats":
+            self.data["system_stats"].append(record["data"])
+            # Ограничиваем количество записей
+            if len(self.data["system_stats"]) > 1000:
+                self.data["system_stats"] = self.data["system_stats"][-500:]
+        
+        elif kind == "bot_event":
+            self.data["bot_events"].append(record["data"])
+            if len(self.data["bot_events"]) > 500:
+                self.data["bot_events"] = self.data["bot_events"][-250:]
+        
+        elif kind in ("user_activity", "user_state"):
+            user_id_str = str(record["user_id"])
+            if user_id_str not in self.data["user_activity"]:
+                self.data["user_activity"][user_id_str] = {
+                    "actions": [],
+                    "last_seen": None,
+                    "total_actions": 0
+                }
+            user_data = self.data["user_activity"][user_id_str]
+            
+            if kind == "user_state":
+                # Итоги пользователя из snapshot
+                user_data["total_actions"] = record["total_actions"]
+                user_data["last_seen"] = record["last_seen"]
+                user_data["actions"] = record["actions"]
+                return
+            
+            user_data["actions"].append(record["data"])
+            user_data["last_seen"] = record["data"]["timestamp"]
+            user_data["total_actions"] += 1
+            
+            # Ограничиваем количество действий на пользователя
+            if len(user_data["actions"]) > 100:
+                user_data["actions"] = user_data["actions"][-50:]
+        
+        elif kind == "performance_metric":
+            self.data["performance_metrics"].append(record["data"])
+            if len(self.data["performance_metrics"]) > 1000:
+                self.data["performance_metrics"] = self.data["performance_metrics"][-500:]
+    
+    def _append(self, record: Dict[str, Any]):
+        """Применяет запись и ставит ее в очередь на запись в журнал"""
+        self._apply(record)
+        self._buffer.append(json.dumps(record, ensure_ascii=False) + "\n")
+        
+        if (len(self._buffer) >= self.FLUSH_EVERY
+                or time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL):
+            self.save_data()
+    
+    def start_flusher(self) -> None:
+        """Запуск периодического сброса буфера (требует работающий event loop)"""
+        if self._flush_task and not self._flush_task.done():
+            return
+        self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+    
+    async def stop_flusher(self) -> None:
+        """Остановка периодического сброса и запись остатка буфера"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        self.save_data()
+    
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.FLUSH_INTERVAL)
+            if self._buffer and time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL:
+                try:
+                    self.save_data()
+                except OSError:
+                    # Буфер не очищен - запись повторится в следующем цикле
+                    continue
+    
+    def _open_segment(self):
+        """Открывает активный сегмент, при переполнении начинает новый"""
+        if self._segment_file and self._segment_file.tell() < self.SEGMENT_MAX_BYTES:
+            return self._segment_file
+        
+        if self._segment_file:
+            self._segment_file.close()
+            self._segment_file = None
+            if len(self._segment_paths()) >= self.MAX_SEGMENTS:
+                self.compact()
+        
+        self._segment_seq += 1
+        path = os.path.join(self.segments_dir, f"segment_{self._segment_seq:06d}.jsonl")
+        self._segment_file = open(path, 'a', encoding='utf-8')
+        return self._segment_file
+    
     def save_data(self):
-        """Сохраняет данные в JSON файл"""
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        """Сбрасывает накопленные записи в журнал (одна запись и fsync на пачку)"""
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        
+        f = self._open_segment()
+        f.write("".join(self._buffer))
+        f.flush()
+        os.fsync(f.fileno())
+        self._buffer = []
+    
+    def compact(self):
+        """Сжимает журнал: текущее состояние пишется в snapshot, старые сегменты удаляются"""
+        # Буферизованные записи уже применены к self.data и попадут в snapshot
+        self._buffer = []
+        if self._segment_file:
+            self._segment_file.close()
+            self._segment_file = None
+        
+        old_segments = self._segment_paths()
+        self._segment_seq += 1
+        path = os.path.join(self.segments_dir, f"snapshot_{self._segment_seq:06d}.jsonl")
+        tmp_path = path + ".tmp"
+        
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for stats in self.data["system_stats"]:
+                f.write(json.dumps({"kind": "system_stats", "data": stats}, ensure_ascii=False) + "\n")
+            for event in self.data["bot_events"]:
+                f.write(json.dumps({"kind": "bot_event", "data": event}, ensure_ascii=False) + "\n")
+            for metric in self.data["performance_metrics"]:
+                f.write(json.dumps({"kind": "performance_metric", "data": metric}, ensure_ascii=False) + "\n")
+            for user_id, user_data in self.data["user_activity"].items():
+                f.write(json.dumps({
+                    "kind": "user_state",
+                    "user_id": user_id,
+                    "total_actions": user_data["total_actions"],
+                    "last_seen": user_data["last_seen"],
+                    "actions": user_data["actions"]
+                }, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        
+        # Старые сегменты удаляются только после атомарной публикации snapshot
+        for _, old_path, _ in old_segments:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+    
+    def close(self):
+        """Сбрасывает буфер и закрывает активный сегмент"""
+        try:
+            self.save_data()
+        finally:
+            if self._segment_file:
+                self._segment_file.close()
+                self._segment_file = None
     
     def record_system_stats(self):
         """Записывает системную статистику"""
@@ -44,13 +272,7 @@ class SimpleAnalytics:
             "memory_percent": psutil.virtual_memory().percent,
             "disk_percent": psutil.disk_usage('/').percent
         }
-        self.data["system_stats"].append(stats)
-        
-        # Ограничиваем количество записей
-        if len(self.data["system_stats"]) > 1000:
-            self.data["system_stats"] = self.data["system_stats"][-500:]
-        
-        self.save_data()
+        self._append({"kind": "system_stats", "data": stats})
     
     def record_bot_event(self, event_type: str, details: str = ""):
         """Записывает событие бота"""
@@ -59,36 +281,18 @@ class SimpleAnalytics:
             "type": event_type,
             "details": details
         }
-        self.data["bot_events"].append(event)
-        
-        if len(self.data["bot_events"]) > 500:
-            self.data["bot_events"] = self.data["bot_events"][-250:]
-        
-        self.save_data()
+        self._append({"kind": "bot_event", "data": event})
     
     def record_user_activity(self, user_id: int, action: str):
         """Записывает активность пользователя"""
-        user_id_str = str(user_id)
-        if user_id_str not in self.data["user_activity"]:
-            self.data["user_activity"][user_id_str] = {
-                "actions": [],
-                "last_seen": None,
-                "total_actions": 0
+        self._append({
+            "kind": "user_activity",
+            "user_id": str(user_id),
+            "data": {
+                "timestamp": datetime.now().isoformat(),
+                "action": action
             }
-        
-        self.data["user_activity"][user_id_str]["actions"].append({
-            "timestamp": datetime.now().isoformat(),
-            "action": action
         })
-        self.data["user_activity"][user_id_str]["last_seen"] = datetime.now().isoformat()
-        self.data["user_activity"][user_id_str]["total_actions"] += 1
-        
-        # Ограничиваем количество действий на пользователя
-        if len(self.data["user_activity"][user_id_str]["actions"]) > 100:
-            self.data["user_activity"][user_id_str]["actions"] = \
-                self.data["user_activity"][user_id_str]["actions"][-50:]
-        
-        self.save_data()
     
     def get_system_summary(self) -> str:
         """Возвращает текстовую сводку системной статистики"""
@@ -200,7 +404,8 @@ class SimpleAnalytics:
                 if datetime.fromisoformat(a["timestamp"]) > cutoff_time
             ]
         
-        self.save_data()
+        # Отфильтрованное состояние заменяет весь журнал
+        self.compact()
 
 # Пример использования
 if __name__ == "__main__":